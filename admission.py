@@ -0,0 +1,220 @@
+# This is a new file: admission.py
+# Admission control for the heavy endpoints: each workload class gets its own bounded
+# thread pool + queue limit, so a burst of batch/report work can't starve /api/analyze.
+# A full class is rejected right away (429 + Retry-After) instead of piling up.
+
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIGURATION: Workload Classes ---
+# class -> (worker threads, requests allowed to wait, typical seconds per request)
+# The typical duration seeds the Retry-After estimate until real timings come in.
+WORKLOADS = {
+    "interactive": (4, 8, 20.0), # /api/analyze
+    "report": (2, 2, 120.0), # Synchronous single-PDF greenwash analyses
+    "batch": (1, 1, 600.0), # Multi-PDF greenwash batches
+    "reads": (4, 32, 0.5), # Score history queries
+}
+RETRY_AFTER_MIN_SECONDS = 1
+RETRY_AFTER_MAX_SECONDS = 300
+SHUTDOWN_RETRY_AFTER_SECONDS = 10 # Another worker process / the restarted server should take it
+DURATION_SMOOTHING = 0.2 # Weight of the newest request in the moving average
+
+
+def _env_override(name: str, default: tuple) -> tuple:
+    """ REPUTEX_POOL_<CLASS>="workers,queued" overrides a default. """
+    value = os.environ.get(f"REPUTEX_POOL_{name.upper()}")
+    if not value:
+        return default
+    try:
+        workers, queued = value.split(",")
+        return (max(1, int(workers)), max(0, int(queued))) + default[2:]
+    except ValueError:
+        print(f"Admission: Ignoring invalid REPUTEX_POOL_{name.upper()}='{value}'")
+        return default
+
+
+class Overloaded(Exception):
+    """ Raised when a workload class is full (status 429) or shutting down (status 503). """
+
+    def __init__(self, message: str, retry_after: int, status_code: int = 429):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+    @property
+    def headers(self) -> dict:
+        return {"Retry-After": str(self.retry_after)}
+
+
+class WorkloadPool:
+    """
+    Bounded executor for one workload class. At most `max_workers` calls run and
+    `max_queued` wait; anything beyond that raises Overloaded instead of queueing.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queued: int, typical_seconds: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"pool-{name}")
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+        self._reserved = 0 # Slots held by reserve() for work not submitted yet
+        self._closing = False
+        self._avg_seconds = typical_seconds
+        self._accepted = 0
+        self._rejected = 0
+
+    # --- Admission ---
+    def check_capacity(self):
+        """ Raises Overloaded if a new request would be rejected (cheap pre-check). """
+        with self._lock:
+            self._check_locked()
+
+    def reserve(self) -> "Reservation":
+        """
+        Takes a slot now for work submitted later (e.g. once an upload is read), so
+        requests reading uploads count against the limits. Raises Overloaded if full.
+        """
+        with self._lock:
+            self._check_locked()
+            self._reserved += 1
+            self._accepted += 1
+        return Reservation(self)
+
+    def _check_locked(self):
+        if self._closing:
+            raise Overloaded(f"The '{self.name}' workload is shutting down.", SHUTDOWN_RETRY_AFTER_SECONDS, status_code=503)
+        if self._running + self._queued + self._reserved >= self.max_workers + self.max_queued:
+            self._rejected += 1
+            raise Overloaded(f"Too many '{self.name}' requests in progress ({self._queued} waiting).", self._retry_after_locked())
+
+    def _retry_after_locked(self) -> int:
+        """ Rough time until a slot frees up: queued work spread across the workers. """
+        estimate = self._avg_seconds * (self._queued + self._reserved + 1) / self.max_workers
+        return int(max(RETRY_AFTER_MIN_SECONDS, min(RETRY_AFTER_MAX_SECONDS, math.ceil(estimate))))
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queues func(*args, **kwargs) on this class's threads and returns a
+        concurrent.futures.Future. The slot is held until the call actually
+        finishes (even if the client has already gone), so limits stay honest.
+        """
+        with self._lock:
+            self._check_locked()
+            self._queued += 1
+            self._accepted += 1
+        return self._start(func, args, kwargs)
+
+    def _submit_reserved(self, func, args, kwargs):
+        with self._lock:
+            self._reserved -= 1
+            self._queued += 1
+        return self._start(func, args, kwargs)
+
+    def _release(self):
+        with self._lock:
+            self._reserved -= 1
+
+    def _start(self, func, args, kwargs):
+        """ Hands a call already counted in _queued to the executor. """
+        try:
+            return self._executor.submit(self._run, func, args, kwargs)
+        except RuntimeError: # Executor already shut down
+            with self._lock:
+                self._queued -= 1
+            raise Overloaded(f"The '{self.name}' workload is shutting down.", SHUTDOWN_RETRY_AFTER_SECONDS, status_code=503)
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self._avg_seconds += DURATION_SMOOTHING * (elapsed - self._avg_seconds)
+
+    # --- Status / Shutdown ---
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "running": self._running,
+                "queued": self._queued,
+                "reserved": self._reserved,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "avg_seconds": round(self._avg_seconds, 2),
+                "retry_after": self._retry_after_locked(),
+                "closing": self._closing
+            }
+
+    def shutdown(self):
+        """ Rejects new work (503); calls already queued or running still finish. """
+        with self._lock:
+            self._closing = True
+        self._executor.shutdown(wait=False)
+
+
+class Reservation:
+    """
+    A slot from WorkloadPool.reserve(). submit() / run() use it (same as the pool's, without
+    a second admission check); otherwise release() - or leaving the `with` block - frees it.
+    """
+
+    def __init__(self, workload: WorkloadPool):
+        self.workload = workload
+        self._held = True
+
+    def submit(self, func, *args, **kwargs):
+        if not self._held:
+            raise RuntimeError("This reservation was already used or released.")
+        self._held = False
+        return self.workload._submit_reserved(func, args, kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self.workload._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+pools = {name: WorkloadPool(name, *_env_override(name, limits)) for name, limits in WORKLOADS.items()}
+
+
+def pool(name: str) -> WorkloadPool:
+    return pools[name]
+
+
+async def run(name: str, func, *args, **kwargs):
+    """ `await admission.run("reads", func, ...)`: asyncio.to_thread on the class's own pool. """
+    return await asyncio.wrap_future(pools[name].submit(func, *args, **kwargs))
+
+
+def stats() -> dict:
+    """ Per-class running / queued counts (served by /api/queues). """
+    return {name: workload.stats() for name, workload in pools.items()}
+
+
+def shutdown():
+    for workload in pools.values():
+        workload.shutdown()
@@ -1,13 +1,16 @@
 # This is your file: ai_core.py
 # Combines all logic: multi-API data fetching, executive search, AI analysis, weighted scoring, and heatmap
 
-import streamlit as st
 import requests
-import praw
-import prawcore # Import specifically for exception handling
-import pandas as pd
-from transformers import pipeline
-import torch # Needed for checking CUDA availability
+import model_registry # On-demand models, memory budget, idle unload
+import config # Secrets + caching (Streamlit-free on the server; praw / torch / transformers load lazily)
+import scoring_kernel # Columnar scoring engine (NumPy)
+from provider_limits import provider_slot # Per-provider concurrency / request spacing
+import score_history # Local time series of every analysis
+import company_entities # Names / aliases / tickers -> canonical company id
+import cancellation # Request-scoped cancellation / deadlines
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import io # Needed for reading bytes from PDF
 
 # --- CONFIGURATION: Trusted Sources ---
@@ -53,48 +56,67 @@ HEATMAP_LABELS = [
     "Ethics & Compliance", "Board & Executive", "Transparency & Reporting"
 ]
 
+# --- CONFIGURATION: Main ESG Categories (Simpler labels used for classification) ---
+ESG_LABELS = [
+    "Environmental Impact",
+    "Social & Employee Issues",
+    "Corporate Governance & Ethics",
+    "General Business/Financial News" # Simple 'Other'
+]
+
+# Map main categories to sub-topic keyword groups (heatmap)
+CATEGORY_SUB_TOPICS = {
+    ESG_LABELS[0]: ["Climate & Emissions", "Waste & Pollution", "Resources & Biodiversity"], # Environmental
+    ESG_LABELS[1]: ["Labor & Safety", "Diversity & Inclusion", "Product & Data"], # Social
+    ESG_LABELS[2]: ["Ethics & Compliance", "Board & Executive", "Transparency & Reporting"]  # Governance
+}
+
+# Integer-coded categories / sub-topics for the scoring kernel (built once)
+SCORING_SCHEMA = scoring_kernel.ScoringSchema(ESG_LABELS, HEATMAP_LABELS, CATEGORY_SUB_TOPICS, SUB_TOPIC_KEYWORDS)
+
+# --- CONFIGURATION: Score Adjustment ---
+# Keyed by company_entities id ("Google", "GOOGL" and "YouTube" all resolve to "alphabet")
+TOP_COMPANIES_FLOOR = {
+    "apple": 70, "microsoft": 75, "alphabet": 70,
+    "tesla": 65, "amazon": 60, "infosys": 68, "tata": 65,
+    "reliance": 60
+}
+
+
+# --- 1. AI MODEL LOADING (on demand, via the shared model registry) ---
+SENTIMENT_MODEL = model_registry.registry.register_pipeline("sentiment-analysis", "cardiffnlp/twitter-roberta-base-sentiment-latest")
+ESG_MODEL = model_registry.registry.register_pipeline("zero-shot-classification", "facebook/bart-large-mnli")
 
-# --- 1. AI MODEL LOADING ---
-@st.cache_resource
 def load_analyzers():
-    """ Load and return the AI models. Cached """
+    """ Loads (if needed) and returns the AI models. Used for warm-up; analysis code uses the registry directly. """
     print("AI Core: Loading AI models...")
-    device_option = -1 # Defaulting to CPU
-    try:
-        if torch.cuda.is_available():
-            device_option = 0 # Use GPU 0 if available
-            print("AI Core: CUDA GPU detected. Setting pipeline device to GPU 0.")
-        else:
-            device_option = -1 # Use CPU
-            print("AI Core: No CUDA GPU detected. Setting pipeline device to CPU.")
-    except Exception as e:
-        print(f"AI Core: Error checking CUDA availability ({e}). Defaulting to CPU.")
-        device_option = -1
-
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis",
-        model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-        device=device_option
-    )
-    esg_classifier = pipeline(
-        "zero-shot-classification",
-        model="facebook/bart-large-mnli",
-        device=device_option
-    )
+    sentiment_analyzer = model_registry.registry.get(SENTIMENT_MODEL)
+    esg_classifier = model_registry.registry.get(ESG_MODEL)
     print("AI Core: AI models loaded.")
     return sentiment_analyzer, esg_classifier
 
+# --- CONFIGURATION: Analysis & Leaderboard ---
+CONFIDENCE_THRESHOLD = 0.35 # Lowered threshold
+EXECUTIVE_NEWS_WEIGHT_FACTOR = 0.8 # Weight executive news slightly less
+MODEL_BATCH_SIZE = 16 # Feed items per sentiment / classifier batch
+LEADERBOARD_FETCH_WORKERS = 8 # Companies fetched at once (providers are limited separately)
+DEFAULT_LEADERBOARD_COMPANIES = ["Apple", "Microsoft", "Google", "Tesla", "Amazon"]
+
 # --- 2. DATA FETCHING FUNCTIONS ---
 
 # --- GNews ---
-@st.cache_data(ttl=3600)
-def get_news(company_name: str, query_override: str = None) -> list:
-    """ Fetches news articles for the company from GNews. Can use a specific query. """
+@config.cache_data(ttl=3600)
+def get_news(company_name: str, query_override: str = None, _cancel_token=None) -> list:
+    """
+    Fetches news articles for the company from GNews. Can use a specific query.
+    _cancel_token (not part of the cache key) caps the request timeout at the time left.
+    """
     fetch_type = "general" if query_override is None else "specific"
     print(f"AI Core: Fetching {fetch_type} news from GNews for '{company_name}'...")
+    entity = company_entities.resolve(company_name)
     response = None
     try:
-        api_key = st.secrets.get("GNEWS_API_KEY")
+        api_key = config.secrets.get("GNEWS_API_KEY")
         if not api_key:
              print("AI Core: GNews API Key not found in secrets.")
              return []
@@ -103,17 +125,18 @@ def get_news(company_name: str, query_override: str = None) -> list:
             query = query_override
             max_results = 7
         else:
-            query = f'"{company_name}"' # Broad query
+            query = entity.query() # Broad query: the company's search names, OR'ed
             max_results = 30
 
-        url = "https://gnews.io/api/v4/search"
+        url = config.upstream_url("gnews")
         params = {"q": query, "lang": "en", "max": max_results, "apikey": api_key, "in": "title,description", "sortby": "relevance"}
 
         prepared_request = requests.Request('GET', url, params=params).prepare()
         print(f"\n--- GNews Request URL ---\n{prepared_request.url}\n-------------------------\n")
         print(f"GNews Query Used: {query}")
 
-        response = requests.get(url, params=params, timeout=15)
+        with provider_slot("gnews"):
+            response = requests.get(url, params=params, timeout=cancellation.remaining(_cancel_token, 15))
         print(f"GNews Status Code: {response.status_code}")
         response.raise_for_status()
 
@@ -127,8 +150,6 @@ def get_news(company_name: str, query_override: str = None) -> list:
         # Filtering
         filtered_articles = []
         exclude_keywords = ["forest", "river", "rainforest", "jungle", "amazonas", "dorabji", "recipe", "horoscope", "obituary", "death anniversary", "sports", "cricket", "match", "score", "prediction", "chart"]
-        company_variants = [company_name.lower().strip()]
-        if company_name.lower().strip() == "tata": company_variants.extend(["tata group", "tata motors", "tata steel", "tcs", "tata power"])
 
         for article in articles:
             if not article or not article.get('title') or not article.get('source') or not article.get('source', {}).get('name'): continue
@@ -138,7 +159,7 @@ def get_news(company_name: str, query_override: str = None) -> list:
             content_lower = title_lower + " " + desc_lower
             source_name = article['source']['name'].lower()
 
-            if query_override is None and not any(variant in content_lower for variant in company_variants): continue
+            if query_override is None and not entity.mentions(article['title'] + " " + (article.get('description') or '')): continue
             if any(keyword in content_lower for keyword in exclude_keywords): continue
 
             trust_score = 0.5
@@ -157,6 +178,7 @@ def get_news(company_name: str, query_override: str = None) -> list:
         return filtered_articles[:limit]
 
     except requests.exceptions.Timeout:
+        cancellation.check(_cancel_token) # Cut short by the deadline: raise, don't cache an empty result
         print("Error fetching GNews: Request timed out.")
         return []
     except requests.exceptions.RequestException as e:
@@ -169,14 +191,15 @@ def get_news(company_name: str, query_override: str = None) -> list:
 
 
 # --- Mediastack ---
-@st.cache_data(ttl=3600)
-def get_mediastack_news(company_name: str, query_override: str = None) -> list:
-    """ Fetches news articles from Mediastack. Can use a specific query. """
+@config.cache_data(ttl=3600)
+def get_mediastack_news(company_name: str, query_override: str = None, _cancel_token=None) -> list:
+    """ Fetches news articles from Mediastack. Can use a specific query; _cancel_token as in get_news. """
     fetch_type = "general" if query_override is None else "specific"
     print(f"AI Core: Fetching {fetch_type} Mediastack news for {company_name}")
+    entity = company_entities.resolve(company_name)
     response = None
     try:
-        api_key = st.secrets.get("MEDIASTACK_API_KEY")
+        api_key = config.secrets.get("MEDIASTACK_API_KEY")
         if not api_key:
              print("AI Core: Mediastack API Key not found in secrets.")
              return []
@@ -184,9 +207,9 @@ def get_mediastack_news(company_name: str, query_override: str = None) -> list:
         if query_override:
             keywords = query_override
         else:
-            keywords = f'"{company_name}"'
+            keywords = f'"{entity.search_terms[0]}"' # Mediastack has no OR; the filter below still accepts aliases
 
-        url = "http://api.mediastack.com/v1/news"
+        url = config.upstream_url("mediastack")
         max_results = 30 if query_override is None else 7
         params = {'access_key': api_key, 'keywords': keywords, 'languages': 'en', 'limit': max_results, 'sort': 'published_desc'}
 
@@ -194,7 +217,8 @@ def get_mediastack_news(company_name: str, query_override: str = None) -> list:
         print(f"\n--- Mediastack Request URL ---\n{prepared_request.url}\n----------------------------\n")
         print(f"Mediastack Query Used: {keywords}")
 
-        response = requests.get(url, params=params, timeout=15)
+        with provider_slot("mediastack"):
+            response = requests.get(url, params=params, timeout=cancellation.remaining(_cancel_token, 15))
         print(f"Mediastack Status Code: {response.status_code}")
         response.raise_for_status()
         articles_data = response.json().get('data', [])
@@ -211,7 +235,7 @@ def get_mediastack_news(company_name: str, query_override: str = None) -> list:
             content_lower = title_lower + " " + desc_lower
 
             if any(kw in title_lower for kw in exclude_keywords): continue
-            if query_override is None and company_name.lower() not in content_lower: continue
+            if query_override is None and not entity.mentions(article['title'] + " " + (article.get('description') or '')): continue
 
             trust_score = 0.5
             if any(trusted in source_name for trusted in TRUSTED_NEWS_SOURCES_LOWER):
@@ -227,6 +251,7 @@ def get_mediastack_news(company_name: str, query_override: str = None) -> list:
         return news_list[:20]
 
     except requests.exceptions.Timeout:
+        cancellation.check(_cancel_token) # Cut short by the deadline: raise, don't cache an empty result
         print("Error fetching Mediastack: Request timed out.")
         return []
     except requests.exceptions.RequestException as e:
@@ -240,14 +265,15 @@ def get_mediastack_news(company_name: str, query_override: str = None) -> list:
         return []
 
 # --- Newsdata.io ---
-@st.cache_data(ttl=3600)
-def get_newsdata_news(company_name: str, query_override: str = None) -> list:
-    """ Fetches news articles from Newsdata.io. Can use a specific query. """
+@config.cache_data(ttl=3600)
+def get_newsdata_news(company_name: str, query_override: str = None, _cancel_token=None) -> list:
+    """ Fetches news articles from Newsdata.io. Can use a specific query; _cancel_token as in get_news. """
     fetch_type = "general" if query_override is None else "specific"
     print(f"AI Core: Fetching {fetch_type} Newsdata.io news for {company_name}")
+    entity = company_entities.resolve(company_name)
     response = None
     try:
-        api_key = st.secrets.get("NEWSDATA_API_KEY")
+        api_key = config.secrets.get("NEWSDATA_API_KEY")
         if not api_key:
              print("AI Core: Newsdata.io API Key not found in secrets.")
              return []
@@ -255,16 +281,17 @@ def get_newsdata_news(company_name: str, query_override: str = None) -> list:
         if query_override:
             query = query_override
         else:
-            query = f'"{company_name}"'
+            query = entity.query()
 
-        url = "https://newsdata.io/api/1/news"
+        url = config.upstream_url("newsdata")
         params = {'apikey': api_key, 'q': query, 'language': 'en'}
 
         prepared_request = requests.Request('GET', url, params=params).prepare()
         print(f"\n--- Newsdata.io Request URL ---\n{prepared_request.url}\n---------------------------\n")
         print(f"Newsdata.io Query Used: {query}")
 
-        response = requests.get(url, params=params, timeout=15)
+        with provider_slot("newsdata"):
+            response = requests.get(url, params=params, timeout=cancellation.remaining(_cancel_token, 15))
         print(f"Newsdata.io Status Code: {response.status_code}")
         response.raise_for_status()
         articles_data = response.json().get('results', [])
@@ -281,7 +308,7 @@ def get_newsdata_news(company_name: str, query_override: str = None) -> list:
             content_lower = title_lower + " " + desc_lower
 
             if any(kw in title_lower for kw in exclude_keywords): continue
-            if query_override is None and company_name.lower() not in content_lower: continue
+            if query_override is None and not entity.mentions(article['title'] + " " + (article.get('description') or '')): continue
 
             trust_score = 0.5
             if any(trusted.replace(" ", "") in source_name for trusted in TRUSTED_NEWS_SOURCES_LOWER):
@@ -298,6 +325,7 @@ def get_newsdata_news(company_name: str, query_override: str = None) -> list:
         return news_list[:limit]
 
     except requests.exceptions.Timeout:
+        cancellation.check(_cancel_token) # Cut short by the deadline: raise, don't cache an empty result
         print("Error fetching Newsdata.io: Request timed out.")
         return []
     except requests.exceptions.RequestException as e:
@@ -311,33 +339,41 @@ def get_newsdata_news(company_name: str, query_override: str = None) -> list:
         return []
 
 # --- REDDIT FETCHING FUNCTION ---
-@st.cache_data(ttl=3600)
+_reddit_local = threading.local() # PRAW clients aren't thread-safe: one per thread, reused across calls
+
+def _reddit_client(praw):
+    """ This thread's PRAW client, created on its first Reddit fetch. """
+    if not hasattr(_reddit_local, "client"):
+        _reddit_local.client = praw.Reddit(
+            client_id=config.secrets["REDDIT_CLIENT_ID"],
+            client_secret=config.secrets["REDDIT_CLIENT_SECRET"],
+            user_agent="ReputeX analysis script v1.2 (Contact: YourEmail@example.com)",
+            **config.reddit_endpoints()
+        )
+    return _reddit_local.client
+
+@config.cache_data(ttl=3600)
 def get_reddit_posts(company_name: str) -> list:
     """ Fetches relevant Reddit posts using PRAW. """
     print(f"AI Core: Fetching Reddit posts for {company_name}")
+    entity = company_entities.resolve(company_name)
     try:
-        if "REDDIT_CLIENT_ID" not in st.secrets or "REDDIT_CLIENT_SECRET" not in st.secrets:
+        import praw # Lazy: a missing praw means no Reddit posts, not a failed analysis
+        import prawcore # Import specifically for exception handling
+        if "REDDIT_CLIENT_ID" not in config.secrets or "REDDIT_CLIENT_SECRET" not in config.secrets:
              print("AI Core: Reddit API credentials not found in secrets.")
              return []
 
-        reddit = praw.Reddit(
-            client_id=st.secrets["REDDIT_CLIENT_ID"],
-            client_secret=st.secrets["REDDIT_CLIENT_SECRET"],
-            user_agent="ReputeX analysis script v1.2 (Contact: YourEmail@example.com)"
-        )
-        
+        reddit = _reddit_client(praw)
+
         subreddits_to_search = [
             "investing", "stocks", "wallstreetbets", "antiwork",
             "recruitinghell", "environment", "sustainability",
-            company_name.lower().replace(" ", ""),
+            entity.search_terms[0].lower().replace(" ", ""),
             "IndiaInvestments", "IndianStockMarket"
         ]
 
-        query_terms = [f'"{company_name}"']
-        if company_name.lower() == "tata":
-            query_terms.extend(['"Tata Motors"', '"Tata Steel"', '"TCS"', '"Tata Group"', '"Tata Power"'])
-        
-        query = " OR ".join(query_terms)
+        query = entity.query()
         posts_list = []
         total_posts_limit = 15
         posts_found = 0
@@ -349,17 +385,13 @@ def get_reddit_posts(company_name: str) -> list:
             try:
                 print(f"  - Searching r/{sub}...")
                 subreddit = reddit.subreddit(sub)
-                for submission in subreddit.search(query, sort="relevance", time_filter="month", limit=7):
+                with provider_slot("reddit"):
+                    submissions = list(subreddit.search(query, sort="relevance", time_filter="month", limit=7))
+                for submission in submissions:
                     title_lower = submission.title.lower()
                     exclude_reddit = ["moon", "yolo", "squeeze", "$", "earn", "dividend", "alert", "promotion", "free", "giveaway", "job posting", "hiring", "mega thread", "daily discussion", "prediction", "chart", "technical analysis"]
                     if any(keyword in title_lower for keyword in exclude_reddit): continue
-
-                    found_term = False
-                    for term in query_terms:
-                        if term.strip('"').lower() in title_lower:
-                            found_term = True; break
-                    if not found_term and company_name.lower() not in title_lower:
-                        continue
+                    if not entity.mentions(submission.title): continue
 
                     if posts_found < total_posts_limit:
                         posts_list.append({
@@ -385,35 +417,43 @@ def get_reddit_posts(company_name: str) -> list:
         return []
 
 # --- EXECUTIVE SEARCH FUNCTIONS ---
-@st.cache_data(ttl=86400)
-def find_key_executives(company_name: str) -> list:
-    """ Queries Google Knowledge Graph to find key executives (CEO, Founder). """
+@config.cache_data(ttl=86400)
+def find_key_executives(company_name: str, _cancel_token=None) -> list:
+    """
+    Queries Google Knowledge Graph to find key executives (CEO, Founder).
+    Answers (including "no match") are kept on disk per company id; failed calls are not.
+    _cancel_token (not part of the cache key) caps the request timeout at the time left.
+    """
+    entity = company_entities.resolve(company_name)
+    cached = company_entities.cached_executives(entity.id)
+    if cached is not None:
+        print(f"AI Core: Knowledge Graph cache hit for {entity.id}: {cached}")
+        return cached
     print(f"AI Core: Searching Knowledge Graph for executives of {company_name}")
-    api_key = st.secrets.get("GOOGLE_KG_API_KEY")
+    api_key = config.secrets.get("GOOGLE_KG_API_KEY")
     if not api_key:
         print("AI Core: Google Knowledge Graph API Key not found in secrets.")
         return []
 
-    service_url = 'https://kgsearch.googleapis.com/v1/entities:search'
-    params = {'query': f"{company_name} company", 'key': api_key, 'limit': 1, 'types': 'Organization'}
+    service_url = config.upstream_url("knowledge_graph")
+    params = {'query': f"{entity.search_terms[0]} company", 'key': api_key, 'limit': 1, 'types': 'Organization'}
     executives = []
     response = None
-    
-    company_variants = [company_name.lower().strip()]
-    if company_name.lower().strip() == "tata": company_variants.extend(["tata group", "tata motors", "tata steel", "tcs", "tata power"])
 
     try:
-        response = requests.get(service_url, params=params, timeout=10)
+        with provider_slot("knowledge_graph"):
+            response = requests.get(service_url, params=params, timeout=cancellation.remaining(_cancel_token, 10))
         print(f"Knowledge Graph Status Code: {response.status_code}")
         response.raise_for_status()
         result = response.json()
 
         if result.get('itemListElement'):
             top_result = result['itemListElement'][0].get('result', {})
-            result_name = top_result.get('name', '').lower()
+            result_name = top_result.get('name', '')
             
-            if not any(variant in result_name for variant in company_variants) and company_name.lower() not in result_name:
+            if not entity.mentions(result_name):
                  print(f"Knowledge Graph top result '{result_name}' might not match '{company_name}'. Skipping executives.")
+                 company_entities.store_executives(entity.id, [])
                  return []
 
             detailed_data = top_result.get('detailedDescription') or top_result
@@ -431,8 +471,10 @@ def find_key_executives(company_name: str) -> list:
                  print("Knowledge Graph result format not as expected or missing detailed data.")
 
         print(f"AI Core: Found executives: {executives}")
+        company_entities.store_executives(entity.id, executives[:2])
         return executives[:2]
     except requests.exceptions.Timeout:
+        cancellation.check(_cancel_token) # Cut short by the deadline: raise, don't cache an empty result
         print("Error calling Knowledge Graph API: Request timed out.")
         return []
     except requests.exceptions.RequestException as e:
@@ -443,22 +485,23 @@ def find_key_executives(company_name: str) -> list:
         print(f"Error processing Knowledge Graph result: {e}")
         return []
 
-def get_executive_news(executives: list, company_name: str) -> list:
+def get_executive_news(executives: list, company_name: str, cancel_token=None) -> list:
     """ Fetches news mentioning key executives + company using existing news functions. """
     if not executives: return []
     all_executive_news = []
     print(f"AI Core: Fetching news for executives: {[e['name'] for e in executives]}")
 
     for person in executives:
+        cancellation.check(cancel_token) # Stop between executives if the request was abandoned
         person_name = person['name']
         print(f"  - Searching news for {person_name} ({company_name})...")
-        person_query = f'"{person_name}" AND "{company_name}"'
+        person_query = f'"{person_name}" AND "{company_entities.resolve(company_name).search_terms[0]}"'
 
-        try: all_executive_news.extend(get_news(company_name, query_override=person_query))
+        try: all_executive_news.extend(get_news(company_name, query_override=person_query, _cancel_token=cancel_token))
         except Exception as e_gn: print(f"Error in exec news fetch (GNews): {e_gn}")
-        try: all_executive_news.extend(get_mediastack_news(company_name, query_override=person_query))
+        try: all_executive_news.extend(get_mediastack_news(company_name, query_override=person_query, _cancel_token=cancel_token))
         except Exception as e_ms: print(f"Error in exec news fetch (Mediastack): {e_ms}")
-        try: all_executive_news.extend(get_newsdata_news(company_name, query_override=person_query))
+        try: all_executive_news.extend(get_newsdata_news(company_name, query_override=person_query, _cancel_token=cancel_token))
         except Exception as e_nd: print(f"Error in exec news fetch (Newsdata): {e_nd}")
 
     print(f"AI Core: Found {len(all_executive_news)} total articles related to executives before dedupe.")
@@ -475,21 +518,24 @@ def get_executive_news(executives: list, company_name: str) -> list:
     return deduped_exec_news[:10]
 
 
-# --- MAIN ANALYSIS FUNCTION ---
-def get_combined_analysis(company_name: str) -> dict:
+# --- MAIN ANALYSIS PIPELINE: fetch -> model batches -> columnar scoring ---
+def fetch_company_data(company_name: str, cancel_token=None) -> dict:
     """
-    Main function. Fetches company & exec news, Reddit, analyzes, scores, returns dict.
+    Step 2: Fetches company & exec news and Reddit posts for one company.
+    Returns {"news": [...max 50 items], "reddit": [...]}. Safe to call from worker threads.
+    cancel_token (cancellation.CancellationToken) is checked before each upstream call, and
+    its deadline caps the news / Knowledge Graph request timeouts.
+    Fetchers get the canonical company id, so "Google" and "Alphabet" share cached results.
     """
-    print(f"AI Core: Starting combined analysis for {company_name}...")
-    sentiment_analyzer, esg_classifier = load_analyzers()
-
     # --- Step 2: Fetch Data ---
-    gnews_data = get_news(company_name)
-    mediastack_data = get_mediastack_news(company_name)
-    newsdata_data = get_newsdata_news(company_name)
-    reddit_data = get_reddit_posts(company_name)
-    executives = find_key_executives(company_name)
-    executive_news = get_executive_news(executives, company_name)
+    company_id = company_entities.company_id(company_name)
+    check = lambda: cancellation.check(cancel_token)
+    check(); gnews_data = get_news(company_id, _cancel_token=cancel_token)
+    check(); mediastack_data = get_mediastack_news(company_id, _cancel_token=cancel_token)
+    check(); newsdata_data = get_newsdata_news(company_id, _cancel_token=cancel_token)
+    check(); reddit_data = get_reddit_posts(company_id)
+    check(); executives = find_key_executives(company_id, _cancel_token=cancel_token)
+    executive_news = get_executive_news(executives, company_id, cancel_token)
 
     # --- Step 2b: Combine and De-duplicate News ---
     all_fetched_news = gnews_data + mediastack_data + newsdata_data
@@ -505,83 +551,125 @@ def get_combined_analysis(company_name: str) -> dict:
     unique_executive_news = [exec_art for exec_art in executive_news if exec_art.get("url") not in seen_urls]
     all_news_data = deduplicated_company_news[:40] + unique_executive_news[:10]
     print(f"AI Core: Total unique news items (Company + Exec) for analysis (max 50): {len(all_news_data)}")
+    return {"news": all_news_data, "reddit": reddit_data}
 
-    # --- Step 3: Analyze Data ---
-    esg_labels = [ # Simpler labels
-        "Environmental Impact",
-        "Social & Employee Issues",
-        "Corporate Governance & Ethics",
-        "General Business/Financial News" # Simple 'Other'
-    ]
-    confidence_threshold = 0.35 # Lowered threshold
-    executive_news_weight_factor = 0.8 # Weight executive news slightly less
-
-    analyzed_news_feed = []
-    print(f"AI Core: Analyzing {len(all_news_data)} combined news items...")
-    if all_news_data:
-        for item in all_news_data:
-            text = item.get('text', '')
-            if not text: continue
-            try:
-                sentiment_result = sentiment_analyzer(text)[0]
-                esg_result = esg_classifier(text, esg_labels) # Removed hypothesis_template
-                top_label = esg_result['labels'][0]; top_score = esg_result['scores'][0]
-                is_exec_news = "related_person" in item
-
-                if top_score < confidence_threshold:
-                    final_category = esg_labels[3]
-                    explanation = f"Low confidence ({top_score:.1%}). Defaulted to Other."
-                else:
-                    final_category = top_label
-                    prefix = f"Exec '{item.get('related_person','')}': " if is_exec_news else ""
-                    explanation = f"{prefix}Classified as '{final_category}' ({top_score:.1%})."
-
-                base_trust = item.get('trust_score', 0.5)
-                final_trust = round(base_trust * executive_news_weight_factor, 2) if is_exec_news else base_trust
-
-                analyzed_news_feed.append({
-                    "source": item.get('source', 'Unknown Source'),
-                    "text": f"[{item.get('related_person','Exec')}] {text}" if is_exec_news else text,
-                    "url": item.get('url', '#'),
-                    "sentiment": sentiment_result.get('label', 'neutral').lower(),
-                    "sentiment_score": round(sentiment_result.get('score', 0.5), 2),
-                    "category": final_category, "explanation": explanation,
-                    "trust_score": final_trust
-                })
-            except Exception as e:
-                print(f"  - Error analyzing combined news item '{text[:50]}...': {e}")
-                continue
-    else: print("AI Core: No news items to analyze.")
 
-    analyzed_reddit_feed = []
-    print(f"AI Core: Analyzing {len(reddit_data)} Reddit items...")
+def _run_model_batch(model, texts: list, *args, cancel_token=None) -> list:
+    """
+    Runs a pipeline over all texts in batches. If a batch fails, its items are
+    retried one by one so a single bad item only loses itself (result None).
+    """
+    results = []
+    for start in range(0, len(texts), MODEL_BATCH_SIZE):
+        cancellation.check(cancel_token) # Stop between batches if the request was abandoned
+        chunk = texts[start:start + MODEL_BATCH_SIZE]
+        try:
+            chunk_results = model(chunk, *args, batch_size=MODEL_BATCH_SIZE)
+            if isinstance(chunk_results, dict): chunk_results = [chunk_results]
+            results.extend(chunk_results)
+        except Exception as e:
+            print(f"  - Model batch failed ({e}); retrying {len(chunk)} items individually.")
+            for text in chunk:
+                try:
+                    result = model(text, *args)
+                    results.append(result[0] if isinstance(result, list) else result)
+                except Exception as item_e:
+                    print(f"  - Error analyzing item '{text[:50]}...': {item_e}")
+                    results.append(None)
+    return results
+
+
+def analyze_fetched_data(fetched_list: list, cancel_token=None) -> list:
+    """
+    Step 3: Runs sentiment + ESG classification for any number of companies'
+    fetched data in SHARED batches. Returns one (analyzed_news_feed, analyzed_reddit_feed)
+    pair per input, in the same order.
+    """
+    esg_labels = ESG_LABELS
+
+    # Pool every non-empty text; remember where each item's results live
+    news_items = [(index, item) for index, fetched in enumerate(fetched_list) for item in fetched["news"] if item.get('text', '')]
+    reddit_items = [(index, item) for index, fetched in enumerate(fetched_list) for item in fetched["reddit"] if item.get('text', '')]
+    news_texts = [item['text'] for _, item in news_items]
+    reddit_texts = [item['text'] for _, item in reddit_items]
+    print(f"AI Core: Analyzing {len(news_texts)} news + {len(reddit_texts)} Reddit items for {len(fetched_list)} companies in shared batches...")
+
+    # Each model is loaded on demand and can't be unloaded while its batches run
+    sentiment_results, esg_results = [], []
+    if news_texts or reddit_texts:
+        with model_registry.registry.using(SENTIMENT_MODEL) as sentiment_analyzer:
+            sentiment_results = _run_model_batch(sentiment_analyzer, news_texts + reddit_texts, cancel_token=cancel_token)
+    if news_texts:
+        with model_registry.registry.using(ESG_MODEL) as esg_classifier:
+            esg_results = _run_model_batch(esg_classifier, news_texts, esg_labels, cancel_token=cancel_token) # Removed hypothesis_template
+
+    feeds = [([], []) for _ in fetched_list]
+    for (index, item), sentiment_result, esg_result in zip(news_items, sentiment_results, esg_results):
+        if sentiment_result is None or esg_result is None: continue
+        text = item['text']
+        try:
+            top_label = esg_result['labels'][0]; top_score = esg_result['scores'][0]
+            is_exec_news = "related_person" in item
+
+            if top_score < CONFIDENCE_THRESHOLD:
+                final_category = esg_labels[3]
+                explanation = f"Low confidence ({top_score:.1%}). Defaulted to Other."
+            else:
+                final_category = top_label
+                prefix = f"Exec '{item.get('related_person','')}': " if is_exec_news else ""
+                explanation = f"{prefix}Classified as '{final_category}' ({top_score:.1%})."
+
+            base_trust = item.get('trust_score', 0.5)
+            final_trust = round(base_trust * EXECUTIVE_NEWS_WEIGHT_FACTOR, 2) if is_exec_news else base_trust
+
+            feeds[index][0].append({
+                "source": item.get('source', 'Unknown Source'),
+                "text": f"[{item.get('related_person','Exec')}] {text}" if is_exec_news else text,
+                "url": item.get('url', '#'),
+                "sentiment": sentiment_result.get('label', 'neutral').lower(),
+                "sentiment_score": round(sentiment_result.get('score', 0.5), 2),
+                "category": final_category, "explanation": explanation,
+                "trust_score": final_trust
+            })
+        except Exception as e:
+            print(f"  - Error analyzing combined news item '{text[:50]}...': {e}")
+            continue
+
     social_label_string = esg_labels[1] # Use simple social label
-    if reddit_data:
-        for item in reddit_data:
-            text = item.get('text', '')
-            if not text: continue
-            try:
-                sentiment_result = sentiment_analyzer(text)[0]
-                analyzed_reddit_feed.append({
-                    "source": item.get('source', 'Unknown Subreddit'), "text": text,
-                    "url": "https://www.reddit.com" + item.get('url', ''),
-                    "sentiment": sentiment_result.get('label', 'neutral').lower(),
-                    "sentiment_score": round(sentiment_result.get('score', 0.5), 2),
-                    "category": social_label_string,
-                    "trust_score": item.get('trust_score', 0.6)
-                })
-            except Exception as e:
-                 print(f"  - Error analyzing reddit item '{text[:50]}...': {e}")
-                 continue
-    else: print("AI Core: No Reddit items to analyze.")
+    for (index, item), sentiment_result in zip(reddit_items, sentiment_results[len(news_texts):]):
+        if sentiment_result is None: continue
+        text = item['text']
+        try:
+            feeds[index][1].append({
+                "source": item.get('source', 'Unknown Subreddit'), "text": text,
+                "url": "https://www.reddit.com" + item.get('url', ''),
+                "sentiment": sentiment_result.get('label', 'neutral').lower(),
+                "sentiment_score": round(sentiment_result.get('score', 0.5), 2),
+                "category": social_label_string,
+                "trust_score": item.get('trust_score', 0.6)
+            })
+        except Exception as e:
+             print(f"  - Error analyzing reddit item '{text[:50]}...': {e}")
+             continue
+    return feeds
 
 
-    # --- Configuration for Score Adjustment ---
-    TOP_COMPANIES_FLOOR = {
-        "apple": 70, "microsoft": 75, "google": 70, "alphabet": 70,
-        "tesla": 65, "amazon": 60, "infosys": 68, "tata": 65,
-        "reliance": 60
-    }
+def score_analyzed_feeds(feeds: list) -> list:
+    """
+    Step 4: Scores every company's feeds in ONE columnar pass (group id = position).
+    Returns one scoring_kernel group result per (news_feed, reddit_feed) pair.
+    """
+    columns = scoring_kernel.encode_feeds(SCORING_SCHEMA, [
+        (group, source, feed)
+        for group, (news_feed, reddit_feed) in enumerate(feeds)
+        for source, feed in ((scoring_kernel.SOURCE_NEWS, news_feed), (scoring_kernel.SOURCE_REDDIT, reddit_feed))
+    ])
+    return scoring_kernel.score_columns(SCORING_SCHEMA, columns, num_groups=len(feeds))
+
+
+def build_company_result(company_name: str, analyzed_news_feed: list, analyzed_reddit_feed: list, scored: dict) -> dict:
+    """ Step 5: Turns one company's feeds + scores into the API response dictionary. """
+    esg_labels = ESG_LABELS
 
     # --- Step 4: Calculate Scores (Defaults to 50, not N/A) ---
     all_analyzed_items = analyzed_news_feed + analyzed_reddit_feed
@@ -597,79 +685,30 @@ def get_combined_analysis(company_name: str) -> dict:
             "risk_heatmap": {label: 0.0 for label in HEATMAP_LABELS} # Return empty heatmap
         }
 
-    df = pd.DataFrame(all_analyzed_items)
-    if 'sentiment' not in df.columns: df['sentiment'] = 'neutral'
-    if 'trust_score' not in df.columns: df['trust_score'] = 0.5
-    if 'category' not in df.columns: df['category'] = esg_labels[3]
-
-    sentiment_map_scoring = {'positive': 1, 'neutral': 0.2, 'negative': -1} # Boost neutral
-    df['sentiment_num'] = df['sentiment'].map(sentiment_map_scoring).fillna(0)
-    df['trust_score'] = df['trust_score'].fillna(0.5)
-    df['weighted_sentiment'] = df['sentiment_num'] * df['trust_score']
-    total_weight_overall = df['trust_score'].sum()
-
-    calculated_overall_score = 50
-    if total_weight_overall > 0.01:
-        average_weighted_sentiment_overall = df['weighted_sentiment'].sum() / total_weight_overall
-        calculated_overall_score = round(((average_weighted_sentiment_overall + 1) / 2) * 100)
-        print(f"AI Core: Overall Weighted Avg Sentiment: {average_weighted_sentiment_overall:.2f}, Calculated Scaled Score: {calculated_overall_score}")
+    calculated_overall_score = scored["overall_score"]
+    if scored["total_weight"] > scoring_kernel.MIN_TOTAL_WEIGHT:
+        print(f"AI Core: Overall Weighted Avg Sentiment: {scored['weighted_sum'] / scored['total_weight']:.2f}, Calculated Scaled Score: {calculated_overall_score}")
     else:
         print(f"AI Core: Zero total weight for overall score, defaulting calculated score to 50.")
 
     # Apply Score Floor
-    overall_score = calculated_overall_score
-    company_lower = company_name.lower()
-    floor_score = TOP_COMPANIES_FLOOR.get(company_lower)
-    if floor_score is not None:
-        overall_score = max(calculated_overall_score, floor_score)
-        if overall_score != calculated_overall_score:
-             print(f"AI Core: Applied specific score floor of {floor_score} for {company_name}. Final score: {overall_score}")
-
-    # --- Call Sub-Topic Analysis for Heatmap ---
-    # We pass the dataframe and the simple labels used for classification
-    risk_heatmap_data = assign_sub_topic_and_risk(df.copy(), esg_labels)
-
-    # Inner function to calculate category scores
-    def calculate_category_score(category_name):
-        if 'category' not in df.columns: return 50
-        category_df = df[df['category'] == category_name]
-        if category_df.empty: return 50 # Default to 50
-
-        total_weight_category = category_df['trust_score'].sum()
-        if total_weight_category > 0.01:
-            average_weighted_sentiment_category = category_df['weighted_sentiment'].sum() / total_weight_category
-            score = round(((average_weighted_sentiment_category + 1) / 2) * 100)
-            print(f"AI Core: Category '{category_name}' Weighted Avg Sentiment: {average_weighted_sentiment_category:.2f}, Scaled Score: {score}")
-        else:
-            score = 50
-            print(f"AI Core: Zero total weight for category '{category_name}', defaulting to 50.")
-        return score
+    overall_score = apply_score_floor(company_name, calculated_overall_score)
 
     # Use the simpler labels
     env_label = esg_labels[0]; soc_label = esg_labels[1]; gov_label = esg_labels[2]
-    env_score = calculate_category_score(env_label)
-    soc_score = calculate_category_score(soc_label)
-    gov_score = calculate_category_score(gov_label)
-
-    # Generate risk summaries
-    suggestions = generate_risk_summary(df.copy(), esg_labels) # Pass simple labels
+    env_score = scored["category_scores"][env_label]
+    soc_score = scored["category_scores"][soc_label]
+    gov_score = scored["category_scores"][gov_label]
+    print(f"AI Core: Category scores - E: {env_score}, S: {soc_score}, G: {gov_score}")
 
+    risk_heatmap_data = scored["risk_heatmap"]
+    print(f"AI Core: Risk heatmap data calculated: {risk_heatmap_data}")
 
-    # Calculate overall sentiment label for module display
-    sentiment_map_display = {'positive': 1, 'neutral': 0, 'negative': -1}
-    news_sentiment_df = pd.DataFrame(analyzed_news_feed)
-    news_sentiment = "Neutral"
-    if not news_sentiment_df.empty and 'sentiment' in news_sentiment_df.columns:
-        news_sentiment_num = news_sentiment_df['sentiment'].map(sentiment_map_display).fillna(0).mean()
-        if news_sentiment_num > 0.15: news_sentiment = "Positive"
-        elif news_sentiment_num < -0.15: news_sentiment = "Negative"
+    # Generate risk summaries
+    suggestions = generate_risk_summary(scored, esg_labels) # Pass simple labels
 
-    reddit_sentiment_df = pd.DataFrame(analyzed_reddit_feed)
-    reddit_sentiment = "Neutral"
-    if not reddit_sentiment_df.empty and 'sentiment' in reddit_sentiment_df.columns:
-        reddit_sentiment_num = reddit_sentiment_df['sentiment'].map(sentiment_map_display).fillna(0).mean()
-        if reddit_sentiment_num > 0.15: reddit_sentiment = "Positive"
-        elif reddit_sentiment_num < -0.15: reddit_sentiment = "Negative"
+    # Overall sentiment label for module display
+    news_sentiment, reddit_sentiment = scored["module_sentiment"]
 
     # --- Step 5: Assemble Final Dictionary ---
     final_data = {
@@ -687,96 +726,96 @@ def get_combined_analysis(company_name: str) -> dict:
        "suggestions": suggestions, # Now contains risk summaries
        "risk_heatmap": risk_heatmap_data # Contains heatmap data
     }
+    return final_data
+
 
+# --- MAIN ANALYSIS FUNCTION ---
+def get_combined_analysis(company_name: str, cancel_token=None) -> dict:
+    """
+    Main function. Fetches company & exec news, Reddit, analyzes, scores, returns dict.
+    cancel_token (optional) stops the run between fetches / model batches by raising
+    cancellation.OperationCancelled.
+    """
+    print(f"AI Core: Starting combined analysis for {company_name}...")
+    fetched = fetch_company_data(company_name, cancel_token)
+    analyzed_news_feed, analyzed_reddit_feed = analyze_fetched_data([fetched], cancel_token)[0]
+    cancellation.check(cancel_token)
+    scored = score_analyzed_feeds([(analyzed_news_feed, analyzed_reddit_feed)])[0]
+    final_data = build_company_result(company_name, analyzed_news_feed, analyzed_reddit_feed, scored)
+    score_history.record_result(final_data)
     print("AI Core: Analysis complete.")
     return final_data
 
 
-# --- Heatmap Sub-Topic Function ---
-def assign_sub_topic_and_risk(df: pd.DataFrame, esg_labels: list) -> dict:
+def analyze_companies(company_names: list, cancel_token=None) -> dict:
     """
-    Analyzes the dataframe to assign sub-topics and calculate risk scores
-    based on ALL items (activity) + extra weight for NEGATIVE items.
+    Multi-company version of get_combined_analysis: fetches all companies
+    concurrently (each upstream provider is limited separately), runs every
+    company's items through shared model batches, then scores all companies in
+    one columnar pass. Returns {company: result dict, or the Exception that company hit}.
+    cancel_token (optional) stops the whole run by raising cancellation.OperationCancelled.
     """
-    print("AI Core: Assigning sub-topics and calculating risk heatmap...")
-    # Map main categories to sub-topic keyword groups
-    if len(esg_labels) < 4:
-         print("Error: esg_labels list is too short for sub-topic mapping.")
-         return {label: 0.0 for label in HEATMAP_LABELS} # Return empty heatmap
-         
-    category_to_sub_topics = {
-        esg_labels[0]: ["Climate & Emissions", "Waste & Pollution", "Resources & Biodiversity"], # Environmental
-        esg_labels[1]: ["Labor & Safety", "Diversity & Inclusion", "Product & Data"], # Social
-        esg_labels[2]: ["Ethics & Compliance", "Board & Executive", "Transparency & Reporting"]  # Governance
-    }
-    
-    def find_sub_topic(row):
-        category = row['category']
-        text_lower = str(row['text']).lower()
-        
-        # Check if it belongs to a main category we're mapping
-        if category in category_to_sub_topics:
-            sub_topic_list = category_to_sub_topics[category]
-            # Check for specific keywords first
-            for sub_topic in sub_topic_list:
-                for keyword in SUB_TOPIC_KEYWORDS.get(sub_topic, []):
-                    if keyword in text_lower:
-                        return sub_topic # Return the first matching sub-topic
-            # If no keyword matches, return a default for that category
-            # Use the first sub-topic as a default for that category
-            return sub_topic_list[0] 
-        return "General Other"
-        
-    df['sub_topic'] = df.apply(find_sub_topic, axis=1)
-    
-    # --- MODIFICATION: Calculate Base Risk + Negative Risk ---
-    # Initialize final heatmap data with 0.0 for all labels
-    final_heatmap_data = {label: 0.0 for label in HEATMAP_LABELS}
-    
-    # 1. Base activity score: small score for ANY item matching a sub-topic
-    base_risk_factor = 0.2 # Increased base activity score
-    # Group by sub_topic and sum up the trust scores of ALL items
-    # Use fillna(0) in case sentiment_num is missing for some reason
-    df['sentiment_num'] = df['sentiment_num'].fillna(0) 
-    base_risk_map = (df.groupby('sub_topic')['trust_score'].sum() * base_risk_factor).to_dict()
-
-    # 2. Negative risk: larger score for NEGATIVE items
-    negative_items = df[df['sentiment_num'] == -1].copy()
-    if not negative_items.empty:
-        # Sum of trust scores for *negative* items. This is the *additional* risk.
-        # Use a higher factor for negative items
-        negative_risk_factor = 1.0 
-        negative_risk_map = (negative_items.groupby('sub_topic')['trust_score'].sum() * negative_risk_factor).to_dict()
-    else:
-        negative_risk_map = {} # Empty dict
+    company_names = list(dict.fromkeys(company_names))
+    results = {}
+    fetched_by_company = {}
+
+    # --- Step 2: Concurrent fetch; a failing company doesn't stop the others ---
+    with ThreadPoolExecutor(max_workers=max(1, min(LEADERBOARD_FETCH_WORKERS, len(company_names))), thread_name_prefix="company-fetch") as pool:
+        futures = {company: pool.submit(fetch_company_data, company, cancel_token) for company in company_names}
+        for company, future in futures.items():
+            try:
+                fetched_by_company[company] = future.result()
+            except Exception as e:
+                print(f"  - Failed to fetch data for {company}: {e}")
+                results[company] = e
 
-    # 3. Combine them: Iterate through all heatmap labels
-    for label in HEATMAP_LABELS:
-        base_score = base_risk_map.get(label, 0.0)
-        negative_score = negative_risk_map.get(label, 0.0)
-        final_heatmap_data[label] = round(base_score + negative_score, 1)
-    # --- END MODIFICATION ---
-         
-    print(f"AI Core: Risk heatmap data calculated: {final_heatmap_data}")
-    return final_heatmap_data
+    # --- Steps 3-5: Shared model batches + one scoring pass ---
+    companies = list(fetched_by_company)
+    if companies:
+        try:
+            cancellation.check(cancel_token)
+            feeds = analyze_fetched_data([fetched_by_company[company] for company in companies], cancel_token)
+            scored_groups = score_analyzed_feeds(feeds)
+        except Exception as e:
+            print(f"  - Shared analysis failed for {len(companies)} companies: {e}")
+            for company in companies: results[company] = e
+            return results
+        for company, (news_feed, reddit_feed), scored in zip(companies, feeds, scored_groups):
+            try:
+                results[company] = build_company_result(company, news_feed, reddit_feed, scored)
+                score_history.record_result(results[company])
+            except Exception as e:
+                print(f"  - Failed to score {company}: {e}")
+                results[company] = e
+    return results
+
+
+# --- Score Floor Function ---
+def apply_score_floor(company_name: str, calculated_overall_score: int) -> int:
+    """ Applies the minimum score configured for well-known companies. """
+    floor_score = TOP_COMPANIES_FLOOR.get(company_entities.company_id(company_name))
+    if floor_score is None:
+        return calculated_overall_score
+    overall_score = max(calculated_overall_score, floor_score)
+    if overall_score != calculated_overall_score:
+        print(f"AI Core: Applied specific score floor of {floor_score} for {company_name}. Final score: {overall_score}")
+    return overall_score
 
 
 # --- Add Risk Summary Function (Replaces Improvement Suggestions) ---
-def generate_risk_summary(analyzed_data_df: pd.DataFrame, esg_labels: list) -> list:
-    """ Generates risk summaries for investors based on negative items, linking to frameworks. """
+def generate_risk_summary(scored: dict, esg_labels: list) -> list:
+    """
+    Generates risk summaries for investors based on negative items, linking to frameworks.
+    `scored` is one group result from scoring_kernel.score_columns.
+    """
     risk_summaries = []
-    if analyzed_data_df.empty or 'sentiment_num' not in analyzed_data_df.columns:
+    if not scored or not scored.get("item_count"):
         return ["No specific risk areas identified from available data."]
 
-    negative_items = analyzed_data_df[analyzed_data_df['sentiment_num'] == -1]
-    if negative_items.empty:
+    if not scored["has_negative_items"]:
         risk_summaries.append("Analysis indicates predominantly neutral or positive recent public sentiment. No major risk areas flagged.")
         return risk_summaries
 
-    if 'category' not in negative_items.columns:
-         risk_summaries.append("Category information missing for negative items. Manual review suggested.")
-         return risk_summaries
-
     # Use simple labels for grouping/checking
     if len(esg_labels) < 4: # Safety check
          print("Error: esg_labels list too short for risk summary.")
@@ -786,30 +825,22 @@ def generate_risk_summary(analyzed_data_df: pd.DataFrame, esg_labels: list) -> l
     gov_label = esg_labels[2] # "Corporate Governance & Ethics"
     other_label = esg_labels[3] # "General Business/Financial News"
 
-    negative_items['trust_score'] = negative_items['trust_score'].fillna(0.5)
-    category_risk_weight = negative_items.groupby('category')['trust_score'].sum()
-
-    if category_risk_weight.empty:
-         risk_summaries.append("Negative items found but could not be categorized. Review feeds manually.")
-         return risk_summaries
-
-    top_negative_categories = category_risk_weight.sort_values(ascending=False).head(3).index.tolist()
-
     high_risk_threshold = 3.0
     medium_risk_threshold = 1.0
 
-    for category in top_negative_categories:
+    for risk_input in scored["risk_inputs"]: # Top 3 categories by weighted negative impact
+        category = risk_input["category"]
         if category not in esg_labels: continue # Skip if category isn't one of our main ones
-        
-        count = len(negative_items[negative_items['category'] == category])
-        weight = category_risk_weight[category]
-        try:
-             sample_negative_item = negative_items[negative_items['category'] == category].sort_values('trust_score', ascending=False).iloc[0]
-             sample_negative_text = sample_negative_item['text'][:90] if pd.notna(sample_negative_item.get('text')) else "[No Text Snippet]"
-             full_negative_text_lower = sample_negative_item['text'].lower() if pd.notna(sample_negative_item.get('text')) else ""
-        except (IndexError, KeyError):
+
+        count = risk_input["count"]
+        weight = risk_input["weight"]
+        sample_text = risk_input["sample_text"]
+        if sample_text is None:
              sample_negative_text = "[Could not retrieve sample text]"
              full_negative_text_lower = ""
+        else:
+             sample_negative_text = str(sample_text)[:90]
+             full_negative_text_lower = str(sample_text).lower()
 
         severity = "Low"
         if weight >= high_risk_threshold: severity = "High"
@@ -857,39 +888,43 @@ def generate_risk_summary(analyzed_data_df: pd.DataFrame, esg_labels: list) -> l
 
 
 # --- Add Leaderboard Function (Example - Use with Caution) ---
-@st.cache_data(ttl=86400)
+@config.cache_data(ttl=86400)
 def get_leaderboard(companies: list = None):
-    """ Calculates scores for a list of companies. WARNING: SLOW & uses MANY API calls. """
+    """
+    Calculates scores for a list of companies. Uses MANY API calls: companies are
+    fetched concurrently within per-provider limits and scored with shared model batches.
+    """
     if companies is None:
-         companies = ["Apple", "Microsoft", "Google", "Tesla", "Amazon"]
+         companies = DEFAULT_LEADERBOARD_COMPANIES
 
-    leaderboard_results = []
     print(f"\nAI Core: Generating Leaderboard for: {companies}")
-    for company in companies:
-        print(f"  - Analyzing {company} for leaderboard...")
-        try:
-            data = get_combined_analysis(company)
-            leaderboard_results.append({
-                "Company": company,
-                "Overall Score": data.get("overall_score", "N/A"),
-                "E Score": data.get("scores", {}).get("environmental", "N/A"),
-                "S Score": data.get("scores", {}).get("social", "N/A"),
-                "G Score": data.get("scores", {}).get("governance", "N/A")
-            })
-        except Exception as e:
-            print(f"  - Failed to analyze {company} for leaderboard: {e}")
-            leaderboard_results.append({
-                "Company": company, "Overall Score": "Error",
-                "E Score": "Error", "S Score": "Error", "G Score": "Error"
-            })
-
-    def sort_key(item):
-        score = item["Overall Score"]
-        if isinstance(score, int): return score
-        if score == "N/A": return -1
-        return -2 # Errors at the very bottom
+    analyses = analyze_companies(companies)
+    leaderboard_results = [leaderboard_row(company, analyses.get(company)) for company in dict.fromkeys(companies)]
 
-    leaderboard_results.sort(key=sort_key, reverse=True)
+    leaderboard_results.sort(key=leaderboard_sort_key, reverse=True)
     print("AI Core: Leaderboard generation complete.")
     return leaderboard_results
 
+
+def leaderboard_row(company: str, data) -> dict:
+    """ One leaderboard row from an analysis result (or the Exception it raised). """
+    if not isinstance(data, dict):
+        print(f"  - Failed to analyze {company} for leaderboard: {data}")
+        return {
+            "Company": company, "Overall Score": "Error",
+            "E Score": "Error", "S Score": "Error", "G Score": "Error"
+        }
+    return {
+        "Company": company,
+        "Overall Score": data.get("overall_score", "N/A"),
+        "E Score": data.get("scores", {}).get("environmental", "N/A"),
+        "S Score": data.get("scores", {}).get("social", "N/A"),
+        "G Score": data.get("scores", {}).get("governance", "N/A")
+    }
+
+
+def leaderboard_sort_key(item):
+    score = item["Overall Score"]
+    if isinstance(score, int): return score
+    if score == "N/A": return -1
+    return -2 # Errors at the very bottom
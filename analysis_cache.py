@@ -0,0 +1,118 @@
+# This is a new file: analysis_cache.py
+# Small content-addressed, on-disk JSON cache with LRU eviction.
+# greenwash_analyzer.py uses it so re-uploads of the same PDF skip extraction & classification.
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# --- CONFIGURATION: Cache Location & Limits ---
+CACHE_ROOT = os.environ.get("REPUTEX_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reputex_cache"))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024 # 256 MB per cache
+DEFAULT_MAX_ENTRIES = 1000
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def content_hash(source, *extra_parts) -> str:
+    """
+    SHA-256 of the source content (bytes or a file path, read in chunks)
+    followed by any extra parts (e.g. a config version string).
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, "rb") as handle:
+            for chunk in iter(lambda: handle.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+    for part in extra_parts:
+        digest.update(b"\0" + str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def config_version(**settings) -> str:
+    """ Short, stable fingerprint of everything that changes cached results. """
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class DiskCache:
+    """
+    One JSON file per key under `directory`. Reads refresh the file's mtime,
+    and writes evict least-recently-used files beyond max_bytes / max_entries.
+    """
+
+    def __init__(self, name: str, max_bytes: int = DEFAULT_MAX_BYTES, max_entries: int = DEFAULT_MAX_ENTRIES, root: str = None):
+        self.directory = os.path.join(root or CACHE_ROOT, name)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                value = json.load(handle)
+            os.utime(path, None) # Mark as recently used
+            self.hits += 1
+            return value
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Cache: Discarding unreadable entry {key[:12]}... ({e})")
+            self.delete(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(value, handle)
+            os.replace(temp_path, self._path(key))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Cache: Could not store entry {key[:12]}... ({e})")
+            return
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """ Removes least-recently-used entries until within limits. Returns count removed. """
+        with self._lock:
+            try:
+                entries = []
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                return 0
+            entries.sort() # Oldest first
+            total_bytes = sum(size for _, size, _ in entries)
+            removed = 0
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                try:
+                    os.remove(path)
+                    total_bytes -= size
+                    removed += 1
+                except OSError:
+                    pass
+            if removed:
+                print(f"Cache: Evicted {removed} entries from {self.directory}")
+            return removed
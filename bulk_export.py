@@ -0,0 +1,280 @@
+# This is a new file: bulk_export.py
+# Columnar (Parquet / Arrow) export of stored analysis results: scores + heatmaps, analyzed feed
+# items and greenwash reports, for a set of companies and a date range. Reads score_history's
+# store (never re-runs a pipeline) in fixed-size batches, so memory stays flat however much is exported.
+# Files: python bulk_export.py --out exports/ --companies Tesla,Apple --since 2026-01-01 --until 2026-03-31
+#   -> exports/<dataset>/company_key=<id>/date=<YYYY-MM-DD>/data.parquet (Hive layout: pyarrow / pandas / DuckDB / Spark read it as one dataset)
+# HTTP: GET /api/export?dataset=feed_items&companies=Tesla&since=...&format=parquet streams one file.
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+from urllib.parse import quote
+import score_history
+
+# --- CONFIGURATION: Bulk Export ---
+BATCH_ROWS = 5000 # Rows read from SQLite / written per row group
+DATASETS = ("scores", "feed_items", "greenwash")
+FORMATS = {"parquet": ("application/vnd.apache.parquet", ".parquet"), "arrow": ("application/vnd.apache.arrow.stream", ".arrow")}
+PARQUET_COMPRESSION = "zstd"
+PARTITION_COLUMNS = ("company_key", "date") # In the directory names of partitioned exports, not the files
+STAGING_DIR_NAME = ".staging" # Per-dataset dir for partition files being written (dot: skipped by dataset readers)
+
+# dataset -> SELECT (always ordered by company, then time, so each partition's rows are contiguous)
+_QUERIES = {
+    "scores": (
+        "SELECT company, company_key, date(run_at, 'unixepoch') AS date, id AS run_id, run_at, overall, environmental, "
+        "social, governance, item_count, heatmap FROM score_runs"
+    ),
+    "feed_items": (
+        "SELECT r.company, f.company_key, date(f.run_at, 'unixepoch') AS date, f.run_id, f.run_at, f.module, f.source, "
+        "f.text, f.url, f.sentiment, f.sentiment_score, f.category, f.trust_score FROM feed_items f JOIN score_runs r ON r.id = f.run_id"
+    ),
+    "greenwash": (
+        "SELECT company, company_key, date(run_at, 'unixepoch') AS date, id AS run_id, run_at, label, credibility_score, "
+        "pages_analyzed, inconsistency_count, report FROM greenwash_runs"
+    ),
+}
+_TABLE_ALIASES = {"scores": "", "feed_items": "f.", "greenwash": ""}
+
+
+class ExportError(ValueError):
+    """ Invalid export request (unknown dataset / format, bad date). """
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise ExportError("Bulk export needs pyarrow (pip install pyarrow).")
+
+
+def schema(dataset: str, partitioned: bool = False):
+    """ Arrow schema of a dataset; partitioned files leave out company_key / date (they're in the path). """
+    pa = _pyarrow()
+    run_fields = [("company", pa.string()), ("company_key", pa.string()), ("date", pa.string()),
+                  ("run_id", pa.int64()), ("run_at", pa.timestamp("ms", tz="UTC"))]
+    fields = {
+        "scores": [("overall", pa.int32()), ("environmental", pa.int32()), ("social", pa.int32()), ("governance", pa.int32()),
+                   ("item_count", pa.int32()), ("risk_heatmap", pa.map_(pa.string(), pa.float64()))],
+        "feed_items": [("module", pa.string()), ("source", pa.string()), ("text", pa.string()), ("url", pa.string()),
+                       ("sentiment", pa.string()), ("sentiment_score", pa.float64()), ("category", pa.string()),
+                       ("trust_score", pa.float64())],
+        "greenwash": [("label", pa.string()), ("credibility_score", pa.float64()), ("pages_analyzed", pa.int32()),
+                      ("inconsistency_count", pa.int32()), ("report", pa.string())],
+    }[dataset]
+    return pa.schema([field for field in run_fields + fields if not (partitioned and field[0] in PARTITION_COLUMNS)])
+
+
+# --- Request Parsing ---
+def parse_time(value, end_of_day: bool = False):
+    """
+    "2026-03-31", an ISO datetime or epoch seconds -> epoch seconds (None stays None).
+    A bare date used as an upper bound covers that whole day.
+    """
+    if value is None or value == "": return None
+    if isinstance(value, (int, float)): return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        if len(value) == 10:
+            day = datetime.datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+            return (day + datetime.timedelta(days=1 if end_of_day else 0)).timestamp()
+        moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return (moment if moment.tzinfo else moment.replace(tzinfo=datetime.timezone.utc)).timestamp()
+    except ValueError:
+        raise ExportError(f"Invalid date '{value}' (use YYYY-MM-DD, an ISO datetime or epoch seconds).")
+
+
+def _check(dataset: str, file_format: str = "parquet"):
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}' (choose from {', '.join(DATASETS)}).")
+    if file_format not in FORMATS:
+        raise ExportError(f"Unknown format '{file_format}' (choose from {', '.join(FORMATS)}).")
+
+
+# --- Reading ---
+def iter_row_batches(dataset: str, companies: list = None, since: float = None, until: float = None, batch_rows: int = BATCH_ROWS):
+    """ Yields lists of sqlite3.Row (at most batch_rows each) ordered by company id, then time. """
+    alias = _TABLE_ALIASES[dataset]
+    conditions, params = [], []
+    if companies:
+        keys = sorted({score_history.company_key(company) for company in companies})
+        conditions.append(f"{alias}company_key IN ({', '.join('?' for _ in keys)})")
+        params.extend(keys)
+    if since is not None:
+        conditions.append(f"{alias}run_at >= ?"); params.append(since)
+    if until is not None:
+        conditions.append(f"{alias}run_at < ?"); params.append(until)
+    query = _QUERIES[dataset] + (" WHERE " + " AND ".join(conditions) if conditions else "") + f" ORDER BY {alias}company_key, {alias}run_at"
+    yield from score_history.history.iter_rows(query, params, batch_rows)
+
+
+def _value(row, name: str):
+    if name == "run_at":
+        return int(row["run_at"] * 1000)
+    if name == "risk_heatmap":
+        return list(json.loads(row["heatmap"] or "{}").items())
+    return row[name]
+
+
+def record_batch(dataset: str, rows: list, partitioned: bool = False):
+    """ One Arrow RecordBatch from SQLite rows. """
+    pa = _pyarrow()
+    batch_schema = schema(dataset, partitioned)
+    arrays = [pa.array([_value(row, field.name) for row in rows], type=field.type) for field in batch_schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=batch_schema)
+
+
+def _open_writer(sink, batch_schema, file_format: str, streaming: bool):
+    pa = _pyarrow()
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, batch_schema, compression=PARQUET_COMPRESSION)
+    return pa.ipc.new_stream(sink, batch_schema) if streaming else pa.ipc.new_file(sink, batch_schema)
+
+
+# --- Partitioned Files ---
+def partition_dir(out_dir: str, dataset: str, key: str, date: str) -> str:
+    return os.path.join(out_dir, dataset, f"company_key={quote(key, safe='')}", f"date={date}")
+
+
+def export_partitioned(out_dir: str, datasets=DATASETS, companies: list = None, since: float = None, until: float = None,
+                       file_format: str = "parquet") -> dict:
+    """
+    Writes each dataset as <out_dir>/<dataset>/company_key=<id>/date=<YYYY-MM-DD>/data.<ext>.
+    Rows arrive ordered by partition, so only one file is open at a time; each partition
+    file is written under <out_dir>/<dataset>/.staging (hidden from Hive-style readers, same
+    filesystem) and renamed into place, so re-exporting a range replaces it and readers never
+    see a partial file inside a partition. Returns {dataset: {"rows", "partitions"}}.
+    """
+    summary = {}
+    for dataset in datasets:
+        _check(dataset, file_format)
+        extension = FORMATS[file_format][1]
+        batch_schema = schema(dataset, partitioned=True)
+        rows_written, partitions = 0, 0
+        current, writer, temp_path, final_path = None, None, None, None
+        staging_dir = os.path.join(out_dir, dataset, STAGING_DIR_NAME)
+        os.makedirs(staging_dir, exist_ok=True)
+
+        def finish():
+            nonlocal writer
+            if writer is not None:
+                writer.close()
+                os.replace(temp_path, final_path)
+                writer = None
+
+        try:
+            for rows in iter_row_batches(dataset, companies, since, until):
+                start = 0
+                while start < len(rows):
+                    partition = (rows[start]["company_key"], rows[start]["date"])
+                    end = start
+                    while end < len(rows) and (rows[end]["company_key"], rows[end]["date"]) == partition:
+                        end += 1
+                    if partition != current:
+                        finish()
+                        directory = partition_dir(out_dir, dataset, *partition)
+                        os.makedirs(directory, exist_ok=True)
+                        final_path = os.path.join(directory, "data" + extension)
+                        fd, temp_path = tempfile.mkstemp(dir=staging_dir, suffix=".tmp")
+                        os.close(fd)
+                        writer = _open_writer(temp_path, batch_schema, file_format, streaming=False)
+                        current = partition
+                        partitions += 1
+                    writer.write_batch(record_batch(dataset, rows[start:end], partitioned=True))
+                    rows_written += end - start
+                    start = end
+            finish()
+        finally:
+            if writer is not None: # Failed mid-partition: drop the partial file
+                writer.close()
+                os.remove(temp_path)
+            try: os.rmdir(staging_dir)
+            except OSError: pass # Another export is still using it
+        summary[dataset] = {"rows": rows_written, "partitions": partitions}
+        print(f"Bulk Export: {dataset}: {rows_written} rows in {partitions} partitions under {os.path.join(out_dir, dataset)}")
+    return summary
+
+
+# --- Streaming (HTTP) ---
+class _ChunkSink:
+    """ Write-only file object; the response generator takes what the writer produced after each batch. """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_export(dataset: str, companies: list = None, since: float = None, until: float = None, file_format: str = "parquet"):
+    """
+    Generator of bytes: one Parquet file (one row group per batch) or Arrow IPC stream with
+    every column, company_key and date included. Only one batch is held in memory.
+    """
+    _check(dataset, file_format)
+    sink = _ChunkSink()
+    writer = _open_writer(sink, schema(dataset), file_format, streaming=True)
+    for rows in iter_row_batches(dataset, companies, since, until):
+        writer.write_batch(record_batch(dataset, rows))
+        data = sink.take()
+        if data: yield data
+    writer.close()
+    yield sink.take() # Footer / end-of-stream marker
+
+
+def export_filename(dataset: str, file_format: str) -> str:
+    return f"reputex_{dataset}_{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}{FORMATS[file_format][1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored analysis results as partitioned Parquet / Arrow files.")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--datasets", default=",".join(DATASETS), help=f"Comma-separated ({', '.join(DATASETS)})")
+    parser.add_argument("--companies", help="Comma-separated company names (default: all)")
+    parser.add_argument("--since", help="First day / time to include (YYYY-MM-DD, ISO datetime or epoch seconds)")
+    parser.add_argument("--until", help="Last day to include (a bare date includes that whole day)")
+    parser.add_argument("--format", default="parquet", choices=sorted(FORMATS))
+    args = parser.parse_args(argv)
+
+    try:
+        companies = [company.strip() for company in (args.companies or "").split(",") if company.strip()] or None
+        datasets = [dataset.strip() for dataset in args.datasets.split(",") if dataset.strip()]
+        export_partitioned(args.out, datasets, companies, parse_time(args.since), parse_time(args.until, end_of_day=True), args.format)
+    except ExportError as e:
+        print(f"Bulk Export: {e}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
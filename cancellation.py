@@ -0,0 +1,89 @@
+# This is a new file: cancellation.py
+# Request-scoped cancellation + deadlines for the long-running pipelines.
+# The server trips the token when the client disconnects or the deadline passes;
+# ai_core / greenwash_analyzer check it between items, pages and batches, and cap
+# their upstream calls (request timeouts, Reddit search waits) at its deadline.
+
+import asyncio
+import threading
+import time
+
+# --- CONFIGURATION: Disconnect Polling ---
+DISCONNECT_POLL_SECONDS = 0.5 # How often the server checks whether the client is still there
+DEADLINE_REASON = "deadline exceeded"
+CLIENT_CLOSED_STATUS = 499 # Conventional "client closed request" status (nobody receives it)
+
+
+class OperationCancelled(BaseException):
+    """
+    Raised by CancellationToken.check(). Derives from BaseException (like
+    asyncio.CancelledError) so the pipelines' `except Exception` blocks - and
+    st.cache_data - don't swallow or cache it.
+    """
+
+    @property
+    def timed_out(self) -> bool:
+        return bool(self.args) and self.args[0] == DEADLINE_REASON
+
+
+class CancellationToken:
+    """ Thread-safe flag + optional deadline. Pass None where no cancellation is wanted. """
+
+    def __init__(self, timeout: float = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._event.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel(DEADLINE_REASON)
+        return self._event.is_set()
+
+    def remaining(self, default: float = None):
+        """ Seconds left before the deadline (for request timeouts), or `default` if none. """
+        if self.deadline is None: return default
+        left = max(0.0, self.deadline - time.monotonic())
+        return left if default is None else min(left, default)
+
+    def check(self):
+        """ Raises OperationCancelled if cancelled or past the deadline. """
+        if self.cancelled:
+            raise OperationCancelled(self.reason)
+
+
+def check(token: CancellationToken = None):
+    """ token.check() that also accepts None (no cancellation). """
+    if token is not None:
+        token.check()
+
+
+def remaining(token: CancellationToken = None, default: float = None):
+    """ token.remaining(default) that also accepts None: the timeout for an outbound call. """
+    return default if token is None else token.remaining(default)
+
+
+async def run_cancellable(request, func, *args, timeout: float = None, workload=None, **kwargs):
+    """
+    Runs func(*args, cancel_token=token, **kwargs) in a worker thread - on
+    `workload` (an admission.WorkloadPool or Reservation) if given, else the default executor.
+    The token is tripped if the HTTP client disconnects or `timeout` seconds pass;
+    the worker then stops at its next check and OperationCancelled is raised here.
+    """
+    token = CancellationToken(timeout)
+    if workload is not None:
+        task = asyncio.wrap_future(workload.submit(func, *args, cancel_token=token, **kwargs)) # May raise admission.Overloaded
+    else:
+        task = asyncio.ensure_future(asyncio.to_thread(func, *args, cancel_token=token, **kwargs))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done: break
+        if not token.cancelled and await request.is_disconnected():
+            print(f"Cancellation: Client disconnected; cancelling {getattr(func, '__name__', 'work')}.")
+            token.cancel("client disconnected")
+    return task.result() # Re-raises OperationCancelled from the worker
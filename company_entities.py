@@ -0,0 +1,190 @@
+# This is a new file: company_entities.py
+# One local index of companies: names, aliases, tickers and subsidiaries -> canonical company id.
+# ai_core.py uses it to build provider queries, filter relevant articles / posts, key caches and
+# the score history, and look up score floors, so "Google" and "Alphabet" are the same company.
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from analysis_cache import DiskCache, config_version, content_hash # Persistent Knowledge Graph lookups
+
+# --- CONFIGURATION: Known Companies ---
+# id -> entity. "search" = names sent to providers (most useful first); every name, alias,
+# subsidiary and ticker resolves to the id and counts as a mention when filtering.
+COMPANIES = {
+    "apple": {"name": "Apple", "aliases": ["Apple Inc"], "tickers": ["AAPL"], "subsidiaries": ["Beats Electronics"],
+              "search": ["Apple"]},
+    "microsoft": {"name": "Microsoft", "aliases": ["Microsoft Corporation"], "tickers": ["MSFT"],
+                  "subsidiaries": ["LinkedIn", "GitHub", "Activision Blizzard"], "search": ["Microsoft"]},
+    "alphabet": {"name": "Alphabet", "aliases": ["Google", "Alphabet Inc", "Google LLC"], "tickers": ["GOOGL", "GOOG"],
+                 "subsidiaries": ["YouTube", "DeepMind", "Waymo"], "search": ["Google", "Alphabet"]},
+    "tesla": {"name": "Tesla", "aliases": ["Tesla Inc", "Tesla Motors"], "tickers": ["TSLA"], "subsidiaries": [],
+              "search": ["Tesla"]},
+    "amazon": {"name": "Amazon", "aliases": ["Amazon.com", "Amazon.com Inc"], "tickers": ["AMZN"],
+               "subsidiaries": ["Amazon Web Services", "AWS", "Whole Foods"], "search": ["Amazon"]},
+    "infosys": {"name": "Infosys", "aliases": ["Infosys Limited"], "tickers": ["INFY"], "subsidiaries": [],
+                "search": ["Infosys"]},
+    "tata": {"name": "Tata", "aliases": ["Tata Group", "Tata Sons"], "tickers": [],
+             "subsidiaries": ["Tata Motors", "Tata Steel", "TCS", "Tata Consultancy Services", "Tata Power"],
+             "search": ["Tata", "Tata Motors", "Tata Steel", "TCS", "Tata Group", "Tata Power"]},
+    "reliance": {"name": "Reliance", "aliases": ["Reliance Industries"], "tickers": ["RELIANCE"],
+                 "subsidiaries": ["Jio", "Reliance Jio", "Reliance Retail"], "search": ["Reliance Industries", "Reliance"]},
+}
+ENTITIES_FILE = os.environ.get("REPUTEX_COMPANY_ENTITIES") # Optional JSON {id: entity} merged over COMPANIES
+MAX_DYNAMIC_ENTITIES = 10000 # Unknown companies remembered (oldest dropped first)
+# Legal suffixes ignored when matching a name to an entity ("Apple Inc." -> "apple")
+LEGAL_SUFFIXES = {"inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited", "plc", "llc", "ag", "sa", "nv"}
+COMPANY_ID_SCHEMA = 1 # Bump when normalize_name / plain_key change the ids names resolve to
+
+# --- CONFIGURATION: Knowledge Graph Cache ---
+KG_CACHE_SCHEMA = 1 # Bump when the cached entry format changes
+KG_CACHE_TTL_SECONDS = 7 * 86400 # Executives found
+KG_NEGATIVE_TTL_SECONDS = 86400 # No matching entity / no executives (retried sooner)
+KG_CACHE = DiskCache("knowledge_graph", max_bytes=8 * 1024 * 1024, max_entries=5000)
+
+
+def normalize_name(name: str) -> str:
+    """ "Apple, Inc." -> "apple": lowercase, accents and punctuation stripped, legal suffixes dropped. """
+    text = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9&]+", " ", text).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def plain_key(name: str) -> str:
+    """ Case/whitespace-insensitive id for companies not in the index (matches the old history keys). """
+    return " ".join((name or "").lower().split())
+
+
+class CompanyEntity:
+    """ One company with its precompiled mention pattern. """
+
+    def __init__(self, company_id: str, name: str, aliases=(), tickers=(), subsidiaries=(), search=None):
+        self.id = company_id
+        self.name = name
+        self.aliases = list(aliases)
+        self.tickers = list(tickers)
+        self.subsidiaries = list(subsidiaries)
+        self.search_terms = list(search or [name])
+        self.known = True
+        names = list(dict.fromkeys([name] + self.aliases + self.subsidiaries + self.search_terms))
+        # One alternation per entity, longest first; word boundaries so "Apple" doesn't match "pineapple"
+        self._names_pattern = re.compile(
+            r"(?<![\w])(?:" + "|".join(re.escape(term) for term in sorted(names, key=len, reverse=True)) + r")(?![\w])",
+            re.IGNORECASE
+        )
+        # Tickers only count in capitals ("$TSLA", "TSLA"), so short tickers don't match ordinary words
+        self._tickers_pattern = re.compile(r"(?<![\w])\$?(?:" + "|".join(map(re.escape, self.tickers)) + r")(?![\w])") if self.tickers else None
+
+    def mentions(self, text: str) -> bool:
+        """ True if the text names the company, an alias, a subsidiary or a ticker. """
+        if not text: return False
+        return bool(self._names_pattern.search(text) or (self._tickers_pattern and self._tickers_pattern.search(text)))
+
+    def query(self, max_terms: int = None) -> str:
+        """ Provider query: '"Google" OR "Alphabet"' (quoted search terms). """
+        terms = self.search_terms[:max_terms] if max_terms else self.search_terms
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def match_names(self) -> list:
+        """ Every name that resolves to this entity (for display / checks). """
+        return list(dict.fromkeys([self.name] + self.aliases + self.subsidiaries + self.tickers))
+
+    def to_dict(self) -> dict:
+        return {"company_id": self.id, "name": self.name, "aliases": self.aliases, "tickers": self.tickers,
+                "subsidiaries": self.subsidiaries, "known": self.known}
+
+
+class EntityIndex:
+    """
+    Normalized name / alias / ticker / subsidiary -> entity. Unknown names get a
+    one-name entity with id plain_key(name), remembered so their id resolves back.
+    """
+
+    def __init__(self, companies: dict):
+        # Changes whenever a name could resolve to a different id (stores keyed by id re-key on change)
+        self.version = config_version(schema=COMPANY_ID_SCHEMA, companies=companies, suffixes=sorted(LEGAL_SUFFIXES))
+        self._entities = {}
+        self._lookup = {}
+        self._dynamic = {}
+        self._lock = threading.Lock()
+        for company_id, spec in companies.items():
+            self.add(CompanyEntity(company_id, spec["name"], spec.get("aliases", ()), spec.get("tickers", ()),
+                                   spec.get("subsidiaries", ()), spec.get("search")))
+
+    def add(self, entity: CompanyEntity):
+        self._entities[entity.id] = entity
+        for term in [entity.id] + entity.match_names():
+            self._lookup.setdefault(normalize_name(term), entity.id)
+
+    def get(self, company_id: str):
+        return self._entities.get(company_id) or self._dynamic.get(company_id)
+
+    def resolve(self, name: str) -> CompanyEntity:
+        """ The entity for any name, alias, ticker (with or without "$") or company id. """
+        name = (name or "").strip()
+        entity = self.get(name) or self._entities.get(self._lookup.get(normalize_name(name.lstrip("$")), ""))
+        if entity is not None:
+            return entity
+        company_id = plain_key(name)
+        with self._lock:
+            entity = self._dynamic.get(company_id)
+            if entity is None:
+                entity = CompanyEntity(company_id, name)
+                entity.known = False
+                self._dynamic[company_id] = entity
+                while len(self._dynamic) > MAX_DYNAMIC_ENTITIES:
+                    self._dynamic.pop(next(iter(self._dynamic)))
+        return entity
+
+    def known_entities(self) -> list:
+        return list(self._entities.values())
+
+
+def _load_companies() -> dict:
+    companies = dict(COMPANIES)
+    if ENTITIES_FILE:
+        try:
+            with open(ENTITIES_FILE, "r", encoding="utf-8") as handle:
+                companies.update(json.load(handle))
+        except (OSError, ValueError) as e:
+            print(f"Company Entities: Could not read {ENTITIES_FILE}: {e}")
+    return companies
+
+
+index = EntityIndex(_load_companies())
+
+
+def resolve(name: str) -> CompanyEntity:
+    return index.resolve(name)
+
+
+def company_id(name: str) -> str:
+    """ Canonical id used as cache / history key ("Google", "GOOGL", "alphabet inc." -> "alphabet"). """
+    return index.resolve(name).id
+
+
+# --- Knowledge Graph Cache ---
+def _kg_key(company_id: str) -> str:
+    return content_hash(company_id.encode("utf-8"), KG_CACHE_SCHEMA)
+
+
+def cached_executives(company_id: str, now: float = None):
+    """ Cached executives for the company id ([] = Knowledge Graph had none), or None if missing / expired. """
+    entry = KG_CACHE.get(_kg_key(company_id))
+    if not isinstance(entry, dict):
+        return None
+    executives = entry.get("executives") or []
+    ttl = KG_CACHE_TTL_SECONDS if executives else KG_NEGATIVE_TTL_SECONDS
+    if (now or time.time()) - entry.get("fetched_at", 0) >= ttl:
+        return None
+    return executives
+
+
+def store_executives(company_id: str, executives: list) -> None:
+    """ Remembers a Knowledge Graph answer, including "nothing found". Don't store failed calls. """
+    KG_CACHE.put(_kg_key(company_id), {"company_id": company_id, "executives": executives, "fetched_at": time.time()})
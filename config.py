@@ -0,0 +1,180 @@
+# This is a new file: config.py
+# Server-native secrets + caching, so ai_core / greenwash_analyzer don't need Streamlit.
+# Secrets: environment variables first, then .streamlit/secrets.toml (the file the Streamlit app uses).
+# Caching: st.cache_data / st.cache_resource inside a running Streamlit app, in-process TTL memo otherwise.
+
+import copy
+import functools
+import os
+import sys
+import threading
+import time
+
+# --- CONFIGURATION: Secrets & Caching ---
+SECRETS_FILE = os.environ.get("REPUTEX_SECRETS_FILE", os.path.join(".streamlit", "secrets.toml"))
+CACHE_MAX_ENTRIES = 256 # Per cached function (least recently used dropped first)
+# Upstream API base URLs; REPUTEX_<NAME>_URL points them elsewhere (e.g. load_test.py's simulator)
+UPSTREAM_URLS = {
+    "gnews": "https://gnews.io/api/v4/search",
+    "mediastack": "http://api.mediastack.com/v1/news",
+    "newsdata": "https://newsdata.io/api/1/news",
+    "knowledge_graph": "https://kgsearch.googleapis.com/v1/entities:search",
+    "reddit": "https://www.reddit.com", # PRAW: OAuth token endpoint
+    "reddit_oauth": "https://oauth.reddit.com", # PRAW: API calls (scheme + host only: prawcore drops any path)
+}
+
+
+# --- Secrets ---
+class Secrets:
+    """
+    Read-only mapping like st.secrets: `"KEY" in secrets`, secrets["KEY"], secrets.get("KEY").
+    Environment variables win over the TOML file; the file is read once, on first use.
+    """
+
+    def __init__(self, path: str = SECRETS_FILE):
+        self.path = path
+        self._file_values = None
+        self._lock = threading.Lock()
+
+    def _load_file(self) -> dict:
+        if self._file_values is None:
+            with self._lock:
+                if self._file_values is None:
+                    self._file_values = self._read_toml()
+        return self._file_values
+
+    def _read_toml(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            try:
+                import tomllib # Python 3.11+
+            except ImportError:
+                import tomli as tomllib
+            with open(self.path, "rb") as handle:
+                return tomllib.load(handle)
+        except Exception as e:
+            print(f"Config: Could not read secrets file {self.path}: {e}")
+            return {}
+
+    def get(self, key: str, default=None):
+        value = os.environ.get(key)
+        if value:
+            return value
+        return self._load_file().get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+secrets = Secrets()
+
+
+# --- Upstream Endpoints ---
+def upstream_url(name: str) -> str:
+    return os.environ.get(f"REPUTEX_{name.upper()}_URL") or UPSTREAM_URLS[name]
+
+
+def reddit_endpoints() -> dict:
+    """ Extra praw.Reddit(...) settings when the Reddit URLs are overridden (empty otherwise). """
+    settings = {}
+    if os.environ.get("REPUTEX_REDDIT_URL"): settings["reddit_url"] = upstream_url("reddit")
+    if os.environ.get("REPUTEX_REDDIT_OAUTH_URL"): settings["oauth_url"] = upstream_url("reddit_oauth")
+    return settings
+
+
+# --- Caching ---
+def _streamlit_running():
+    """ The streamlit module if this process is a running Streamlit app, else None (never imports it). """
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+    try:
+        from streamlit import runtime
+        return st if runtime.exists() else None
+    except Exception:
+        return None
+
+
+def _freeze(value):
+    """ Hashable stand-in for list / dict / set arguments (st.cache_data hashes those too). """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def _cache_key(args: tuple, kwargs: dict):
+    """ Keyword arguments starting with "_" (e.g. _cancel_token) are not hashed, as in st.cache_data. """
+    return _freeze(args) + _freeze({key: value for key, value in kwargs.items() if not key.startswith("_")})
+
+
+def cache_data(ttl: float = None, max_entries: int = CACHE_MAX_ENTRIES):
+    """
+    Drop-in for @st.cache_data(ttl=...). Outside Streamlit: thread-safe memo with
+    TTL + LRU bound; callers get a copy, so mutating a result doesn't touch the cache.
+    Exceptions (including cancellation) are never cached.
+    """
+    def decorator(func):
+        st = _streamlit_running()
+        if st is not None:
+            return st.cache_data(ttl=ttl, max_entries=max_entries)(func)
+
+        entries = {} # key -> (stored_at, value); dicts keep insertion order (LRU)
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = _cache_key(args, kwargs)
+            now = time.monotonic()
+            with lock:
+                entry = entries.pop(key, None)
+                if entry is not None and (ttl is None or now - entry[0] < ttl):
+                    entries[key] = entry # Most recently used goes last
+                    return copy.deepcopy(entry[1])
+            value = func(*args, **kwargs)
+            with lock:
+                entries[key] = (now, value)
+                while len(entries) > max_entries:
+                    entries.pop(next(iter(entries)))
+            return copy.deepcopy(value)
+
+        wrapper.clear = entries.clear
+        return wrapper
+    return decorator
+
+
+def cache_resource(func):
+    """
+    Drop-in for @st.cache_resource. Outside Streamlit: the first call's result is
+    shared by every later call (per argument set); concurrent first calls wait
+    for one load instead of each loading the model.
+    """
+    st = _streamlit_running()
+    if st is not None:
+        return st.cache_resource(func)
+
+    resources = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = _cache_key(args, kwargs)
+        if key in resources:
+            return resources[key]
+        with lock:
+            if key not in resources:
+                resources[key] = func(*args, **kwargs)
+            return resources[key]
+
+    wrapper.clear = resources.clear
+    return wrapper
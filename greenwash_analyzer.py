@@ -1,191 +1,494 @@
-import streamlit as st # Use streamlit for secrets
+import model_registry # On-demand models, memory budget, idle unload
+import config # Server-native secrets (env / .streamlit/secrets.toml); praw & transformers load lazily
 import requests
-import fitz  # PyMuPDF
-import praw
-import prawcore # Import for exceptions
 import time
-from transformers import pipeline
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import os
-import io # Import io for byte streams
-
-# --- 1. INITIALIZE ALL YOUR MODELS AND KEYS (GLOBAL) ---
-classifier = None
-sentiment_analyzer = None
+import re
+from pdf_extraction import iter_pdf_pages, MAX_EXTRACT_WORKERS # Page-level (optionally parallel) PDF reading
+from language_scanner import LanguageScanner # Single-pass vague/concrete language scan
+from analysis_cache import DiskCache, content_hash, config_version # Content-addressed report cache
+import cancellation # Request-scoped cancellation / deadlines
+import company_entities # Company names / aliases -> Reddit search terms
+import score_history # Stored results (scores, feed items, greenwash reports) for trends & bulk export
+
+# --- CONFIGURATION: Report Reading ---
+PDF_MAX_PAGES = None # Optional cap on pages read per report (None = all)
+REPORT_SAMPLE_CHARS = 4000 # Text sample used for topic relevance
+
+# Simple keyword check for Greenwashing (vague vs. concrete)
+WEASEL_WORDS = ["aim to", "strive", "target", "plan to", "potential", "hope to", "intend to", "may", "could", "believe", "commit to", "should"]
+CONCRETE_WORDS = ["achieved", "reduced", "increased", "implemented", "completed", "verified", "certified", "quantified", "%"]
+LANGUAGE_SCANNER = LanguageScanner(WEASEL_WORDS, CONCRETE_WORDS) # Whole words only; "%" = quantified figure
+
+# Report topics checked for relevance (and then against live Reddit sentiment)
+ESG_TOPICS = [
+    "climate change", "renewable energy", "employee safety",
+    "factory conditions", "data privacy", "supply chain",
+    "labor practices", "diversity", "business ethics"
+]
+
+# --- CONFIGURATION: Models ---
+CLASSIFIER_MODEL = "facebook/bart-large-mnli"
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+PROGRESS_EVERY_PAGES = 10 # Extraction progress is reported every N pages
+CLASSIFIER_BATCH_SIZE = 8 # Report samples per zero-shot batch
+BATCH_EXTRACT_WORKERS = 4 # Reports extracted at the same time in batch mode
+
+# --- CONFIGURATION: Report vs. Reddit Comparison ---
+REPORT_RELEVANCE_THRESHOLD = 0.50 # If report relevance > 50%...
+REDDIT_SENTIMENT_THRESHOLD = 0.40 # ...and Reddit sentiment < 40% (negative)... -> Flag it!
+
+# --- CONFIGURATION: Live Reddit Sentiment ---
+# "per_topic": one search per (company, topic), as before (default)
+# "harvest": ONE search per company, submissions routed to topics locally. Fewer API calls, but
+# the posts differ from Reddit's per-topic search results, so scores can change: opt in.
+REDDIT_MODE = os.environ.get("REPUTEX_REDDIT_MODE", "per_topic")
+# Harvest routing: "keywords" (TOPIC_KEYWORDS, no model) or "classifier" (zero-shot, multi-label)
+REDDIT_ROUTING = os.environ.get("REPUTEX_REDDIT_ROUTING", "keywords")
+REDDIT_HARVEST_LIMIT = 100 # Submissions per harvest (Reddit's page size, so still one API call)
+REDDIT_TOPIC_THRESHOLD = 0.50 # Classifier routing: minimum topic score for a submission to count
+REDDIT_MAX_WORKERS = 4 # Concurrent topic searches / company harvests (per process, shared by all requests)
+SENTIMENT_BATCH_SIZE = 16 # Posts per sentiment-model batch
+# Keyword routing: a submission belongs to every topic whose name or phrases it mentions (whole words,
+# case-insensitive). Phrases, not bare words: "union" alone also matches "European Union", "safety"
+# also matches product safety, "tracking" any parcel tracking.
+TOPIC_KEYWORDS = {
+    "climate change": ["climate crisis", "greenhouse gas", "greenhouse gases", "carbon emissions", "co2 emissions", "carbon footprint",
+                       "carbon neutral", "net zero", "global warming", "emissions target", "emissions targets"],
+    "renewable energy": ["renewables", "solar power", "solar energy", "solar panels", "wind power", "wind energy", "wind farm",
+                         "clean energy", "green energy"],
+    "employee safety": ["worker safety", "workplace safety", "unsafe working", "workplace injury", "workplace injuries",
+                        "injured workers", "workplace accident", "industrial accident", "worker died", "worker deaths", "osha"],
+    "factory conditions": ["factory workers", "factory worker", "sweatshop", "sweatshops", "working conditions",
+                           "assembly line workers", "plant workers"],
+    "data privacy": ["privacy policy", "privacy violation", "privacy violations", "data breach", "data breaches", "personal data",
+                     "user data", "gdpr", "user tracking", "location tracking", "tracks users", "leaked data"],
+    "supply chain": ["supply chains", "child labor", "child labour", "forced labor", "forced labour", "conflict minerals",
+                     "supplier audit", "suppliers audit", "responsible sourcing"],
+    "labor practices": ["labor union", "labour union", "trade union", "workers union", "union busting", "unionize", "unionise",
+                        "unionized", "unionization", "strike action", "workers strike", "went on strike", "walkout",
+                        "wage theft", "minimum wage", "unpaid overtime", "forced overtime", "mass layoffs", "labor rights", "workers' rights"],
+    "diversity": ["diversity and inclusion", "dei", "racial discrimination", "gender discrimination", "gender pay gap",
+                  "gender equality", "pay equity", "sexual harassment", "workplace harassment"],
+    "business ethics": ["bribery", "corruption", "accounting fraud", "securities fraud", "price fixing", "kickbacks",
+                        "antitrust", "whistleblower", "whistleblowers", "unethical", "ethics violation"],
+}
+TOPIC_PATTERNS = {
+    topic: re.compile(r"\b(?:" + "|".join(re.escape(term).replace(r"\ ", r"\s+") for term in [topic] + keywords) + r")(?!\w)", re.IGNORECASE)
+    for topic, keywords in TOPIC_KEYWORDS.items()
+}
+
+# --- CONFIGURATION: Report Cache (extraction + classification, keyed by PDF content) ---
+REPORT_CACHE_SCHEMA = 3 # Bump when the cached document format (or how it is counted) changes
+REPORT_CACHE = DiskCache("greenwash_reports", max_bytes=128 * 1024 * 1024, max_entries=500)
+
+# --- 1. INITIALIZE ALL YOUR MODELS AND KEYS (on first use, not at import) ---
+# Models live in the shared registry (loaded on demand, unloaded when idle / over budget)
+CLASSIFIER = model_registry.registry.register_pipeline("zero-shot-classification", CLASSIFIER_MODEL)
+SENTIMENT = model_registry.registry.register_pipeline("sentiment-analysis", SENTIMENT_MODEL)
 reddit = None
-
-print("Attempting to load AI models and connect to Reddit (Greenwash)...")
-try:
-    # Model for classifying topics
-    device_option = -1 # Default to CPU
-    classifier = pipeline(
-        "zero-shot-classification",
-        model="facebook/bart-large-mnli",
-        device=device_option
-    )
-    print("Zero-shot classifier loaded.")
-
-    # Model for analyzing sentiment
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english",
-        device=device_option
-    )
-    print("Sentiment analyzer loaded.")
-
-except Exception as e:
-    print(f"FATAL ERROR: Could not load AI models: {e}")
+_reddit_checked = False
+_reddit_lock = threading.Lock()
 
 # --- Reddit PRAW Client ---
-try:
-    # Use Streamlit secrets to get keys (same as ai_core.py)
-    if "REDDIT_CLIENT_ID" in st.secrets and "REDDIT_CLIENT_SECRET" in st.secrets:
-        reddit = praw.Reddit(
-            client_id=st.secrets["REDDIT_CLIENT_ID"],
-            client_secret=st.secrets["REDDIT_CLIENT_SECRET"],
+def create_reddit_client():
+    """ Creates a read-only PRAW client from secrets, or returns None. """
+    # Same secrets as ai_core.py (environment or .streamlit/secrets.toml)
+    if "REDDIT_CLIENT_ID" in config.secrets and "REDDIT_CLIENT_SECRET" in config.secrets:
+        import praw
+        return praw.Reddit(
+            client_id=config.secrets["REDDIT_CLIENT_ID"],
+            client_secret=config.secrets["REDDIT_CLIENT_SECRET"],
             user_agent="ReputeXGreenwash v1 by u/YourUsername", # Use a unique user agent
-            read_only=True
+            read_only=True,
+            **config.reddit_endpoints()
         )
-        print("Successfully connected to Reddit API (Greenwash).")
-    else:
-        print("FATAL ERROR: Reddit credentials not found in secrets.toml.")
-except Exception as e:
-    print(f"FATAL ERROR: Could not connect to Reddit: {e}")
-    # Reddit client remains None
+    return None
+
+def connect_reddit():
+    """ Connects the shared Reddit client once per process (None if it failed). """
+    global reddit, _reddit_checked
+    if _reddit_checked: return reddit
+    with _reddit_lock:
+        if _reddit_checked: return reddit
+        try:
+            reddit = create_reddit_client()
+            if reddit:
+                print("Successfully connected to Reddit API (Greenwash).")
+            else:
+                print("FATAL ERROR: Reddit credentials not found in secrets.toml.")
+        except Exception as e:
+            print(f"FATAL ERROR: Could not connect to Reddit: {e}")
+            # Reddit client remains None
+        _reddit_checked = True
+    return reddit
+
+def load_models():
+    """
+    Loads the AI models and connects to Reddit ahead of time (launcher / server
+    warm-up). The pipeline also loads them on demand. Failures are logged.
+    """
+    print("Attempting to load AI models and connect to Reddit (Greenwash)...")
+    try:
+        model_registry.registry.get(CLASSIFIER)
+        print("Zero-shot classifier loaded.")
+        model_registry.registry.get(SENTIMENT)
+        print("Sentiment analyzer loaded.")
+    except Exception as e:
+        print(f"FATAL ERROR: Could not load AI models: {e}")
+    connect_reddit()
+
+# PRAW clients aren't thread-safe, so each search thread gets its own. The search threads are one
+# long-lived pool, so those clients (and their OAuth tokens) are created once, not per request.
+_thread_local = threading.local()
+_search_pool = None
+_search_pool_pid = None
+
+def _reddit_search_pool():
+    """ The process-wide Reddit search pool (started on first use, again after a fork). """
+    global _search_pool, _search_pool_pid
+    with _reddit_lock:
+        if _search_pool is None or _search_pool_pid != os.getpid():
+            _search_pool = ThreadPoolExecutor(max_workers=REDDIT_MAX_WORKERS, thread_name_prefix="reddit-search")
+            _search_pool_pid = os.getpid()
+        return _search_pool
+
+def _completed_by_deadline(futures, cancel_token=None):
+    """
+    as_completed() over this call's searches that stops waiting at the token's deadline
+    (raising OperationCancelled), so a stuck Reddit search can't hold the request past it.
+    """
+    try:
+        yield from as_completed(futures, timeout=cancellation.remaining(cancel_token))
+    except FuturesTimeoutError:
+        cancellation.check(cancel_token)
+        raise
+
+def _thread_reddit_client():
+    if threading.current_thread() is threading.main_thread():
+        return reddit
+    if not hasattr(_thread_local, "reddit"):
+        try:
+            _thread_local.reddit = create_reddit_client() or reddit
+        except Exception as e:
+            print(f"Could not create per-thread Reddit client ({e}). Using shared client.")
+            _thread_local.reddit = reddit
+    return _thread_local.reddit
 
 # --- 2. DEFINE YOUR HELPER FUNCTIONS ---
 
-def extract_text_from_pdf_bytes(pdf_bytes):
+def extract_text_from_pdf_bytes(pdf_bytes, page_range=None, max_pages=None):
     """
     Extracts all text from a PDF given as bytes from a web upload.
+    Prefer iter_pdf_pages() for large reports; this joins every page in memory.
     """
-    text = ""
     if not pdf_bytes:
         print("Error: Received empty PDF data.")
         return None
     try:
-        # Open the PDF from the byte stream
-        with fitz.open(stream=io.BytesIO(pdf_bytes), filetype="pdf") as doc: # Use io.BytesIO
-            print(f"Reading PDF with {len(doc)} pages...")
-            for page_num, page in enumerate(doc):
-                text += page.get_text()
-            print("Successfully extracted text from PDF.")
+        text = "".join(page_text for _, page_text in iter_pdf_pages(pdf_bytes, page_range, max_pages))
+        print("Successfully extracted text from PDF.")
         return text
     except Exception as e:
         print(f"Error reading PDF bytes: {e}")
         return None
 
-def get_live_reddit_sentiment(company_name, topic):
+def fetch_reddit_texts(company_name, topic):
     """
-    Fetches real Reddit submissions, analyzes sentiment, and returns a score (0.0 to 1.0).
+    Searches Reddit for the company + topic and returns (posts_found, texts)
+    where texts are the submissions suitable for sentiment analysis.
     """
-    if not reddit:
-        print("Reddit client not initialized. Skipping search.")
-        return 0.5 # Return neutral
-
+    import praw
+    import prawcore # Import for exceptions
     query = f'"{company_name}" {topic}' # Use quotes for company name
     print(f"\nSearching Reddit for: {query}...")
-
-    sentiment_scores = []
+    texts = []
     posts_found = 0
-    analyzed_count = 0
-
     try:
-        search_results = reddit.subreddit("all").search(
+        search_results = _thread_reddit_client().subreddit("all").search(
             query,
             sort="relevance",
             time_filter="month",
             limit=25
         )
-
         for submission in search_results:
             posts_found += 1
-            text_to_analyze = f"{submission.title}. {submission.selftext}"
+            text_to_analyze = _usable_reddit_text(submission)
+            if text_to_analyze: texts.append(text_to_analyze)
+    except (praw.exceptions.PRAWException, prawcore.exceptions.PrawcoreException) as praw_error:
+        print(f"PRAW specific error searching Reddit: {praw_error}")
+    except Exception as e:
+        print(f"General error searching Reddit: {e}")
+    return posts_found, texts
 
-            if len(text_to_analyze) < 20 or submission.selftext == '[removed]' or submission.selftext == '[deleted]':
-                continue
+def _usable_reddit_text(submission):
+    """ "title. selftext" for sentiment analysis, or None for removed / too-short posts. """
+    text_to_analyze = f"{submission.title}. {submission.selftext}"
+    if len(text_to_analyze) < 20 or submission.selftext == '[removed]' or submission.selftext == '[deleted]':
+        return None
+    return text_to_analyze
 
-            if not sentiment_analyzer:
-                print("Sentiment analyzer not available. Skipping analysis.")
+def harvest_reddit_texts(company_name):
+    """
+    Harvest mode: ONE search for the company's recent submissions (all its search names),
+    de-duplicated by submission id and text. Returns (posts_found, texts).
+    """
+    import praw
+    import prawcore # Import for exceptions
+    query = company_entities.resolve(company_name).query()
+    print(f"\nHarvesting Reddit for: {query}...")
+    texts = []
+    posts_found = 0
+    seen = set()
+    try:
+        search_results = _thread_reddit_client().subreddit("all").search(
+            query,
+            sort="new",
+            time_filter="month",
+            limit=REDDIT_HARVEST_LIMIT
+        )
+        for submission in search_results:
+            posts_found += 1
+            text_to_analyze = _usable_reddit_text(submission)
+            fingerprint = " ".join((text_to_analyze or "").lower().split())
+            if not text_to_analyze or submission.id in seen or fingerprint in seen:
                 continue
+            seen.update((submission.id, fingerprint)) # Crossposts / reposts count once
+            texts.append(text_to_analyze)
+    except (praw.exceptions.PRAWException, prawcore.exceptions.PrawcoreException) as praw_error:
+        print(f"PRAW specific error harvesting Reddit: {praw_error}")
+    except Exception as e:
+        print(f"General error harvesting Reddit: {e}")
+    return posts_found, texts
 
-            try:
-                result = sentiment_analyzer(text_to_analyze, truncation=True, max_length=512)[0]
-                analyzed_count += 1
+def route_texts_to_topics(texts, topics, routing=None, cancel_token=None):
+    """
+    Harvest mode: which of the harvested texts belong to each topic.
+    Returns {topic: [text indices]}; a text can belong to several topics.
+    """
+    routes = {topic: [] for topic in topics}
+    if not texts or not topics:
+        return routes
+    if (routing or REDDIT_ROUTING) == "classifier":
+        try:
+            with model_registry.registry.using(CLASSIFIER) as classifier:
+                for start in range(0, len(texts), CLASSIFIER_BATCH_SIZE * 4):
+                    cancellation.check(cancel_token)
+                    chunk = texts[start:start + CLASSIFIER_BATCH_SIZE * 4]
+                    results = classifier(chunk, list(topics), multi_label=True, batch_size=CLASSIFIER_BATCH_SIZE)
+                    if isinstance(results, dict): results = [results]
+                    for offset, result in enumerate(results):
+                        for label, score in zip(result['labels'], result['scores']):
+                            if score >= REDDIT_TOPIC_THRESHOLD: routes[label].append(start + offset)
+            return routes
+        except cancellation.OperationCancelled:
+            raise
+        except Exception as e:
+            print(f"Topic classifier not available ({e}). Routing Reddit posts by keywords.")
+            routes = {topic: [] for topic in topics}
+    for index, text in enumerate(texts):
+        for topic in topics:
+            pattern = TOPIC_PATTERNS.get(topic)
+            if pattern.search(text) if pattern else topic.lower() in text.lower():
+                routes[topic].append(index)
+    return routes
+
+def score_sentiment_batch(texts, cancel_token=None):
+    """
+    Scores texts with the sentiment model in length-bucketed batches
+    (similar lengths together = less padding). Returns one score per text
+    (0.0 = negative, 1.0 = positive), or None where analysis failed.
+    """
+    scores = [None] * len(texts)
+    if not texts:
+        return scores
+    try:
+        with model_registry.registry.using(SENTIMENT) as sentiment_analyzer: # Not unloaded while scoring
+            _score_sorted_batches(sentiment_analyzer, texts, scores, cancel_token)
+    except Exception as e:
+        print(f"Sentiment analyzer not available ({e}). Skipping analysis.")
+    return scores
+
+def _score_sorted_batches(sentiment_analyzer, texts, scores, cancel_token=None):
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), SENTIMENT_BATCH_SIZE):
+        cancellation.check(cancel_token) # Stop between batches if the request was abandoned
+        batch = order[start:start + SENTIMENT_BATCH_SIZE]
+        try:
+            results = sentiment_analyzer([texts[i] for i in batch], truncation=True, max_length=512, batch_size=SENTIMENT_BATCH_SIZE)
+        except Exception as analysis_error:
+            print(f"Error during sentiment analysis for a batch of {len(batch)} posts: {analysis_error}")
+            continue
+        for i, result in zip(batch, results):
+            if result['label'] == 'POSITIVE':
+                scores[i] = result['score']
+            else: # 'NEGATIVE'
+                scores[i] = 1.0 - result['score']
 
-                if result['label'] == 'POSITIVE':
-                    sentiment_scores.append(result['score'])
-                else: # 'NEGATIVE'
-                    sentiment_scores.append(1.0 - result['score'])
-            except Exception as analysis_error:
-                print(f"Error during sentiment analysis for a post: {analysis_error}")
+def get_reddit_sentiments_for_pairs(pairs, progress=None, cancel_token=None, mode=None):
+    """
+    Live Reddit sentiment for every (company, topic) pair. Returns
+    {(company, topic): score (0.0 to 1.0)}; 0.5 (neutral) when nothing usable was found.
+    mode (default REDDIT_MODE): "harvest" = one search per company, posts routed to
+    topics locally; "per_topic" = one search per pair (bounded pool). Either way every
+    post is scored once, in one batched sentiment pass.
+    progress(stage, **details) is called as each search finishes. If cancel_token
+    trips, searches not yet started are dropped and OperationCancelled is raised.
+    """
+    pairs = list(dict.fromkeys(pairs)) # De-duplicate, keep order
+    if not pairs:
+        return {}
+    if not connect_reddit():
+        print("Reddit client not initialized. Skipping search.")
+        return {pair: 0.5 for pair in pairs} # Return neutral
+    if (mode or REDDIT_MODE) == "harvest":
+        return _harvest_sentiments_for_pairs(pairs, progress, cancel_token)
 
+    fetched = [None] * len(pairs)
+    pool = _reddit_search_pool()
+    futures = {pool.submit(fetch_reddit_texts, company, topic): index for index, (company, topic) in enumerate(pairs)}
+    try:
+        for done_count, future in enumerate(_completed_by_deadline(futures, cancel_token), start=1):
+            cancellation.check(cancel_token)
+            fetched[futures[future]] = future.result()
+            if progress: progress("reddit", topics_done=done_count, topics_total=len(pairs))
+    finally:
+        for future in futures:
+            future.cancel() # All done normally; on cancel, this call's queued searches never run
+
+    all_texts = [text for _, texts in fetched for text in texts]
+    all_scores = score_sentiment_batch(all_texts, cancel_token)
+
+    sentiments = {}
+    position = 0
+    for (company, topic), (posts_found, texts) in zip(pairs, fetched):
+        topic_scores = [score for score in all_scores[position:position + len(texts)] if score is not None]
+        position += len(texts)
         if posts_found == 0:
-            print("No Reddit submissions found for this topic.")
-            return 0.5
-
-        if not sentiment_scores:
-            print(f"Found {posts_found} posts, but none were suitable for analysis.")
-            return 0.5
+            print(f"  - {company} / '{topic}': No Reddit submissions found for this topic.")
+            sentiments[(company, topic)] = 0.5
+        elif not topic_scores:
+            print(f"  - {company} / '{topic}': Found {posts_found} posts, but none were suitable for analysis.")
+            sentiments[(company, topic)] = 0.5
+        else:
+            sentiments[(company, topic)] = sum(topic_scores) / len(topic_scores)
+            print(f"  - {company} / '{topic}': Found {posts_found} posts, analyzed {len(topic_scores)}. Average sentiment: {sentiments[(company, topic)]:.2f}")
+    return sentiments
+
+def _harvest_sentiments_for_pairs(pairs, progress=None, cancel_token=None):
+    """ Harvest mode of get_reddit_sentiments_for_pairs: one Reddit call per company. """
+    topics_by_company = {}
+    for company, topic in pairs:
+        topics_by_company.setdefault(company, []).append(topic)
+
+    harvested = {}
+    topics_done = 0
+    pool = _reddit_search_pool()
+    futures = {pool.submit(harvest_reddit_texts, company): company for company in topics_by_company}
+    try:
+        for future in _completed_by_deadline(futures, cancel_token):
+            cancellation.check(cancel_token)
+            company = futures[future]
+            harvested[company] = future.result()
+            topics_done += len(topics_by_company[company])
+            if progress: progress("reddit", topics_done=topics_done, topics_total=len(pairs))
+    finally:
+        for future in futures:
+            future.cancel()
+
+    # Route locally, then score each routed post once (however many topics it belongs to)
+    routes_by_company = {}
+    scored_texts = []
+    for company, topics in topics_by_company.items():
+        _, texts = harvested[company]
+        routes = route_texts_to_topics(texts, topics, cancel_token=cancel_token)
+        routed = sorted({index for indices in routes.values() for index in indices})
+        positions = {index: len(scored_texts) + offset for offset, index in enumerate(routed)}
+        scored_texts.extend(texts[index] for index in routed)
+        routes_by_company[company] = {topic: [positions[index] for index in indices] for topic, indices in routes.items()}
+    all_scores = score_sentiment_batch(scored_texts, cancel_token)
+
+    sentiments = {}
+    for company, topic in pairs:
+        posts_found, texts = harvested[company]
+        positions = routes_by_company[company][topic]
+        topic_scores = [all_scores[position] for position in positions if all_scores[position] is not None]
+        if not positions:
+            print(f"  - {company} / '{topic}': None of {len(texts)} harvested posts ({posts_found} found) are about this topic.")
+            sentiments[(company, topic)] = 0.5
+        elif not topic_scores:
+            print(f"  - {company} / '{topic}': {len(positions)} posts about this topic, but none could be analyzed.")
+            sentiments[(company, topic)] = 0.5
+        else:
+            sentiments[(company, topic)] = sum(topic_scores) / len(topic_scores)
+            print(f"  - {company} / '{topic}': {len(positions)} of {len(texts)} harvested posts, analyzed {len(topic_scores)}. Average sentiment: {sentiments[(company, topic)]:.2f}")
+    print(f"Reddit harvest: {len(topics_by_company)} searches for {len(pairs)} topics, {len(scored_texts)} posts scored.")
+    return sentiments
+
+def get_live_reddit_sentiments(company_name, topics, progress=None, cancel_token=None):
+    """
+    Live Reddit sentiment for several topics of one company (searched concurrently,
+    scored in one batch). Returns {topic: score (0.0 to 1.0)}.
+    """
+    pair_sentiments = get_reddit_sentiments_for_pairs([(company_name, topic) for topic in topics], progress, cancel_token)
+    return {topic: pair_sentiments[(company_name, topic)] for topic in topics}
 
-        average_score = sum(sentiment_scores) / len(sentiment_scores)
-        print(f"Found {posts_found} posts, analyzed {analyzed_count}. Average sentiment: {average_score:.2f}")
-        return average_score
+def get_live_reddit_sentiment(company_name, topic):
+    """
+    Fetches real Reddit submissions, analyzes sentiment, and returns a score (0.0 to 1.0).
+    """
+    return get_live_reddit_sentiments(company_name, [topic])[topic]
 
-    except (praw.exceptions.PRAWException, prawcore.exceptions.PrawcoreException) as praw_error:
-        print(f"PRAW specific error searching Reddit: {praw_error}")
-        return 0.5
-    except Exception as e:
-        print(f"General error searching Reddit or analyzing posts: {e}")
-        return 0.5
+# --- 3. REPORT DOCUMENT ANALYSIS (Cached by PDF content) ---
 
-# --- 3. DEFINE YOUR "MASTER" FUNCTION (This is what FastAPI will call) ---
+def report_cache_key(pdf_source, page_range=None, max_pages=None):
+    """ Content hash of the PDF + everything that changes extraction/classification results. """
+    version = config_version(
+        cache_schema=REPORT_CACHE_SCHEMA, classifier_model=CLASSIFIER_MODEL,
+        weasel_words=WEASEL_WORDS, concrete_words=CONCRETE_WORDS, esg_topics=ESG_TOPICS,
+        sample_chars=REPORT_SAMPLE_CHARS, page_range=page_range, max_pages=max_pages
+    )
+    return content_hash(pdf_source, version)
 
-def run_full_analysis(company_name, pdf_file_bytes):
+def scan_report_document(pdf_source, page_range=None, max_pages=None, progress=None, workers=None, cancel_token=None):
     """
-    Runs the entire analysis pipeline: PDF extraction, topic relevance,
-    Reddit sentiment search, and comparison.
-    Returns a dictionary containing the analysis report.
+    Step 1 of the pipeline: streams the PDF pages and scans the language.
+    Returns the step-1 results plus "text_sample" (for topic relevance),
+    or an {"status": "Error", ...} report.
     """
-
-    # --- Pre-computation Checks ---
-    if not classifier or not sentiment_analyzer:
-        print("Error: AI models not loaded. Cannot perform analysis.")
-        return {"status": "Error", "report": "AI models did not load correctly. Check server logs."}
-    if not reddit:
-        print("Error: Reddit client not connected. Cannot perform analysis.")
-        return {"status": "Error", "report": "Could not connect to Reddit API. Check credentials/server logs."}
-    if not company_name or not isinstance(company_name, str) or len(company_name.strip()) == 0:
-        return {"status": "Error", "report": "Invalid or missing company name."}
-    if not pdf_file_bytes:
-         return {"status": "Error", "report": "No PDF file data received."}
-
-    # --- Step 1: Extract text from the PDF ---
-    print("\n--- Starting Full Analysis ---")
     print("Step 1: Extracting text from PDF...")
-    report_text = extract_text_from_pdf_bytes(pdf_file_bytes)
-    if not report_text:
+    language_scan = LANGUAGE_SCANNER.new_scan() # Single regex pass per page
+    sample_parts = [] # First REPORT_SAMPLE_CHARS characters for topic relevance
+    sample_length = 0
+    pages_read = 0
+    try:
+        for page_number, page_text in iter_pdf_pages(pdf_source, page_range, max_pages, workers):
+            cancellation.check(cancel_token) # Closing the generator also stops the extraction workers
+            pages_read += 1
+            if progress and pages_read % PROGRESS_EVERY_PAGES == 0: progress("extraction", pages_read=pages_read)
+            if not page_text: continue
+            language_scan.add_page(page_number, page_text)
+            if sample_length < REPORT_SAMPLE_CHARS:
+                sample_parts.append(page_text[:REPORT_SAMPLE_CHARS - sample_length])
+                sample_length += len(sample_parts[-1])
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
         return {"status": "Error", "report": "Failed to extract text from the uploaded PDF."}
-    
-    # Simple keyword check for Greenwashing (vague vs. concrete)
-    weasel_words = ["aim to", "strive", "target", "plan to", "potential", "hope to", "intend to", "may", "could", "believe", "commit to", "should"]
-    concrete_words = ["achieved", "reduced", "increased", "implemented", "completed", "verified", "certified", "quantified", "%"]
-    
-    weasel_count = 0
-    concrete_count = 0
-    vague_flags = [] # <<< CHANGED: Store vague flags here
-    text_lower = report_text.lower()
-    for word in weasel_words:
-        count = text_lower.count(word)
-        if count > 0:
-            weasel_count += count
-            try:
-                index = text_lower.index(word)
-                snippet = "..." + report_text[max(0, index-30):min(len(report_text), index+len(word)+30)].replace("\n", " ") + "..."
-                vague_flags.append(f"Vague term found: {snippet}") # <<< CHANGED
-            except ValueError: pass
-    for word in concrete_words:
-        concrete_count += text_lower.count(word)
-    
+    if sample_length == 0:
+        return {"status": "Error", "report": "Failed to extract text from the uploaded PDF."}
+    print(f"Successfully extracted text from {pages_read} PDF pages.")
+
+    # First occurrence of each weasel word (in word-list order), tagged with its page
+    vague_flags = [
+        f"Vague term found (page {page_number}): {snippet}"
+        for _, page_number, snippet in language_scan.first_snippets()
+    ]
+
+    weasel_count = language_scan.weasel_count
+    concrete_count = language_scan.concrete_count
     total_relevant = weasel_count + concrete_count
     if total_relevant == 0:
         credibility_score = 50
@@ -194,41 +497,104 @@ def run_full_analysis(company_name, pdf_file_bytes):
     
     credibility_score = max(0, min(100, credibility_score)) # Clamp score
 
-    # --- Step 2: Classify the PDF text for Topic Relevance ---
-    print("Step 2: Analyzing report topics (Relevance)...")
-    text_sample = report_text[:4000] # Use a large sample
+    total_words = sum(stats["words"] for stats in language_scan.page_stats)
+    return {
+        "pages_analyzed": pages_read,
+        "credibility_score": credibility_score,
+        "vague_flags": vague_flags,
+        "text_sample": "".join(sample_parts), # Use a large sample
+        "language_evidence": {
+            "weasel_count": weasel_count,
+            "concrete_count": concrete_count,
+            "weasel_density": round(weasel_count * 1000 / total_words, 2) if total_words else 0.0, # Per 1,000 words
+            "term_counts": language_scan.term_counts(),
+            "term_pages": language_scan.term_pages(), # Every page each term appears on
+            "densest_vague_pages": language_scan.densest_pages()
+        }
+    }
 
-    esg_topics = [
-        "climate change", "renewable energy", "employee safety",
-        "factory conditions", "data privacy", "supply chain",
-        "labor practices", "diversity", "business ethics"
-    ]
+def classify_report_samples(text_samples):
+    """
+    Step 2 of the pipeline: topic relevance for one or more report samples,
+    pushed through the zero-shot classifier as shared batches.
+    Returns one {topic: score} dict per sample.
+    """
+    with model_registry.registry.using(CLASSIFIER) as classifier:
+        results = classifier(list(text_samples), ESG_TOPICS, multi_label=True, batch_size=CLASSIFIER_BATCH_SIZE)
+    if isinstance(results, dict): results = [results] # Single input
+    return [{label: score for label, score in zip(result['labels'], result['scores'])} for result in results]
 
+def analyze_report_document(pdf_source, page_range=None, max_pages=None, progress=None, cancel_token=None):
+    """
+    Steps 1 & 2 of the pipeline: streams the PDF pages, scans the language and
+    classifies topic relevance. Returns a JSON-serialisable dict (cacheable),
+    or an {"status": "Error", ...} report. progress(stage, **details) is optional.
+    """
+    document = scan_report_document(pdf_source, page_range, max_pages, progress, cancel_token=cancel_token)
+    if document.get("status") == "Error":
+        return document
+    cancellation.check(cancel_token)
+
+    # --- Step 2: Classify the PDF text for Topic Relevance ---
+    print("Step 2: Analyzing report topics (Relevance)...")
+    if progress: progress("classification", pages_read=document["pages_analyzed"])
     try:
-        report_results = classifier(text_sample, esg_topics, multi_label=True)
-        report_scores = {label: score for label, score in zip(report_results['labels'], report_results['scores'])}
+        document["report_scores"] = classify_report_samples([document.pop("text_sample")])[0]
         print("Report topic relevance analysis complete.")
     except Exception as e:
         print(f"Error during report topic classification: {e}")
         return {"status": "Error", "report": [f"Failed during report analysis: {e}"]} # Return error in list
+    return document
+
+def get_report_document(pdf_source, page_range=None, max_pages=None, progress=None, cancel_token=None):
+    """ analyze_report_document(), served from the on-disk cache on repeat uploads. """
+    cache_key = _safe_report_cache_key(pdf_source, page_range, max_pages)
+    if cache_key:
+        document = REPORT_CACHE.get(cache_key)
+        if document is not None:
+            print(f"Steps 1-2: Cache hit for report {cache_key[:12]}... (skipping extraction & classification)")
+            if progress: progress("classification", pages_read=document["pages_analyzed"], cached=True)
+            return document
+
+    document = analyze_report_document(pdf_source, page_range, max_pages, progress, cancel_token)
+    if cache_key and document.get("status") != "Error":
+        REPORT_CACHE.put(cache_key, document)
+    return document
+
+def _safe_report_cache_key(pdf_source, page_range, max_pages):
+    try:
+        return report_cache_key(pdf_source, page_range, max_pages)
+    except OSError as e:
+        print(f"Error hashing PDF for cache: {e}")
+        return None
 
-    # --- Step 3 & 4: Loop Topics, Get Reddit Sentiment, Compare ---
-    REPORT_RELEVANCE_THRESHOLD = 0.50 # If report relevance > 50%...
-    REDDIT_SENTIMENT_THRESHOLD = 0.40 # ...and Reddit sentiment < 40% (negative)... -> Flag it!
-    inconsistencies = [] # <<< CHANGED: Store inconsistency flags here
-
-    print("\n" + "="*30)
-    print(f"Step 3/4: Starting LIVE Reddit Analysis & Comparison for: {company_name}")
-    print("="*30)
+# --- 4. REPORT vs. PUBLIC SENTIMENT COMPARISON ---
 
-    for topic in esg_topics:
+def prominent_report_topics(report_scores):
+    """ Topics the report features prominently enough to check against Reddit. """
+    prominent_topics = []
+    for topic in ESG_TOPICS:
         report_relevance = report_scores.get(topic, 0)
         # Skip Reddit search if topic isn't prominent in report
         if (report_relevance < REPORT_RELEVANCE_THRESHOLD):
             print(f"  - Skipping Reddit search for '{topic}' (Report Relevance: {report_relevance*100:.0f}%)")
             continue
+        prominent_topics.append(topic)
+    return prominent_topics
 
-        live_reddit_sentiment = get_live_reddit_sentiment(company_name, topic)
+def build_final_report(company_name, document, reddit_sentiments):
+    """
+    Steps 4 & 5: compares report relevance with live Reddit sentiment
+    ({topic: score} for the report's prominent topics) and formats the final report dictionary.
+    """
+    report_scores = document["report_scores"]
+    vague_flags = list(document["vague_flags"])
+    inconsistencies = [] # <<< CHANGED: Store inconsistency flags here
+
+    for topic in ESG_TOPICS:
+        if topic not in reddit_sentiments: continue # Not prominent in the report
+        report_relevance = report_scores.get(topic, 0)
+        live_reddit_sentiment = reddit_sentiments[topic]
 
         if (live_reddit_sentiment < REDDIT_SENTIMENT_THRESHOLD):
             flag_message = (
@@ -243,15 +609,14 @@ def run_full_analysis(company_name, pdf_file_bytes):
                 "reddit_sentiment": round(live_reddit_sentiment, 2)
             })
 
-    # --- Step 5: Format and Return the Final Report ---
-    print("\n--- Analysis Pipeline Complete ---")
-    
     # --- MODIFICATION: Return structured report ---
     final_report = {
         "company_name": company_name,
-        "credibility_score": credibility_score,
+        "pages_analyzed": document["pages_analyzed"],
+        "credibility_score": document["credibility_score"],
         "vague_flags": vague_flags[:3], # Show top 3 vague flags
-        "inconsistencies": inconsistencies # Show all found inconsistencies
+        "inconsistencies": inconsistencies, # Show all found inconsistencies
+        "language_evidence": document["language_evidence"]
     }
     
     # Set final status based on findings
@@ -262,12 +627,187 @@ def run_full_analysis(company_name, pdf_file_bytes):
         final_report["inconsistencies"] = [{"flag": "No major inconsistencies found between report and public sentiment."}]
     else:
         final_report["status"] = "Inconsistent / Vague"
-        if not vague_flags: final_flags["vague_flags"] = ["No vague language flags found."]
+        if not vague_flags: final_report["vague_flags"] = ["No vague language flags found."]
         if not inconsistencies: inconsistencies.append({"flag": "No major inconsistencies found."})
     # --- END MODIFICATION ---
 
     print(f"Final Report Status for {company_name}: {final_report['status']}")
     return final_report
 
-print("greenwash_analyzer.py loaded. Functions defined.")
+def _check_pipeline_ready():
+    """
+    Returns an error report if models / Reddit aren't available, else None.
+    Only the sentiment model is loaded here; the classifier loads when a report
+    actually needs classifying (not on report-cache hits).
+    """
+    try:
+        model_registry.registry.get(SENTIMENT)
+    except Exception as e:
+        print(f"Error: AI models not loaded ({e}). Cannot perform analysis.")
+        return {"status": "Error", "report": "AI models did not load correctly. Check server logs."}
+    if not connect_reddit():
+        print("Error: Reddit client not connected. Cannot perform analysis.")
+        return {"status": "Error", "report": "Could not connect to Reddit API. Check credentials/server logs."}
+    return None
+
+def _check_report_inputs(company_name, pdf_source):
+    if not company_name or not isinstance(company_name, str) or len(company_name.strip()) == 0:
+        return {"status": "Error", "report": "Invalid or missing company name."}
+    if not pdf_source:
+         return {"status": "Error", "report": "No PDF file data received."}
+    return None
+
+# --- 5. DEFINE YOUR "MASTER" FUNCTION (This is what FastAPI will call) ---
 
+def run_full_analysis(company_name, pdf_source, page_range=None, max_pages=None, progress=None, cancel_token=None):
+    """
+    Runs the entire analysis pipeline: PDF extraction, topic relevance,
+    Reddit sentiment search, and comparison.
+    Pages are streamed one at a time; page_range (1-based, inclusive) and
+    max_pages limit how much of the report is read.
+    Extraction & classification results are cached by PDF content, so a
+    repeat upload only re-runs the live Reddit step.
+    progress(stage, **details), if given, receives extraction / classification /
+    reddit progress (used by the background job queue).
+    pdf_source is the uploaded PDF as bytes or as a file path (preferred:
+    PyMuPDF then reads it from disk without an in-memory copy).
+    cancel_token (cancellation.CancellationToken) is checked per page / batch;
+    a tripped token raises cancellation.OperationCancelled.
+    Returns a dictionary containing the analysis report.
+    """
+
+    # --- Pre-computation Checks ---
+    error_report = _check_pipeline_ready() or _check_report_inputs(company_name, pdf_source)
+    if error_report:
+        return error_report
+
+    print("\n--- Starting Full Analysis ---")
+    if max_pages is None: max_pages = PDF_MAX_PAGES
+    if progress: progress("extraction", pages_read=0)
+    document = get_report_document(pdf_source, page_range, max_pages, progress, cancel_token)
+    if document.get("status") == "Error":
+        return document
+
+    # --- Step 3: Live Reddit Sentiment for the report's prominent topics ---
+    print("\n" + "="*30)
+    print(f"Step 3/4: Starting LIVE Reddit Analysis & Comparison for: {company_name}")
+    print("="*30)
+
+    # All prominent topics are searched concurrently and scored in one batch
+    prominent_topics = prominent_report_topics(document["report_scores"])
+    if progress: progress("reddit", topics_done=0, topics_total=len(prominent_topics))
+    reddit_sentiments = get_live_reddit_sentiments(company_name, prominent_topics, progress, cancel_token)
+
+    # --- Step 4 & 5: Compare, Format and Return the Final Report ---
+    print("\n--- Analysis Pipeline Complete ---")
+    final_report = build_final_report(company_name, document, reddit_sentiments)
+    score_history.record_greenwash_result(final_report)
+    return final_report
+
+# --- 6. BATCH MODE: several reports (years of one company, or peers) in one run ---
+
+def run_batch_analysis(reports, page_range=None, max_pages=None, progress=None):
+    """
+    Analyzes several reports together. `reports` is a list of
+    (company_name, pdf_source) or (company_name, pdf_source, label) tuples.
+    PDFs are extracted in parallel, uncached samples are classified as shared
+    batches, and Reddit is queried once per (company, topic) across the batch.
+    Returns {"reports": [final report per input], "comparison": [table rows]}.
+    """
+    error_report = _check_pipeline_ready()
+    if error_report:
+        return error_report
+    if not reports:
+        return {"status": "Error", "report": "No reports received."}
+    if max_pages is None: max_pages = PDF_MAX_PAGES
+
+    reports = [tuple(report) + (None,) * (3 - len(report)) for report in reports]
+    print(f"\n--- Starting Batch Analysis of {len(reports)} reports ---")
+    documents = [None] * len(reports)
+    cache_keys = [None] * len(reports)
+
+    # --- Step 1: Cache lookups, then parallel extraction of the misses ---
+    to_scan = []
+    for index, (company_name, pdf_source, _) in enumerate(reports):
+        input_error = _check_report_inputs(company_name, pdf_source)
+        if input_error:
+            documents[index] = input_error
+            continue
+        cache_keys[index] = _safe_report_cache_key(pdf_source, page_range, max_pages)
+        cached = REPORT_CACHE.get(cache_keys[index]) if cache_keys[index] else None
+        if cached is not None:
+            print(f"  - Report {index + 1}: cache hit (skipping extraction & classification)")
+            documents[index] = cached
+        else:
+            to_scan.append(index)
+
+    if to_scan:
+        report_workers = max(1, min(BATCH_EXTRACT_WORKERS, len(to_scan)))
+        page_workers = max(1, MAX_EXTRACT_WORKERS // report_workers) # Don't oversubscribe CPUs
+        print(f"Step 1: Extracting {len(to_scan)} reports ({report_workers} at a time)...")
+        with ThreadPoolExecutor(max_workers=report_workers, thread_name_prefix="report-scan") as pool:
+            scanned = list(pool.map(lambda i: scan_report_document(reports[i][1], page_range, max_pages, workers=page_workers), to_scan))
+        for index, document in zip(to_scan, scanned):
+            documents[index] = document
+        if progress: progress("extraction", reports_done=len(to_scan), reports_total=len(to_scan))
+
+        # --- Step 2: Shared classifier batches for every newly extracted report ---
+        to_classify = [index for index in to_scan if documents[index].get("status") != "Error"]
+        if to_classify:
+            print(f"Step 2: Classifying {len(to_classify)} report samples in shared batches...")
+            if progress: progress("classification", reports_total=len(to_classify))
+            try:
+                all_scores = classify_report_samples([documents[index].pop("text_sample") for index in to_classify])
+                for index, report_scores in zip(to_classify, all_scores):
+                    documents[index]["report_scores"] = report_scores
+                    if cache_keys[index]: REPORT_CACHE.put(cache_keys[index], documents[index])
+            except Exception as e:
+                print(f"Error during batch topic classification: {e}")
+                for index in to_classify:
+                    documents[index] = {"status": "Error", "report": [f"Failed during report analysis: {e}"]}
+
+    # --- Step 3: One Reddit lookup per (company, topic) across the whole batch ---
+    report_topics = [None] * len(reports)
+    pairs = []
+    for index, ((company_name, _, _), document) in enumerate(zip(reports, documents)):
+        if document.get("status") == "Error": continue
+        report_topics[index] = prominent_report_topics(document["report_scores"])
+        pairs.extend((company_name, topic) for topic in report_topics[index])
+    print(f"Step 3/4: LIVE Reddit Analysis for {len(set(pairs))} unique (company, topic) pairs...")
+    if progress: progress("reddit", topics_done=0, topics_total=len(set(pairs)))
+    pair_sentiments = get_reddit_sentiments_for_pairs(pairs, progress)
+
+    # --- Step 4 & 5: Per-report output + comparison table ---
+    final_reports = []
+    comparison = []
+    for index, ((company_name, _, label), document) in enumerate(zip(reports, documents)):
+        if document.get("status") == "Error":
+            final_report = dict(document, company_name=company_name)
+        else:
+            topic_sentiments = {topic: pair_sentiments[(company_name, topic)] for topic in report_topics[index]}
+            final_report = build_final_report(company_name, document, topic_sentiments)
+        if label: final_report["label"] = label
+        score_history.record_greenwash_result(final_report) # Error reports are skipped
+        final_reports.append(final_report)
+        comparison.append(_comparison_row(index, company_name, label, final_report))
+
+    print("\n--- Batch Analysis Complete ---")
+    return {"reports": final_reports, "comparison": comparison}
+
+def _comparison_row(index, company_name, label, final_report):
+    """ One row of the batch comparison table. """
+    flagged = [item["topic"] for item in final_report.get("inconsistencies", []) if isinstance(item, dict) and item.get("topic")]
+    evidence = final_report.get("language_evidence") or {}
+    return {
+        "report": index + 1,
+        "label": label,
+        "company_name": company_name,
+        "status": final_report.get("status"),
+        "credibility_score": final_report.get("credibility_score"),
+        "pages_analyzed": final_report.get("pages_analyzed"),
+        "weasel_density": evidence.get("weasel_density"),
+        "inconsistency_count": len(flagged),
+        "flagged_topics": flagged
+    }
+
+print("greenwash_analyzer.py loaded. Functions defined.")
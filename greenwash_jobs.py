@@ -0,0 +1,308 @@
+# This is a new file: greenwash_jobs.py
+# Background job queue for greenwash analyses: submit a PDF, get a job id, poll or stream status.
+# Jobs run on a bounded pool of worker threads in the process that accepted them; job records
+# (status, progress, result) live in a shared SQLite file, so any launcher worker can answer a poll.
+# Finished results are kept for a limited time.
+
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from score_history import DATA_ROOT # Same local data directory as the score history
+
+# --- CONFIGURATION: Job Queue ---
+DEFAULT_MAX_WORKERS = 2 # Analyses running at the same time (per process)
+DEFAULT_MAX_QUEUED = 20 # Jobs allowed to wait for a worker (across all processes sharing the store)
+DEFAULT_RESULT_TTL = 3600 # Seconds a finished job (and its result) is kept
+JOBS_DB_PATH = os.environ.get("REPUTEX_GREENWASH_JOBS_DB", os.path.join(DATA_ROOT, "greenwash_jobs.sqlite3"))
+PURGE_INTERVAL_SECONDS = 60 # Expired jobs are deleted at most this often (reads skip them meanwhile)
+OWNER_GONE_ERROR = "The server process running this job exited before it finished."
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+FAILED = "failed"
+FINISHED_STATES = (COMPLETE, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS greenwash_jobs (
+    job_id TEXT PRIMARY KEY,
+    company_name TEXT,
+    filename TEXT,
+    status TEXT NOT NULL,
+    progress TEXT,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    owner TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_greenwash_jobs_status ON greenwash_jobs (status, submitted_at);
+"""
+
+
+class QueueFullError(Exception):
+    """ Raised when the job queue is at its depth limit. """
+
+
+def _owner() -> str:
+    """ "host:pid" of this process (jobs run in the process that accepted them). """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owner_gone(owner: str) -> bool:
+    """ True if `owner` is a process on this host that no longer exists. """
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+class GreenwashJobQueue:
+    """
+    Bounded worker pool + queue-depth limit for run_full_analysis-style functions.
+    `run_analysis(company_name, pdf_source, progress=callback, **options)` must return the report dict.
+    """
+
+    def __init__(self, run_analysis, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_queued: int = DEFAULT_MAX_QUEUED, result_ttl: float = DEFAULT_RESULT_TTL, path: str = JOBS_DB_PATH):
+        self.run_analysis = run_analysis
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.path = path
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._workers = []
+        self._worker_pid = None
+        self._running = 0 # Jobs running in this process
+        self._last_purge = 0.0
+        self._closing = False
+
+    # --- Store ---
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with sqlite3.connect(self.path) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL") # Pollers don't block the job threads
+                        conn.executescript(_SCHEMA)
+                    self._initialized = True
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None) # Transactions are explicit
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    # --- Public API ---
+    def submit(self, company_name: str, pdf_source, filename: str = None, cleanup=None, **options) -> dict:
+        """
+        Queues one analysis. Raises QueueFullError when too many jobs are waiting.
+        cleanup(pdf_source), if given, runs after the job finishes (e.g. delete a temp upload).
+        """
+        self.purge_expired()
+        if self._closing:
+            raise QueueFullError("Greenwash job queue is shutting down.")
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            self._fail_orphans(conn) # Jobs of exited processes don't hold queue places
+            queued_count = conn.execute("SELECT COUNT(*) FROM greenwash_jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued_count >= self.max_queued:
+                raise QueueFullError(f"Greenwash job queue is full ({queued_count} waiting).")
+            conn.execute(
+                "INSERT INTO greenwash_jobs (job_id, company_name, filename, status, progress, submitted_at, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, company_name, filename, QUEUED, json.dumps({"stage": QUEUED}), time.time(), _owner())
+            )
+        with self._lock:
+            self._ensure_workers()
+        self._pending.put((job_id, pdf_source, cleanup, options))
+        print(f"Greenwash Jobs: Queued job {job_id} for {company_name}")
+        return self.get(job_id)
+
+    @staticmethod
+    def _fail_orphans(conn: sqlite3.Connection):
+        """ Marks unfinished jobs of processes that exited as failed (called in a transaction). """
+        owners = [row[0] for row in conn.execute("SELECT DISTINCT owner FROM greenwash_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))]
+        for owner in filter(_owner_gone, owners):
+            conn.execute(
+                "UPDATE greenwash_jobs SET status = ?, error = ?, finished_at = ?, version = version + 1 "
+                "WHERE owner = ? AND status IN (?, ?)", (FAILED, OWNER_GONE_ERROR, time.time(), owner, QUEUED, RUNNING)
+            )
+
+    def get(self, job_id: str, include_result: bool = True):
+        """ Snapshot of a job (None if unknown or expired), whichever process accepted it. """
+        self.purge_expired()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM greenwash_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or (row["status"] in FINISHED_STATES and row["finished_at"] < time.time() - self.result_ttl):
+                return None
+            if row["status"] not in FINISHED_STATES and _owner_gone(row["owner"]):
+                self._update(job_id, status=FAILED, error=OWNER_GONE_ERROR, finished_at=time.time(), progress={"stage": "done"})
+                row = conn.execute("SELECT * FROM greenwash_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            queue_position = None
+            if row["status"] == QUEUED:
+                queue_position = conn.execute(
+                    "SELECT COUNT(*) FROM greenwash_jobs WHERE status = ? AND submitted_at <= ?", (QUEUED, row["submitted_at"])
+                ).fetchone()[0]
+        finally:
+            conn.close()
+        snapshot = {
+            "job_id": row["job_id"],
+            "company_name": row["company_name"],
+            "filename": row["filename"],
+            "status": row["status"],
+            "progress": json.loads(row["progress"] or "{}"),
+            "submitted_at": row["submitted_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "version": row["version"] # Bumped on every change (used for streaming)
+        }
+        if queue_position is not None:
+            snapshot["queue_position"] = queue_position
+        if not include_result:
+            snapshot.pop("result", None)
+        return snapshot
+
+    def stats(self) -> dict:
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETE: 0, FAILED: 0}
+        conn = self._connect()
+        try:
+            for status, count in conn.execute("SELECT status, COUNT(*) FROM greenwash_jobs GROUP BY status"):
+                counts[status] = count
+        finally:
+            conn.close()
+        with self._lock:
+            running_here = self._running
+        return {"workers": self.max_workers, "max_queued": self.max_queued, **counts, "running_here": running_here}
+
+    def purge_expired(self, force: bool = False) -> int:
+        """ Drops finished jobs older than result_ttl (at most every PURGE_INTERVAL_SECONDS unless forced). """
+        now = time.time()
+        if not force and now - self._last_purge < PURGE_INTERVAL_SECONDS: return 0
+        self._last_purge = now
+        cutoff = now - self.result_ttl
+        with self._transaction() as conn:
+            return conn.execute(
+                f"DELETE FROM greenwash_jobs WHERE status IN ({', '.join('?' for _ in FINISHED_STATES)}) AND finished_at < ?",
+                (*FINISHED_STATES, cutoff)
+            ).rowcount
+
+    def shutdown(self, timeout: float = 30.0) -> bool:
+        """
+        Stops accepting jobs and waits (up to `timeout` seconds) for this process's running
+        ones to finish; jobs it never started are marked failed. Returns True if nothing was still running.
+        """
+        self._closing = True
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                running = self._running
+            if not running:
+                break
+            time.sleep(0.2)
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE greenwash_jobs SET status = ?, error = ?, finished_at = ?, version = version + 1 "
+                "WHERE status = ? AND owner = ?", (FAILED, "The server shut down before this job started.", time.time(), QUEUED, _owner())
+            )
+        if running:
+            print(f"Greenwash Jobs: Shutdown timed out with {running} job(s) still running.")
+            return False
+        return True
+
+    # --- Workers ---
+    def _ensure_workers(self):
+        """ Starts worker threads on first use, again after a fork (called with the lock held). """
+        if self._worker_pid != os.getpid():
+            self._workers = []
+            self._pending = queue.Queue()
+            self._worker_pid = os.getpid()
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker_loop, name=f"greenwash-job-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _update(self, job_id: str, **changes):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT progress FROM greenwash_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None: return
+            progress = changes.pop("progress", None)
+            if progress:
+                changes["progress"] = json.dumps(dict(json.loads(row["progress"] or "{}"), **progress))
+            if "result" in changes:
+                changes["result"] = json.dumps(changes["result"], default=str)
+            assignments = ", ".join(f"{column} = ?" for column in changes)
+            conn.execute(f"UPDATE greenwash_jobs SET {assignments}, version = version + 1 WHERE job_id = ?", (*changes.values(), job_id))
+
+    def _worker_loop(self):
+        pending = self._pending
+        while True:
+            job_id, pdf_source, cleanup, options = pending.get()
+            try:
+                self._run_job(job_id, pdf_source, options)
+            finally:
+                if cleanup:
+                    try: cleanup(pdf_source)
+                    except Exception as e: print(f"Greenwash Jobs: Cleanup failed for job {job_id}: {e}")
+                pending.task_done()
+
+    def _run_job(self, job_id: str, pdf_source, options: dict):
+        job = self.get(job_id, include_result=False)
+        if job is None or job["status"] != QUEUED: return # Expired (or failed at shutdown) while queued
+        with self._lock:
+            self._running += 1
+        try:
+            self._update(job_id, status=RUNNING, started_at=time.time(), progress={"stage": "starting"})
+            print(f"Greenwash Jobs: Starting job {job_id}")
+
+            def report_progress(stage, **details):
+                self._update(job_id, progress=dict(details, stage=stage))
+
+            try:
+                result = self.run_analysis(job["company_name"], pdf_source, progress=report_progress, **options)
+                failed = isinstance(result, dict) and result.get("status") == "Error"
+                self._update(
+                    job_id, status=FAILED if failed else COMPLETE, result=result,
+                    error=result.get("report") if failed else None,
+                    finished_at=time.time(), progress={"stage": "done"}
+                )
+                print(f"Greenwash Jobs: Job {job_id} finished ({'failed' if failed else 'complete'})")
+            except Exception as e:
+                print(f"Greenwash Jobs: Job {job_id} crashed: {e}")
+                self._update(job_id, status=FAILED, error=str(e), finished_at=time.time(), progress={"stage": "done"})
+        finally:
+            with self._lock:
+                self._running -= 1
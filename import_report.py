@@ -0,0 +1,101 @@
+# This is a new file: import_report.py
+# Cold-start report for the API server: what `import server` costs, which modules dominate,
+# whether any heavy library got imported eagerly, and (optionally) time until uvicorn is listening.
+# Usage: python import_report.py [--module server] [--top 15] [--listen]
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+# --- CONFIGURATION: Report ---
+# Libraries that must only load on first use (models, Reddit, the Streamlit UI)
+HEAVY_MODULES = ["torch", "transformers", "streamlit", "praw", "pandas"]
+IMPORT_BUDGET_SECONDS = 1.0 # Target time-to-listening for autoscaling / rolling deploys
+LISTEN_TIMEOUT_SECONDS = 60
+
+
+def measure_imports(module: str) -> list:
+    """ Runs `python -X importtime -c "import <module>"` and returns [(name, self_us, cumulative_us, depth)]. """
+    env = dict(os.environ, REPUTEX_WARM_MODELS="0", REPUTEX_LEADERBOARD_SCHEDULER="0")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if completed.returncode != 0:
+        print(completed.stderr[-2000:])
+        raise SystemExit(f"Import Report: 'import {module}' failed.")
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def direct_imports(rows: list, module: str) -> list:
+    """ Modules imported directly by `module` (importtime lists children before their parent). """
+    end = max(index for index, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = max([index for index, row in enumerate(rows[:end]) if row[3] == 0] or [-1]) + 1
+    return [row for row in rows[start:end] if row[3] == 1]
+
+
+def measure_listen(module: str) -> float:
+    """ Seconds from starting `uvicorn <module>:app` until its port accepts connections. """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, REPUTEX_WARM_MODELS="0", REPUTEX_LEADERBOARD_SCHEDULER="0")
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < LISTEN_TIMEOUT_SECONDS:
+            if process.poll() is not None:
+                raise SystemExit("Import Report: Server exited before listening.")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise SystemExit("Import Report: Server did not start listening in time.")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import time of the API server modules.")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--listen", action="store_true", help="Also measure time until uvicorn accepts connections")
+    args = parser.parse_args(argv)
+
+    rows = measure_imports(args.module)
+    total_us = next((cumulative for name, _, cumulative, _ in reversed(rows) if name == args.module), 0)
+    print(f"Import Report: 'import {args.module}' took {total_us / 1e6:.3f}s ({len(rows)} modules)")
+    print(f"\n{'cumulative':>11}  {'self':>9}  imported by {args.module}")
+    for name, self_us, cumulative_us, _ in sorted(direct_imports(rows, args.module), key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1e3:>9.1f}ms  {self_us / 1e3:>7.1f}ms  {name}")
+
+    imported = {name.split(".")[0] for name, _, _, _ in rows}
+    eager = [module for module in HEAVY_MODULES if module in imported]
+    print(f"\nHeavy libraries imported eagerly: {', '.join(eager) if eager else 'none'}")
+
+    status = 0 if not eager else 1
+    if args.listen:
+        listen_seconds = measure_listen(args.module)
+        within = listen_seconds <= IMPORT_BUDGET_SECONDS
+        print(f"Time to listening: {listen_seconds:.2f}s ({'within' if within else 'over'} the {IMPORT_BUDGET_SECONDS:.1f}s budget)")
+        if not within: status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,666 @@
+# This is a new file: job_broker.py
+# Durable job queue between the API / nightly runs and any number of worker processes on any number
+# of nodes (worker.py). Company analyses and greenwash reports are published as jobs; workers claim
+# them under a lease, heartbeat while running and ack the result. A job whose worker dies is claimed
+# again when its lease runs out; failures are retried with backoff; the same job key is never queued twice.
+# Backends: a SQLite file (one host, tests) or Redis (several nodes): REPUTEX_BROKER_URL=redis://host:6379/0
+# Uploaded PDFs are not stored in the broker: they go to REPUTEX_JOB_FILES_DIR (a directory every node
+# mounts, e.g. NFS) under their content hash, and jobs carry the file name.
+# Nightly watchlist: python job_broker.py submit --file watchlist.txt --wait      Stats: python job_broker.py stats
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import company_entities # Canonical company ids (job keys)
+from analysis_cache import content_hash
+from greenwash_jobs import QUEUED, RUNNING, COMPLETE, FAILED, FINISHED_STATES # Same job states as the in-process queue
+from score_history import DATA_ROOT
+
+# --- CONFIGURATION: Job Broker ---
+BROKER_URL = os.environ.get("REPUTEX_BROKER_URL", "sqlite:///" + os.path.join(DATA_ROOT, "jobs.sqlite3"))
+DISTRIBUTED = os.environ.get("REPUTEX_DISTRIBUTED", "0") == "1" # Server: leaderboard refreshes run on workers
+JOB_KINDS = ("analysis", "greenwash")
+LEASE_SECONDS = float(os.environ.get("REPUTEX_JOB_LEASE", "300")) # A job whose worker stops heartbeating is claimed again after this
+MAX_ATTEMPTS = int(os.environ.get("REPUTEX_JOB_MAX_ATTEMPTS", "3"))
+RETRY_BACKOFF_SECONDS = 30.0 # Wait before the 1st retry; doubles for each further one
+RESULT_TTL_SECONDS = float(os.environ.get("REPUTEX_JOB_RESULT_TTL", str(7 * 86400))) # Finished jobs (and results) kept this long
+WAIT_POLL_SECONDS = 2.0 # Result collection polling interval
+DISTRIBUTED_TIMEOUT_SECONDS = float(os.environ.get("REPUTEX_DISTRIBUTED_TIMEOUT", "3600")) # analyze_companies() waits this long
+REDIS_PREFIX = "reputex:jobs:"
+JOB_FILES_DIR = os.environ.get("REPUTEX_JOB_FILES_DIR", os.path.join(DATA_ROOT, "job_files")) # Shared PDF store (same path or mount on every node)
+JOB_KEY_SCHEMA = 1 # Bump when job_key's inputs change
+KEY_IGNORED_FIELDS = ("filename", "pdf_file") # Payload fields that don't make a job different (pdf_sha256 does)
+LEASE_LOST_ERROR = "Lease expired (worker lost)"
+
+# finish() outcomes besides COMPLETE / FAILED
+RETRY = "retry"
+RELEASE = "release"
+
+_JOB_FIELDS = ("job_id", "job_key", "kind", "payload", "status", "attempts", "max_attempts", "submitted_at", "available_at",
+               "started_at", "finished_at", "worker", "lease_expires_at", "progress", "result", "error")
+_TIME_FIELDS = ("submitted_at", "available_at", "started_at", "finished_at", "lease_expires_at")
+_JSON_FIELDS = ("payload", "progress", "result")
+
+
+class BrokerError(Exception):
+    """ Bad broker URL, unknown job kind / payload, or a missing backend package. """
+
+
+class JobFailed(Exception):
+    """ A job ended FAILED (returned by analyze_companies in place of a result). """
+
+
+def job_key(kind: str, payload: dict, run: str = None) -> str:
+    """
+    Idempotency key: same kind + payload (company by canonical id) + run label is the same job.
+    The run label defaults to today's UTC date, so a watchlist re-published the same night
+    (retry, second API node) doesn't run twice, and the next night's run is new.
+    Refreshes on a shorter cycle pass window_run(period) instead.
+    """
+    canonical = {name: value for name, value in payload.items() if name not in KEY_IGNORED_FIELDS}
+    if canonical.get("company"): canonical["company"] = company_entities.company_id(canonical["company"])
+    run = run if run is not None else time.strftime("%Y-%m-%d", time.gmtime())
+    return f"{kind}:{run}:" + content_hash(json.dumps(canonical, sort_keys=True).encode("utf-8"), JOB_KEY_SCHEMA)[:32]
+
+
+def window_run(period: float, now: float = None) -> str:
+    """
+    Run label for the time window of `period` seconds containing `now`: API nodes refreshing in
+    the same window share jobs, and a refresh due `period` seconds later is always a new window.
+    """
+    period = max(1, int(period))
+    now = time.time() if now is None else now
+    return f"w{period}-{int(now // period)}"
+
+
+def _check_job(kind: str, payload: dict):
+    if kind not in JOB_KINDS:
+        raise BrokerError(f"Unknown job kind '{kind}' (choose from {', '.join(JOB_KINDS)}).")
+    if not str(payload.get("company") or "").strip():
+        raise BrokerError("Job payload needs a company.")
+
+
+def _job_dict(values: dict, include_result: bool = True) -> dict:
+    """ Job dict from a SQLite row / Redis hash (bytes decoded, "" -> None, JSON fields parsed). """
+    job = {}
+    for field in _JOB_FIELDS:
+        value = values.get(field)
+        if isinstance(value, bytes): value = value.decode("utf-8")
+        if value is None or value == "":
+            job[field] = None
+        elif field in _TIME_FIELDS:
+            job[field] = float(value)
+        elif field in ("attempts", "max_attempts"):
+            job[field] = int(float(value))
+        elif field in _JSON_FIELDS:
+            job[field] = json.loads(value)
+        else:
+            job[field] = value
+    if not include_result:
+        job.pop("result", None)
+    return job
+
+
+def _retry_at(now: float, attempts: int) -> float:
+    return now + RETRY_BACKOFF_SECONDS * 2 ** max(0, attempts - 1)
+
+
+# --- SQLite Backend ---
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    job_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    submitted_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    lease_expires_at REAL,
+    progress TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_time ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at);
+"""
+
+
+class SQLiteBroker:
+    """
+    Jobs in one SQLite file (WAL). Every state change runs in a BEGIN IMMEDIATE transaction,
+    so two workers can never claim the same job. For processes on one host (or tests).
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with sqlite3.connect(self.path) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(_SCHEMA)
+                    self._initialized = True
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None) # Transactions are explicit
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, payload: dict, key: str, max_attempts: int = MAX_ATTEMPTS) -> dict:
+        """ Queues a job, or returns the existing job with this key (a FAILED one is queued again). """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT job_id, status FROM jobs WHERE job_key = ?", (key,)).fetchone()
+            if row is None:
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (job_id, job_key, kind, payload, status, max_attempts, submitted_at, available_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (job_id, key, kind, json.dumps(payload), QUEUED, max_attempts, now, now)
+                )
+            else:
+                job_id = row["job_id"]
+                if row["status"] == FAILED:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = 0, available_at = ?, finished_at = NULL, progress = NULL, "
+                        "result = NULL, error = NULL WHERE job_id = ?", (QUEUED, now, job_id)
+                    )
+        return self.get(job_id)
+
+    def _reap(self, conn: sqlite3.Connection, now: float):
+        """ Running jobs whose lease ran out: queued again, or FAILED if out of attempts. """
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, error = ?, worker = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts", (FAILED, now, LEASE_LOST_ERROR, RUNNING, now)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, available_at = ?, error = ?, worker = NULL, lease_expires_at = NULL "
+            "WHERE status = ? AND lease_expires_at < ?", (QUEUED, now, LEASE_LOST_ERROR, RUNNING, now)
+        )
+
+    def claim(self, worker: str, kinds=JOB_KINDS, limit: int = 1, lease_seconds: float = LEASE_SECONDS) -> list:
+        """ Up to `limit` ready jobs of the given kinds (oldest first), now RUNNING under this worker's lease. """
+        now = time.time()
+        kinds = list(kinds)
+        with self._transaction() as conn:
+            self._reap(conn, now)
+            ids = [row["job_id"] for row in conn.execute(
+                f"SELECT job_id FROM jobs WHERE status = ? AND available_at <= ? AND kind IN ({', '.join('?' for _ in kinds)}) "
+                "ORDER BY available_at LIMIT ?", [QUEUED, now] + kinds + [limit]
+            )]
+            if not ids: return []
+            marks = ", ".join("?" for _ in ids)
+            conn.execute(
+                f"UPDATE jobs SET status = ?, worker = ?, started_at = ?, lease_expires_at = ?, attempts = attempts + 1 "
+                f"WHERE job_id IN ({marks})", [RUNNING, worker, now, now + lease_seconds] + ids
+            )
+            rows = conn.execute(f"SELECT * FROM jobs WHERE job_id IN ({marks}) ORDER BY available_at", ids).fetchall()
+        return [_job_dict(dict(row)) for row in rows]
+
+    def heartbeat(self, job_id: str, worker: str, lease_seconds: float = LEASE_SECONDS, progress: dict = None) -> bool:
+        """ Extends the lease (and stores progress). False if this worker no longer holds the job. """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, progress = COALESCE(?, progress) WHERE job_id = ? AND worker = ? AND status = ?",
+                (time.time() + lease_seconds, json.dumps(progress) if progress else None, job_id, worker, RUNNING)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, worker: str, outcome: str, result=None, error: str = None):
+        """
+        Ends this worker's attempt: COMPLETE / FAILED, RETRY (queued again after a backoff while
+        attempts remain, else FAILED) or RELEASE (queued again now, attempt not counted).
+        Returns the job's new status, or None if the worker had lost the job (nothing changed).
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND worker = ? AND status = ?",
+                               (job_id, worker, RUNNING)).fetchone()
+            if row is None: return None
+            if outcome == RETRY and row["attempts"] < row["max_attempts"]:
+                conn.execute("UPDATE jobs SET status = ?, available_at = ?, error = ?, worker = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                             (QUEUED, _retry_at(now, row["attempts"]), error, job_id))
+                return QUEUED
+            if outcome == RELEASE:
+                conn.execute("UPDATE jobs SET status = ?, available_at = ?, attempts = attempts - 1, worker = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                             (QUEUED, now, job_id))
+                return QUEUED
+            status = COMPLETE if outcome == COMPLETE else FAILED
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, worker = NULL, lease_expires_at = NULL WHERE job_id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, now, job_id)
+            )
+        return status
+
+    def get(self, job_id: str, include_result: bool = True):
+        """ Snapshot of a job (None if unknown or purged). """
+        return self.get_many([job_id], include_result).get(job_id)
+
+    def get_many(self, job_ids: list, include_result: bool = True) -> dict:
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids: return {}
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT * FROM jobs WHERE job_id IN ({', '.join('?' for _ in job_ids)})", job_ids).fetchall()
+        finally:
+            conn.close()
+        return {row["job_id"]: _job_dict(dict(row), include_result) for row in rows}
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, status, COUNT(*) AS jobs FROM jobs GROUP BY kind, status").fetchall()
+        finally:
+            conn.close()
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETE: 0, FAILED: 0}
+        by_kind = {}
+        for row in rows:
+            counts[row["status"]] += row["jobs"]
+            by_kind.setdefault(row["kind"], {})[row["status"]] = row["jobs"]
+        return {"backend": self.backend, **counts, "by_kind": by_kind}
+
+    def purge_expired(self, ttl: float = RESULT_TTL_SECONDS) -> int:
+        """ Deletes finished jobs (and their keys) older than ttl. """
+        cutoff = time.time() - ttl
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,)).rowcount
+
+
+# --- Redis Backend ---
+# Keys (prefix p): p job:<id> (hash), p key:<job key> -> id, p ready:<kind> (zset, score = available_at),
+# p leases (zset, score = lease expiry), p complete / p failed (zsets, score = finished_at).
+# Each state change is one Lua script, so it's atomic however many workers race for jobs.
+_REDIS_ENQUEUE = """
+local p, job_id, key, kind, payload, max_attempts, now = ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5], ARGV[6], ARGV[7]
+local existing = redis.call('GET', p .. 'key:' .. key)
+if existing and redis.call('EXISTS', p .. 'job:' .. existing) == 1 then
+    local job = p .. 'job:' .. existing
+    if redis.call('HGET', job, 'status') ~= 'failed' then return existing end
+    redis.call('HSET', job, 'status', 'queued', 'attempts', 0, 'available_at', now, 'finished_at', '', 'progress', '', 'result', '', 'error', '')
+    redis.call('ZREM', p .. 'failed', existing)
+    redis.call('ZADD', p .. 'ready:' .. redis.call('HGET', job, 'kind'), now, existing)
+    return existing
+end
+redis.call('HSET', p .. 'job:' .. job_id, 'job_id', job_id, 'job_key', key, 'kind', kind, 'payload', payload, 'status', 'queued',
+           'attempts', 0, 'max_attempts', max_attempts, 'submitted_at', now, 'available_at', now)
+redis.call('SET', p .. 'key:' .. key, job_id)
+redis.call('ZADD', p .. 'ready:' .. kind, now, job_id)
+return job_id
+"""
+
+_REDIS_CLAIM = """
+local p, worker, now, lease, limit = ARGV[1], ARGV[2], tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. 'leases', '-inf', '(' .. ARGV[3])) do
+    local job = p .. 'job:' .. id
+    redis.call('ZREM', p .. 'leases', id)
+    if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+        redis.call('HSET', job, 'status', 'failed', 'finished_at', now, 'error', ARGV[6], 'worker', '', 'lease_expires_at', '')
+        redis.call('ZADD', p .. 'failed', now, id)
+    else
+        redis.call('HSET', job, 'status', 'queued', 'available_at', now, 'error', ARGV[6], 'worker', '', 'lease_expires_at', '')
+        redis.call('ZADD', p .. 'ready:' .. redis.call('HGET', job, 'kind'), now, id)
+    end
+end
+local claimed = {}
+for i = 7, #ARGV do
+    local ready = p .. 'ready:' .. ARGV[i]
+    if #claimed >= limit then break end
+    for _, id in ipairs(redis.call('ZRANGEBYSCORE', ready, '-inf', ARGV[3], 'LIMIT', 0, limit - #claimed)) do
+        local job = p .. 'job:' .. id
+        redis.call('ZREM', ready, id)
+        redis.call('HSET', job, 'status', 'running', 'worker', worker, 'started_at', now, 'lease_expires_at', now + lease)
+        redis.call('HINCRBY', job, 'attempts', 1)
+        redis.call('ZADD', p .. 'leases', now + lease, id)
+        table.insert(claimed, id)
+    end
+end
+return claimed
+"""
+
+_REDIS_HEARTBEAT = """
+local p, id, worker, expires, progress = ARGV[1], ARGV[2], ARGV[3], ARGV[4], ARGV[5]
+local job = p .. 'job:' .. id
+if redis.call('HGET', job, 'status') ~= 'running' or redis.call('HGET', job, 'worker') ~= worker then return 0 end
+redis.call('HSET', job, 'lease_expires_at', expires)
+if progress ~= '' then redis.call('HSET', job, 'progress', progress) end
+redis.call('ZADD', p .. 'leases', expires, id)
+return 1
+"""
+
+_REDIS_FINISH = """
+local p, id, worker, now, outcome, result, err, backoff = ARGV[1], ARGV[2], ARGV[3], tonumber(ARGV[4]), ARGV[5], ARGV[6], ARGV[7], tonumber(ARGV[8])
+local job = p .. 'job:' .. id
+if redis.call('HGET', job, 'status') ~= 'running' or redis.call('HGET', job, 'worker') ~= worker then return false end
+redis.call('ZREM', p .. 'leases', id)
+local ready = p .. 'ready:' .. redis.call('HGET', job, 'kind')
+local attempts = tonumber(redis.call('HGET', job, 'attempts'))
+if outcome == 'retry' and attempts < tonumber(redis.call('HGET', job, 'max_attempts')) then
+    local at = now + backoff * 2 ^ math.max(0, attempts - 1)
+    redis.call('HSET', job, 'status', 'queued', 'available_at', at, 'error', err, 'worker', '', 'lease_expires_at', '')
+    redis.call('ZADD', ready, at, id)
+    return 'queued'
+end
+if outcome == 'release' then
+    redis.call('HSET', job, 'status', 'queued', 'available_at', now, 'attempts', attempts - 1, 'worker', '', 'lease_expires_at', '')
+    redis.call('ZADD', ready, now, id)
+    return 'queued'
+end
+local status = 'failed'
+if outcome == 'complete' then status = 'complete' end
+redis.call('HSET', job, 'status', status, 'result', result, 'error', err, 'finished_at', now, 'worker', '', 'lease_expires_at', '')
+redis.call('ZADD', p .. status, now, id)
+return status
+"""
+
+_REDIS_PURGE = """
+local p, cutoff, purged = ARGV[1], ARGV[2], 0
+for _, finished in ipairs({'complete', 'failed'}) do
+    for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. finished, '-inf', '(' .. cutoff)) do
+        local job = p .. 'job:' .. id
+        local key = p .. 'key:' .. (redis.call('HGET', job, 'job_key') or '')
+        if redis.call('GET', key) == id then redis.call('DEL', key) end
+        redis.call('DEL', job)
+        redis.call('ZREM', p .. finished, id)
+        purged = purged + 1
+    end
+end
+return purged
+"""
+
+
+class RedisBroker:
+    """
+    Jobs in Redis, shared by workers on any number of nodes (needs `pip install redis`).
+    Timestamps come from the callers, so keep the nodes' clocks in sync (NTP).
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, prefix: str = REDIS_PREFIX):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._scripts = None
+        self._lock = threading.Lock()
+
+    def _redis(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import redis
+                    except ImportError:
+                        raise BrokerError("A redis:// broker needs the redis package (pip install redis).")
+                    client = redis.Redis.from_url(self.url)
+                    self._scripts = {name: client.register_script(source) for name, source in (
+                        ("enqueue", _REDIS_ENQUEUE), ("claim", _REDIS_CLAIM), ("heartbeat", _REDIS_HEARTBEAT),
+                        ("finish", _REDIS_FINISH), ("purge", _REDIS_PURGE))}
+                    self._client = client
+        return self._client
+
+    def _run(self, script: str, *args):
+        self._redis()
+        return self._scripts[script](args=[self.prefix] + list(args))
+
+    def enqueue(self, kind: str, payload: dict, key: str, max_attempts: int = MAX_ATTEMPTS) -> dict:
+        job_id = self._run("enqueue", uuid.uuid4().hex, key, kind, json.dumps(payload), max_attempts, repr(time.time()))
+        return self.get(job_id.decode("utf-8"))
+
+    def claim(self, worker: str, kinds=JOB_KINDS, limit: int = 1, lease_seconds: float = LEASE_SECONDS) -> list:
+        ids = self._run("claim", worker, repr(time.time()), lease_seconds, limit, LEASE_LOST_ERROR, *kinds)
+        jobs = self.get_many([job_id.decode("utf-8") for job_id in ids])
+        return sorted(jobs.values(), key=lambda job: job["available_at"])
+
+    def heartbeat(self, job_id: str, worker: str, lease_seconds: float = LEASE_SECONDS, progress: dict = None) -> bool:
+        return bool(self._run("heartbeat", job_id, worker, repr(time.time() + lease_seconds), json.dumps(progress) if progress else ""))
+
+    def finish(self, job_id: str, worker: str, outcome: str, result=None, error: str = None):
+        status = self._run("finish", job_id, worker, repr(time.time()), outcome,
+                           json.dumps(result, default=str) if result is not None else "", error or "", RETRY_BACKOFF_SECONDS)
+        return status.decode("utf-8") if status else None
+
+    def get(self, job_id: str, include_result: bool = True):
+        return self.get_many([job_id], include_result).get(job_id)
+
+    def get_many(self, job_ids: list, include_result: bool = True) -> dict:
+        job_ids = list(dict.fromkeys(job_ids))
+        pipe = self._redis().pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(self.prefix + "job:" + job_id)
+        jobs = {}
+        for job_id, values in zip(job_ids, pipe.execute()):
+            if values:
+                jobs[job_id] = _job_dict({name.decode("utf-8"): value for name, value in values.items()}, include_result)
+        return jobs
+
+    def stats(self) -> dict:
+        client = self._redis()
+        by_kind = {kind: {QUEUED: client.zcard(self.prefix + "ready:" + kind)} for kind in JOB_KINDS}
+        return {
+            "backend": self.backend,
+            QUEUED: sum(counts[QUEUED] for counts in by_kind.values()),
+            RUNNING: client.zcard(self.prefix + "leases"),
+            COMPLETE: client.zcard(self.prefix + COMPLETE),
+            FAILED: client.zcard(self.prefix + FAILED),
+            "by_kind": by_kind
+        }
+
+    def purge_expired(self, ttl: float = RESULT_TTL_SECONDS) -> int:
+        return int(self._run("purge", repr(time.time() - ttl)))
+
+
+def open_broker(url: str = None):
+    """ sqlite:///path/jobs.sqlite3 (or a plain path) -> SQLiteBroker; redis://... / rediss://... -> RedisBroker. """
+    url = url or BROKER_URL
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):])
+    if "://" in url:
+        raise BrokerError(f"Unsupported broker URL '{url}' (use sqlite:///path or redis://host:port/db).")
+    return SQLiteBroker(url)
+
+
+# Shared broker used by server.py and worker.py
+broker = open_broker()
+
+
+# --- Publishing & Result Collection ---
+def purge(target=None, ttl: float = RESULT_TTL_SECONDS) -> int:
+    """ Deletes finished jobs and stored PDFs older than ttl (best effort: publishing goes on if it fails). """
+    target = target or broker
+    purged = 0
+    try:
+        purged = target.purge_expired(ttl)
+    except Exception as e:
+        print(f"Job Broker: Could not purge expired jobs: {e}")
+    cutoff = time.time() - ttl
+    try:
+        names = os.listdir(JOB_FILES_DIR)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = os.path.join(JOB_FILES_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff: os.remove(path)
+        except OSError:
+            pass # Removed by another node, or in use
+    return purged
+
+
+def submit(kind: str, payload: dict, key: str = None, run: str = None, target=None, purge_first: bool = True) -> dict:
+    """ Publishes one job (idempotent: an existing job with the same key is returned instead). """
+    _check_job(kind, payload)
+    target = target or broker
+    if key is None: key = job_key(kind, payload, run)
+    if purge_first: purge(target)
+    return target.enqueue(kind, payload, key)
+
+
+def submit_analyses(company_names: list, run: str = None, target=None) -> dict:
+    """ One analysis job per company (duplicates / aliases collapse). Returns {company: job}. """
+    target = target or broker
+    purge(target) # Once per batch, not per company
+    return {company: submit("analysis", {"company": company}, run=run, target=target, purge_first=False)
+            for company in dict.fromkeys(company_names)}
+
+
+def store_job_file(path: str, move: bool = False) -> str:
+    """
+    Puts a PDF into the shared job file store under its content hash and returns the file name
+    (what jobs carry). An identical file already stored is reused (its age is reset).
+    `move` hands the file over instead of copying it (e.g. a temp upload).
+    """
+    name = content_hash(path) + ".pdf"
+    target_path = os.path.join(JOB_FILES_DIR, name)
+    os.makedirs(JOB_FILES_DIR, exist_ok=True)
+    if os.path.exists(target_path):
+        os.utime(target_path) # Not purged while the new job may still need it
+        return name
+    fd, staging = tempfile.mkstemp(dir=JOB_FILES_DIR, prefix=".incoming-")
+    os.close(fd)
+    try:
+        if move: shutil.move(path, staging) # A rename when both are on one filesystem
+        else: shutil.copyfile(path, staging)
+        os.replace(staging, target_path) # Readers never see a partial file
+    except BaseException:
+        try: os.remove(staging)
+        except OSError: pass
+        raise
+    return name
+
+
+def job_file_path(name: str) -> str:
+    """ Local path of a stored job file (names are plain file names: no directories). """
+    if not name or os.path.basename(name) != name:
+        raise BrokerError(f"Invalid job file name '{name}'.")
+    return os.path.join(JOB_FILES_DIR, name)
+
+
+def submit_greenwash(company_name: str, pdf_path: str = None, pdf_url: str = None, filename: str = None,
+                     page_range=None, max_pages: int = None, run: str = None, target=None, move: bool = False) -> dict:
+    """
+    Publishes a greenwash analysis. A local PDF goes into the shared job file store (so a worker
+    on any node can read it) and the job is keyed by its content; a URL is downloaded by the worker.
+    """
+    if not pdf_path and not pdf_url:
+        raise BrokerError("A greenwash job needs a PDF (file or URL).")
+    payload = {"company": company_name, "filename": filename, "page_range": list(page_range) if page_range else None,
+               "max_pages": max_pages}
+    if pdf_path:
+        payload["pdf_file"] = store_job_file(pdf_path, move)
+        payload["pdf_sha256"] = payload["pdf_file"][:-len(".pdf")]
+    else:
+        payload["pdf_url"] = pdf_url
+    return submit("greenwash", payload, run=run, target=target)
+
+
+def wait_for(job_ids: list, timeout: float = None, poll: float = WAIT_POLL_SECONDS, target=None) -> dict:
+    """ Polls until every job has finished (or timeout seconds pass). Returns {job_id: job} for the known ones. """
+    target = target or broker
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        jobs = target.get_many(job_ids)
+        if all(job["status"] in FINISHED_STATES for job in jobs.values()):
+            return jobs
+        if deadline is not None and time.time() >= deadline:
+            return jobs
+        time.sleep(poll)
+
+
+def analyze_companies(company_names: list, timeout: float = DISTRIBUTED_TIMEOUT_SECONDS, run: str = None, target=None) -> dict:
+    """
+    Drop-in for ai_core.analyze_companies that runs on the workers: publishes one job per company
+    and collects the results. Returns {company: result dict, or JobFailed / TimeoutError}.
+    """
+    submitted = submit_analyses(company_names, run, target)
+    print(f"Job Broker: Published {len(submitted)} analysis jobs; waiting for workers...")
+    jobs = wait_for([job["job_id"] for job in submitted.values()], timeout, target=target)
+    results = {}
+    for company, job in submitted.items():
+        job = jobs.get(job["job_id"]) or job
+        if job["status"] == COMPLETE:
+            results[company] = job["result"]
+        elif job["status"] == FAILED:
+            results[company] = JobFailed(job["error"] or "Job failed")
+        else:
+            results[company] = TimeoutError(f"Job {job['job_id']} still {job['status']} after {timeout:.0f}s")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish analysis jobs to the broker and collect results.")
+    parser.add_argument("command", choices=["submit", "stats", "purge"])
+    parser.add_argument("--broker", default=BROKER_URL, help="sqlite:///path or redis://host:port/db")
+    parser.add_argument("--companies", help="Comma-separated company names")
+    parser.add_argument("--file", help="Watchlist file (one company per line)")
+    parser.add_argument("--run", help="Run label in the job keys (default: today's UTC date)")
+    parser.add_argument("--wait", action="store_true", help="Wait for the results and print a summary")
+    parser.add_argument("--timeout", type=float, default=DISTRIBUTED_TIMEOUT_SECONDS)
+    args = parser.parse_args(argv)
+
+    try:
+        target = open_broker(args.broker)
+        if args.command == "stats":
+            print(json.dumps(target.stats(), indent=2))
+            return 0
+        if args.command == "purge":
+            print(f"Job Broker: Purged {purge(target)} finished jobs.")
+            return 0
+        companies = [company.strip() for company in (args.companies or "").split(",") if company.strip()]
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as handle:
+                companies += [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+        if not companies:
+            parser.error("submit needs --companies or --file")
+        submitted = submit_analyses(companies, args.run, target)
+        print(f"Job Broker: {len(submitted)} analysis jobs published to {target.backend}.")
+        if not args.wait:
+            return 0
+        jobs = wait_for([job["job_id"] for job in submitted.values()], args.timeout, target=target)
+        for company, job in submitted.items():
+            job = jobs.get(job["job_id"]) or job
+            score = (job.get("result") or {}).get("overall_score") if job["status"] == COMPLETE else job.get("error")
+            print(f"  {company}: {job['status']} ({score})")
+        return 0 if all(job["status"] == COMPLETE for job in jobs.values()) else 1
+    except BrokerError as e:
+        print(f"Job Broker: {e}")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
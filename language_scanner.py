@@ -0,0 +1,187 @@
+# This is a new file: language_scanner.py
+# Single-pass, word-boundary-aware scanner for vague (weasel) vs. concrete language.
+# Used by greenwash_analyzer.py: one regex pass per page instead of one .count() per word.
+
+import re
+
+# --- CONFIGURATION: Special Terms ---
+# "%" means a quantified figure (e.g. "42%", "12.5 %"), not every percent sign
+SPECIAL_TERM_PATTERNS = {
+    "%": r"\d+(?:[.,]\d+)*\s?%",
+}
+SNIPPET_WIDTH = 30 # Characters shown on each side of a match
+SNIPPETS_PER_TERM = 3 # Occurrences per term whose context is kept (the rest are counted / located only)
+SEAM_CHARS = 200 # End / start of consecutive pages re-scanned together for phrases split by a page break
+DENSITY_PER_WORDS = 1000 # Densities are hits per 1,000 words
+
+
+def _term_pattern(term: str) -> str:
+    """ Regex for one term: whole words only, any whitespace between words. """
+    if term in SPECIAL_TERM_PATTERNS:
+        return SPECIAL_TERM_PATTERNS[term]
+    words = [re.escape(word) for word in term.split()]
+    return r"(?<!\w)" + r"\s+".join(words) + r"(?!\w)"
+
+
+class LanguageScanner:
+    """ Compiles all weasel and concrete terms into ONE alternation regex. """
+
+    def __init__(self, weasel_terms: list, concrete_terms: list):
+        self.weasel_terms = list(weasel_terms)
+        self.concrete_terms = list(concrete_terms)
+        self.terms = self.weasel_terms + self.concrete_terms
+        self.is_weasel = [True] * len(self.weasel_terms) + [False] * len(self.concrete_terms)
+        # Longest terms first so overlapping alternatives prefer the fuller phrase
+        order = sorted(range(len(self.terms)), key=lambda i: -len(self.terms[i]))
+        self.pattern = re.compile(
+            "|".join(f"(?P<t{i}>{_term_pattern(self.terms[i])})" for i in order),
+            re.IGNORECASE
+        )
+
+    def new_scan(self) -> "LanguageScan":
+        return LanguageScan(self)
+
+    def scan_pages(self, pages) -> "LanguageScan":
+        """ Scans an iterable of (page_number, text). """
+        scan = self.new_scan()
+        for page_number, text in pages:
+            scan.add_page(page_number, text)
+        return scan
+
+
+class LanguageScan:
+    """
+    Results of scanning a report: counts, every occurrence (page, offset),
+    per-page densities. Page text is not kept: only the context around the first
+    SNIPPETS_PER_TERM occurrences of each term, for snippets, and the last SEAM_CHARS
+    of the latest page. Matches starting there are counted once the next page (or a
+    result) is read, so a phrase split by a page break counts on the page where it starts.
+    """
+
+    def __init__(self, scanner: LanguageScanner):
+        self.scanner = scanner
+        self._counts = [0] * len(scanner.terms)
+        self._occurrences = [[] for _ in scanner.terms] # term index -> [(page_number, offset, length), ...]
+        self._page_stats = [] # One dict per scanned page
+        self._contexts = {} # (page_number, offset) -> (text around the match, match offset in it)
+        # (page stats, unscanned end of the latest page plus the character before it, its offset in that page, 1 if
+        # that character is included). Scans of the tail start after that character, so (?<!\w) still sees it.
+        self._seam = None
+
+    def add_page(self, page_number: int, text: str):
+        """ Scans one page (after the previous page's unscanned end) in a single regex pass. """
+        stats = {"page": page_number, "words": len(text.split()) if text else 0, "weasel_count": 0, "concrete_count": 0}
+        if not text:
+            self._flush() # An empty page ends any phrase
+            self._set_densities(stats)
+            self._page_stats.append(stats)
+            return
+        previous, tail, tail_offset, lead = self._seam or (None, "", 0, 0)
+        self._seam = None
+        joined = tail + "\n" + text if previous else text
+        base = len(joined) - len(text) # Where this page starts in `joined`
+        cutoff = base + max(0, len(text) - SEAM_CHARS) # Matches from here on wait for the next page
+        scanned_to = base
+        for match in self.scanner.pattern.finditer(joined, lead):
+            if match.start() >= cutoff: break
+            if match.start() < base:
+                self._record(previous, match, tail_offset + match.start(), joined)
+            else:
+                self._record(stats, match, match.start() - base, joined)
+            scanned_to = max(scanned_to, match.end())
+        if previous: self._set_densities(previous)
+        self._set_densities(stats)
+        self._page_stats.append(stats)
+        tail_start = max(cutoff, scanned_to) - base
+        lead = 1 if tail_start > 0 else 0 # Never start the tail as if a word began there
+        self._seam = (stats, text[tail_start - lead:], tail_start - lead, lead)
+
+    def _flush(self):
+        """ Counts matches in the latest page's unscanned end (no next page to join it with). """
+        if self._seam is None: return
+        stats, tail, tail_offset, lead = self._seam
+        self._seam = None
+        for match in self.scanner.pattern.finditer(tail, lead):
+            self._record(stats, match, tail_offset + match.start(), tail)
+        self._set_densities(stats)
+
+    def _record(self, stats: dict, match, offset: int, text: str):
+        """ Counts one match found in `text`, at `offset` on the stats' page. """
+        term_index = int(match.lastgroup[1:])
+        page_number = stats["page"]
+        self._counts[term_index] += 1
+        self._occurrences[term_index].append((page_number, offset, match.end() - match.start()))
+        if self._counts[term_index] <= SNIPPETS_PER_TERM:
+            start = max(0, match.start() - SNIPPET_WIDTH)
+            self._contexts[(page_number, offset)] = (text[start:match.end() + SNIPPET_WIDTH], match.start() - start)
+        stats["weasel_count" if self.scanner.is_weasel[term_index] else "concrete_count"] += 1
+
+    @staticmethod
+    def _set_densities(stats: dict):
+        scale = DENSITY_PER_WORDS / stats["words"] if stats["words"] else 0.0
+        stats["weasel_density"] = round(stats["weasel_count"] * scale, 2)
+        stats["concrete_density"] = round(stats["concrete_count"] * scale, 2)
+
+    @property
+    def counts(self) -> list:
+        self._flush()
+        return self._counts
+
+    @property
+    def occurrences(self) -> list:
+        self._flush()
+        return self._occurrences
+
+    @property
+    def page_stats(self) -> list:
+        self._flush()
+        return self._page_stats
+
+    # --- Totals ---
+    @property
+    def weasel_count(self) -> int:
+        return sum(count for count, weasel in zip(self.counts, self.scanner.is_weasel) if weasel)
+
+    @property
+    def concrete_count(self) -> int:
+        return sum(count for count, weasel in zip(self.counts, self.scanner.is_weasel) if not weasel)
+
+    def term_counts(self) -> dict:
+        return {term: count for term, count in zip(self.scanner.terms, self.counts)}
+
+    def term_pages(self) -> dict:
+        """ Sorted, unique page numbers on which each found term appears. """
+        return {
+            term: sorted({page for page, _, _ in occurrences})
+            for term, occurrences in zip(self.scanner.terms, self.occurrences) if occurrences
+        }
+
+    def densest_pages(self, limit: int = 5) -> list:
+        """ Pages with the highest weasel-word density (ties: more hits first). """
+        pages = [stats for stats in self.page_stats if stats["weasel_count"]]
+        pages.sort(key=lambda stats: (-stats["weasel_density"], -stats["weasel_count"], stats["page"]))
+        return pages[:limit]
+
+    # --- Lazy Evidence ---
+    def occurrences_of(self, term: str) -> list:
+        return self.occurrences[self.scanner.terms.index(term)]
+
+    def snippet(self, page_number: int, offset: int, length: int, width: int = SNIPPET_WIDTH) -> str:
+        """
+        Cuts a "...context..." snippet around one of the first SNIPPETS_PER_TERM occurrences
+        of a term (at most SNIPPET_WIDTH characters each side). "" for other occurrences.
+        """
+        if (page_number, offset) not in self._contexts: return ""
+        context, start = self._contexts[(page_number, offset)]
+        width = min(width, SNIPPET_WIDTH)
+        return "..." + context[max(0, start - width):start + length + width].replace("\n", " ") + "..."
+
+    def first_snippets(self, terms: list = None) -> list:
+        """ (term, page_number, snippet) for the first occurrence of each found term. """
+        results = []
+        for term in (self.scanner.weasel_terms if terms is None else terms):
+            occurrences = self.occurrences_of(term)
+            if occurrences:
+                page_number, offset, length = occurrences[0]
+                results.append((term, page_number, self.snippet(page_number, offset, length)))
+        return results
@@ -0,0 +1,146 @@
+# This is a new file: launcher.py
+# Production launcher: loads the app (AI models, clients) ONCE, then forks N uvicorn workers
+# that share one listening socket and the preloaded memory (copy-on-write).
+# Usage: python launcher.py --workers 4 --port 8000   (or REPUTEX_WORKERS / REPUTEX_PORT)
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+# --- CONFIGURATION: Serving ---
+DEFAULT_HOST = os.environ.get("REPUTEX_HOST", "0.0.0.0")
+DEFAULT_PORT = int(os.environ.get("REPUTEX_PORT", "8000"))
+DEFAULT_WORKERS = int(os.environ.get("REPUTEX_WORKERS", "2"))
+GRACEFUL_TIMEOUT = float(os.environ.get("REPUTEX_GRACEFUL_TIMEOUT", "30")) # Seconds workers get to drain
+RESPAWN_DELAY_SECONDS = 1.0 # Pause before replacing a crashed worker
+# Preloaded models are shared copy-on-write by all workers, and workers never idle-unload them
+# (unloading an inherited copy frees nothing; see model_registry.py). Set to 0 on mixed-traffic hosts
+# so each worker loads models on demand and its idle unloads actually free memory.
+PRELOAD_MODELS = os.environ.get("REPUTEX_PRELOAD_MODELS", "1") != "0"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ReputeX API with preloaded models and forked workers.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    return parser.parse_args(argv)
+
+
+def preload():
+    """
+    Imports the app in the parent so every worker inherits loaded models & clients.
+    Nothing here may start threads or open network connections (both break across fork).
+    """
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false") # HF tokenizers aren't fork-safe once used
+    print("Launcher: Preloading app, AI models and clients...")
+    started = time.time()
+    import server
+    if PRELOAD_MODELS:
+        server.warm_up() # Dashboard + greenwash models and the Reddit client, before forking
+        server.WARM_MODELS = [] # Already loaded; workers inherit them
+    gc.collect()
+    gc.freeze() # Keep preloaded objects out of GC scans so workers don't copy their pages
+    print(f"Launcher: Preload finished in {time.time() - started:.1f}s.")
+    return server.app
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """ One listening socket, created before forking and shared by all workers. """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, index: int, args):
+    """ Child process: serves on the shared socket until SIGTERM, then drains and exits. """
+    import uvicorn
+    signal.signal(signal.SIGTERM, signal.SIG_DFL) # uvicorn installs its own handlers
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if index != 0:
+        # Only worker 0 refreshes the leaderboard; the others read the shared snapshot
+        os.environ["REPUTEX_LEADERBOARD_SCHEDULER"] = "0"
+    config = uvicorn.Config(app, timeout_graceful_shutdown=args.graceful_timeout, log_level="info")
+    print(f"Launcher: Worker {index} (pid {os.getpid()}) serving on http://{args.host}:{args.port}")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    app = preload()
+
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        # Single process (also the fallback where fork isn't available, e.g. Windows)
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=args.graceful_timeout)
+        return
+
+    sock = bind_socket(args.host, args.port)
+    workers = {} # pid -> worker index
+    stopping = threading.Event()
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(app, sock, index, args)
+            except BaseException as e:
+                print(f"Launcher: Worker {index} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        workers[pid] = index
+
+    def kill_stragglers():
+        for pid in list(workers):
+            print(f"Launcher: Worker pid {pid} did not exit in time; killing it.")
+            try: os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError: pass
+
+    def handle_stop(signum, frame):
+        if stopping.is_set(): return
+        stopping.set()
+        print(f"Launcher: Received signal {signum}; draining {len(workers)} workers (up to {args.graceful_timeout:.0f}s)...")
+        for pid in list(workers):
+            try: os.kill(pid, signal.SIGTERM) # uvicorn: stop accepting, finish in-flight requests, run shutdown
+            except ProcessLookupError: pass
+        timer = threading.Timer(args.graceful_timeout + 5, kill_stragglers)
+        timer.daemon = True
+        timer.start()
+
+    for index in range(args.workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    print(f"Launcher: Started {args.workers} workers on http://{args.host}:{args.port} (pid {os.getpid()}).")
+
+    # --- Supervise: reap exited workers, replace crashed ones until shutdown ---
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is None or stopping.is_set():
+            continue
+        print(f"Launcher: Worker {index} (pid {pid}) exited with status {status}; restarting.")
+        time.sleep(RESPAWN_DELAY_SECONDS)
+        if not stopping.is_set():
+            spawn(index)
+
+    sock.close()
+    print("Launcher: All workers stopped.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+# This is a new file: leaderboard_materializer.py
+# Keeps a watchlist leaderboard materialized in the background so /api/leaderboard is a fast read.
+# Only companies whose data has expired are re-analyzed, a few at a time, with pauses in between.
+
+import os
+import threading
+import time
+from analysis_cache import DiskCache
+
+# --- CONFIGURATION: Leaderboard Refresh ---
+def _env_list(name: str):
+    value = os.environ.get(name, "")
+    companies = [company.strip() for company in value.split(",") if company.strip()]
+    return companies or None
+
+WATCHLIST = _env_list("REPUTEX_LEADERBOARD_COMPANIES") # None = ai_core's default companies
+COMPANY_TTL_SECONDS = float(os.environ.get("REPUTEX_LEADERBOARD_TTL", "86400")) # Matches get_leaderboard's cache
+CHECK_INTERVAL_SECONDS = float(os.environ.get("REPUTEX_LEADERBOARD_CHECK_INTERVAL", "300")) # How often expiry is checked
+REFRESH_BATCH_SIZE = 3 # Companies analyzed together (shared model batches)
+STAGGER_SECONDS = 30.0 # Pause between refresh batches (spreads upstream API usage)
+SNAPSHOT_KEY = "snapshot"
+
+
+class LeaderboardMaterializer:
+    """
+    Background refresher + local snapshot store for the leaderboard.
+    `analyze_companies(names)` returns {company: result dict or Exception};
+    `make_row(company, result)` and `sort_key(row)` format the leaderboard rows.
+    """
+
+    def __init__(self, analyze_companies, make_row, sort_key, watchlist: list,
+                 ttl: float = COMPANY_TTL_SECONDS, check_interval: float = CHECK_INTERVAL_SECONDS,
+                 batch_size: int = REFRESH_BATCH_SIZE, stagger: float = STAGGER_SECONDS, store: DiskCache = None):
+        self.analyze_companies = analyze_companies
+        self.make_row = make_row
+        self.sort_key = sort_key
+        self.watchlist = list(dict.fromkeys(watchlist))
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.batch_size = max(1, batch_size)
+        self.stagger = stagger
+        self.store = store or DiskCache("leaderboard", max_entries=10)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._refreshing = False
+        self._stopping = False
+        self._store_mtime = None
+        # company -> {"row", "refreshed_at", "last_attempt_at", "last_error"}
+        self._companies = {}
+        self._sync_from_store()
+
+    # --- Scheduler ---
+    def start(self):
+        """ Starts the background refresh thread (once). """
+        with self._lock:
+            if self._thread is not None: return
+            self._thread = threading.Thread(target=self._run, name="leaderboard-refresh", daemon=True)
+            self._thread.start()
+        print(f"Leaderboard: Background refresh started for {len(self.watchlist)} companies (TTL {self.ttl:.0f}s).")
+
+    def stop(self):
+        """ Ends the refresh thread after its current batch. """
+        self._stopping = True
+        self._wake.set()
+
+    def request_refresh(self):
+        """ Wakes the scheduler now instead of at the next check. """
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self.refresh_expired()
+            except Exception as e:
+                print(f"Leaderboard: Refresh cycle failed: {e}")
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+        print("Leaderboard: Background refresh stopped.")
+
+    def expired_companies(self, now: float = None) -> list:
+        """ Watchlist companies with no data or data older than the TTL, oldest first. """
+        now = time.time() if now is None else now
+        with self._lock:
+            refreshed = {company: (self._companies.get(company) or {}).get("refreshed_at") or 0 for company in self.watchlist}
+        return sorted((company for company, at in refreshed.items() if now - at >= self.ttl), key=lambda company: refreshed[company])
+
+    def refresh_expired(self) -> int:
+        """ Re-analyzes expired companies in small, staggered batches. Returns how many were refreshed. """
+        due = self.expired_companies()
+        if not due: return 0
+        print(f"Leaderboard: Refreshing {len(due)} expired companies: {due}")
+        self._refreshing = True
+        refreshed = 0
+        try:
+            for start in range(0, len(due), self.batch_size):
+                if self._stopping: break
+                if start: self._wake.wait(self.stagger) # Returns early on stop()
+                batch = due[start:start + self.batch_size]
+                try:
+                    results = self.analyze_companies(batch)
+                except Exception as e:
+                    results = {company: e for company in batch}
+                refreshed += self._record(batch, results)
+        finally:
+            self._refreshing = False
+        return refreshed
+
+    def _record(self, batch: list, results: dict) -> int:
+        now = time.time()
+        refreshed = 0
+        with self._lock:
+            for company in batch:
+                result = results.get(company)
+                entry = dict(self._companies.get(company) or {}, last_attempt_at=now)
+                if isinstance(result, dict):
+                    entry.update(row=self.make_row(company, result), refreshed_at=now, last_error=None)
+                    refreshed += 1
+                else:
+                    # Keep serving the last good row; the company stays due and is retried next check
+                    entry["last_error"] = str(result) if result is not None else "No result"
+                    entry.setdefault("row", self.make_row(company, result))
+                self._companies[company] = entry
+            stored = {"companies": dict(self._companies), "updated_at": now}
+        self.store.put(SNAPSHOT_KEY, stored)
+        return refreshed
+
+    def _sync_from_store(self):
+        """
+        Reloads the stored snapshot if another process (the worker running the
+        scheduler) has written a newer one. Cheap: one stat() when nothing changed.
+        """
+        try:
+            mtime = os.stat(self.store._path(SNAPSHOT_KEY)).st_mtime
+        except OSError:
+            return
+        if mtime == self._store_mtime: return
+        stored = self.store.get(SNAPSHOT_KEY) or {}
+        try:
+            mtime = os.stat(self.store._path(SNAPSHOT_KEY)).st_mtime # get() refreshes the mtime (LRU)
+        except OSError:
+            pass
+        with self._lock:
+            self._companies = stored.get("companies", {})
+            self._store_mtime = mtime
+
+    # --- Reads ---
+    def snapshot(self) -> dict:
+        """ Latest materialized leaderboard plus per-company freshness (no upstream calls). """
+        if self._thread is None:
+            self._sync_from_store() # Not the refreshing process: follow the shared store
+        now = time.time()
+        with self._lock:
+            entries = {company: self._companies.get(company) for company in self.watchlist}
+        rows = [entry["row"] for entry in entries.values() if entry and entry.get("row")]
+        rows.sort(key=self.sort_key, reverse=True)
+
+        freshness = {}
+        for company, entry in entries.items():
+            refreshed_at = (entry or {}).get("refreshed_at")
+            freshness[company] = {
+                "refreshed_at": refreshed_at,
+                "age_seconds": round(now - refreshed_at, 1) if refreshed_at else None,
+                "fresh": bool(refreshed_at) and now - refreshed_at < self.ttl,
+                "last_error": (entry or {}).get("last_error")
+            }
+        timestamps = [item["refreshed_at"] for item in freshness.values() if item["refreshed_at"]]
+        return {
+            "leaderboard": rows,
+            "generated_at": max(timestamps) if timestamps else None,
+            "oldest_company_at": min(timestamps) if timestamps else None,
+            "refreshing": self._refreshing,
+            "complete": len(rows) == len(self.watchlist),
+            "companies": freshness
+        }
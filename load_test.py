@@ -0,0 +1,365 @@
+# This is a new file: load_test.py
+# Load test for the API: starts the server (launcher.py, N workers) against upstream_simulator.py,
+# drives a weighted request mix at increasing concurrency, and reports p50/p95/p99 latency,
+# throughput and error rates per endpoint, plus the concurrency where the server saturates.
+# Usage: python load_test.py [--mix analyze=6,greenwash=1,self_assessment=3,leaderboard=2]
+#                            [--concurrency 1,2,4,8,16] [--duration 20] [--profile realistic] [--real-models]
+#                            [--target http://host:port]  (test an already running server instead)
+#        python load_test.py --serve-stubbed [launcher.py options]  (just the server, with stub models)
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import requests
+import upstream_simulator
+
+# --- CONFIGURATION: Load Test ---
+DEFAULT_MIX = "analyze=6,greenwash=1,self_assessment=3,leaderboard=2"
+DEFAULT_CONCURRENCY = "1,2,4,8,16"
+STAGE_SECONDS = 20.0
+REQUEST_TIMEOUT_SECONDS = 180
+SERVER_START_TIMEOUT_SECONDS = 120
+SATURATION_GAIN = 0.10 # A concurrency step must add at least this much throughput...
+MAX_FAILURE_RATE = 0.01 # ...and fail (errors + 429/503) at most this often, or the server is saturated
+SERVE_STUBBED_FLAG = "--serve-stubbed" # First argument: run launcher.py with stub models instead of a load test
+REPORT_PAGES = 3 # Pages in the generated greenwash test PDF
+REPORT_LINES = [
+    "{company} is committed to achieving net zero emissions by 2040.",
+    "Our eco-friendly products are sustainable and green across the value chain.",
+    "We reduced Scope 1 and Scope 2 emissions by 12% against the 2019 baseline.",
+    "{company} supports fair labour practices and employee wellbeing in every market.",
+    "The board oversees climate risk through an independent sustainability committee.",
+]
+
+
+# --- Request Builders ---
+def make_report_pdf(company: str, nonce: str) -> bytes:
+    """ Small ESG-style report; the nonce makes each upload unique (no report-cache hits). """
+    import fitz # PyMuPDF (already a server dependency)
+    doc = fitz.open()
+    for page_number in range(REPORT_PAGES):
+        page = doc.new_page()
+        lines = [line.format(company=company) for line in REPORT_LINES] + [f"Page {page_number + 1}. Reference {nonce}."]
+        page.insert_text((72, 72), "\n".join(lines), fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def self_assessment_payload(company: str, rng: random.Random) -> dict:
+    return {
+        "company_name": company, "sector": rng.choice(["Technology", "Energy", "Finance", None]),
+        "ghg_disclosed": rng.random() < 0.5, "renewable_percent": rng.uniform(0, 100), "water_target": rng.random() < 0.5,
+        "waste_reduction_program": rng.random() < 0.5, "biodiversity_policy": rng.random() < 0.5,
+        "grievance_mechanism": rng.random() < 0.5, "gender_pay_gap": rng.uniform(0, 30), "supplier_audits": rng.random() < 0.5,
+        "employee_training_hours": rng.randint(0, 40), "data_privacy_policy": rng.random() < 0.5,
+        "board_esg_committee": rng.random() < 0.5, "board_female_percent": rng.uniform(0, 60),
+        "anticorruption_training": rng.random() < 0.5, "exec_comp_esg_linked": rng.random() < 0.5,
+        "independent_board_chair": rng.random() < 0.5,
+    }
+
+
+def build_request(endpoint: str, company: str, rng: random.Random, unique_reports: bool = True):
+    """ (method, path, requests kwargs) for one call to the endpoint. """
+    if endpoint == "analyze":
+        return "GET", "/api/analyze", {"params": {"company": company}}
+    if endpoint == "greenwash":
+        nonce = f"{rng.getrandbits(64):x}" if unique_reports else "fixed"
+        return "POST", "/api/analyze-greenwash", {
+            "data": {"company_name": company},
+            "files": {"file": ("report.pdf", make_report_pdf(company, nonce), "application/pdf")}
+        }
+    if endpoint == "self_assessment":
+        return "POST", "/submit_self_assessment/", {"json": self_assessment_payload(company, rng)}
+    if endpoint == "leaderboard":
+        return "GET", "/api/leaderboard", {}
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+ENDPOINTS = ["analyze", "greenwash", "self_assessment", "leaderboard"]
+
+
+def parse_mix(spec: str) -> dict:
+    """ "analyze=6,leaderboard=2" -> {"analyze": 6.0, "leaderboard": 2.0} """
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' in mix (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("The request mix needs at least one endpoint with a positive weight.")
+    return mix
+
+
+def classify_response(response) -> str:
+    """ "ok", "rejected" (429/503 admission control), "http_<status>", or "app_error" (200 with an error body). """
+    if response.status_code in (429, 503):
+        return "rejected"
+    if response.status_code >= 400:
+        return f"http_{response.status_code}"
+    if "json" in response.headers.get("Content-Type", ""):
+        try:
+            body = response.json()
+        except ValueError:
+            return "bad_json"
+        if isinstance(body, dict) and (body.get("error") or body.get("status") == "Error"):
+            return "app_error"
+    return "ok"
+
+
+# --- Statistics ---
+def percentile(sorted_values: list, fraction: float):
+    """ Nearest-rank percentile of an already sorted list (None if empty). """
+    if not sorted_values: return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.4999)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """ samples: [(latency_seconds, outcome)]. """
+    latencies = sorted(latency for latency, _ in samples)
+    outcomes = {}
+    for _, outcome in samples:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    count = len(samples)
+    failed = count - outcomes.get("ok", 0)
+    ms = lambda value: None if value is None else round(value * 1000, 1)
+    return {
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 3) if elapsed else 0.0,
+        "ok_rps": round(outcomes.get("ok", 0) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)), "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)), "max_ms": ms(latencies[-1] if latencies else None),
+        "failure_rate": round(failed / count, 4) if count else 0.0,
+        "rejected_rate": round(outcomes.get("rejected", 0) / count, 4) if count else 0.0,
+        "outcomes": outcomes,
+    }
+
+
+def find_saturation(stages: list, slo_p95_ms: float = None):
+    """
+    First stage where adding concurrency stopped adding successful throughput, failures
+    exceeded MAX_FAILURE_RATE, or p95 broke the SLO. None if the server kept up.
+    """
+    best_rps, previous = 0.0, None
+    for stage in stages:
+        overall = stage["overall"]
+        reasons = []
+        if overall["failure_rate"] > MAX_FAILURE_RATE:
+            reasons.append(f"failure rate {overall['failure_rate']:.1%}")
+        if slo_p95_ms and (overall["p95_ms"] or 0) > slo_p95_ms:
+            reasons.append(f"p95 {overall['p95_ms']:.0f}ms over the {slo_p95_ms:.0f}ms SLO")
+        if previous is not None and overall["ok_rps"] < best_rps * (1 + SATURATION_GAIN):
+            reasons.append(f"throughput stopped growing ({overall['ok_rps']:.2f} ok rps vs {best_rps:.2f})")
+        if reasons:
+            return {"concurrency": stage["concurrency"], "reasons": reasons, "peak_ok_rps": best_rps,
+                    "max_good_concurrency": previous["concurrency"] if previous else None}
+        best_rps = max(best_rps, overall["ok_rps"])
+        previous = stage
+    return None
+
+
+# --- Load Generation ---
+def run_stage(base_url: str, mix: dict, concurrency: int, duration: float, companies: list,
+              unique_reports: bool = True, seed: int = 0) -> dict:
+    """ `concurrency` closed-loop clients send back-to-back requests for `duration` seconds. """
+    samples = {endpoint: [] for endpoint in mix}
+    lock = threading.Lock()
+    endpoints, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def client(client_index: int):
+        rng = random.Random(seed * 1000 + client_index)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            method, path, kwargs = build_request(endpoint, rng.choice(companies), rng, unique_reports)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, timeout=REQUEST_TIMEOUT_SECONDS, **kwargs)
+                outcome = classify_response(response)
+            except requests.exceptions.Timeout:
+                outcome = "timeout"
+            except requests.exceptions.RequestException:
+                outcome = "connection_error"
+            with lock:
+                samples[endpoint].append((time.perf_counter() - started, outcome))
+        session.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - started # Includes requests still in flight at the deadline
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "overall": summarize([sample for endpoint_samples in samples.values() for sample in endpoint_samples], elapsed),
+        "endpoints": {endpoint: summarize(endpoint_samples, elapsed) for endpoint, endpoint_samples in samples.items()},
+    }
+
+
+# --- Server Under Test ---
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def serve_with_stub_models(launcher_argv: list) -> int:
+    """
+    launcher.py with upstream_simulator's stub pipelines in place of the real models. The factory is
+    installed before the launcher preloads the app, so every forked worker inherits it.
+    """
+    import launcher
+    import model_registry
+    model_registry.registry.set_pipeline_factory(upstream_simulator.StubPipeline)
+    print("Load Test: Serving with stub models.")
+    return launcher.main(launcher_argv)
+
+
+def start_server(env: dict, workers: int, log_path: str, stub_models: bool = True):
+    """ Runs launcher.py (through serve_with_stub_models) on a free port; returns (process, base_url) once /api/queues answers. """
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log = open(log_path, "w")
+    command = [sys.executable, os.path.abspath(__file__), SERVE_STUBBED_FLAG] if stub_models else [sys.executable, "launcher.py"]
+    process = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=log, stderr=subprocess.STDOUT
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < SERVER_START_TIMEOUT_SECONDS:
+        if process.poll() is not None:
+            raise SystemExit(f"Load Test: Server exited during startup (see {log_path}).")
+        try:
+            if requests.get(base_url + "/api/queues", timeout=1).status_code == 200:
+                print(f"Load Test: Server listening on {base_url} after {time.perf_counter() - started:.1f}s ({workers} workers).")
+                return process, base_url
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit(f"Load Test: Server did not start within {SERVER_START_TIMEOUT_SECONDS}s (see {log_path}).")
+
+
+def stop_server(process):
+    process.terminate() # launcher.py drains its workers on SIGTERM
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- Report ---
+def _format_ms(value) -> str:
+    return f"{value:>8.0f}" if value is not None else f"{'-':>8}"
+
+
+def print_stage(stage: dict, upstream_calls: dict = None):
+    overall = stage["overall"]
+    print(f"\nConcurrency {stage['concurrency']}: {overall['requests']} requests in {stage['elapsed_seconds']}s "
+          f"({overall['throughput_rps']:.2f} rps, {overall['ok_rps']:.2f} ok rps), failures {overall['failure_rate']:.1%}")
+    print(f"  {'endpoint':<16}{'req':>6}{'rps':>8}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'max ms':>8}{'fail':>7}{'429/503':>8}")
+    for name, summary in list(stage["endpoints"].items()) + [("all", overall)]:
+        print(f"  {name:<16}{summary['requests']:>6}{summary['throughput_rps']:>8.2f}{_format_ms(summary['p50_ms'])}"
+              f"{_format_ms(summary['p95_ms'])}{_format_ms(summary['p99_ms'])}{_format_ms(summary['max_ms'])}"
+              f"{summary['failure_rate']:>7.1%}{summary['rejected_rate']:>8.1%}")
+    other = {outcome: count for outcome, count in overall["outcomes"].items() if outcome not in ("ok", "rejected")}
+    if other: print(f"  errors: {other}")
+    if upstream_calls:
+        print("  upstream calls: " + ", ".join(f"{provider} {counts['requests']}" + (f" ({counts['errors']} err, {counts['timeouts']} timeout)" if counts['errors'] or counts['timeouts'] else "")
+                                          for provider, counts in upstream_calls.items()))
+
+
+def _diff_counts(after: dict, before: dict) -> dict:
+    return {provider: {key: value - before[provider][key] for key, value in counts.items()} for provider, counts in after.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the ReputeX API against simulated upstream APIs.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoints (default {DEFAULT_MIX})")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="Comma-separated client counts, one stage each")
+    parser.add_argument("--duration", type=float, default=STAGE_SECONDS, help="Seconds per stage")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unrecorded seconds at concurrency 1 first")
+    parser.add_argument("--companies", type=int, default=500, help="Distinct company names (fewer = more cache hits)")
+    parser.add_argument("--repeat-reports", action="store_true", help="Upload the same PDF each time (report-cache hits)")
+    parser.add_argument("--profile", default="realistic", choices=sorted(upstream_simulator.PROFILES), help="Upstream latency / error profile")
+    parser.add_argument("--set", dest="overrides", help='Upstream profile overrides, e.g. "*.error_rate=0.1,gnews.latency_ms=800"')
+    parser.add_argument("--real-models", action="store_true", help="Load the real transformers models instead of stubs")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+    parser.add_argument("--target", help="Base URL of a running server (no local server / simulator is started)")
+    parser.add_argument("--slo-p95", type=float, help="p95 latency (ms) above which a stage counts as saturated")
+    parser.add_argument("--json", dest="json_path", help="Also write the full report here")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    companies = [f"Loadtest Company {index:04d}" for index in range(max(1, args.companies))]
+
+    simulator = process = None
+    workdir = tempfile.mkdtemp(prefix="reputex-loadtest-")
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            simulator = upstream_simulator.UpstreamSimulator(upstream_simulator.build_profile(args.profile, args.overrides)).start()
+            print(f"Load Test: Upstream simulator on {simulator.base_url} (profile '{args.profile}').")
+            env = dict(os.environ, **simulator.server_env())
+            env.update({
+                "REPUTEX_DATA_DIR": os.path.join(workdir, "data"), "REPUTEX_CACHE_DIR": os.path.join(workdir, "cache"),
+                "REPUTEX_LEADERBOARD_SCHEDULER": "0", "REPUTEX_SECRETS_FILE": os.path.join(workdir, "no-secrets.toml"),
+            })
+            process, base_url = start_server(env, args.workers, os.path.join(workdir, "server.log"), stub_models=not args.real_models)
+
+        if args.warmup > 0:
+            print(f"Load Test: Warming up for {args.warmup:.0f}s...")
+            run_stage(base_url, mix, 1, args.warmup, companies, not args.repeat_reports, seed=args.seed + 999)
+
+        stages = []
+        for level in levels:
+            print(f"Load Test: Running {args.duration:.0f}s at concurrency {level}...")
+            before = simulator.stats() if simulator else None
+            stage = run_stage(base_url, mix, level, args.duration, companies, not args.repeat_reports, seed=args.seed + level)
+            if simulator: stage["upstream_calls"] = _diff_counts(simulator.stats(), before)
+            stages.append(stage)
+            print_stage(stage, stage.get("upstream_calls"))
+
+        saturation = find_saturation(stages, args.slo_p95)
+        print("\n--- Saturation ---")
+        if saturation:
+            print(f"Saturated at concurrency {saturation['concurrency']}: {'; '.join(saturation['reasons'])}.")
+            print(f"Highest concurrency that kept up: {saturation['max_good_concurrency'] or 'none'} (peak {saturation['peak_ok_rps']:.2f} ok rps).")
+        else:
+            print(f"No saturation up to concurrency {levels[-1] if levels else 0}; add higher levels to find the limit.")
+
+        report = {
+            "target": base_url, "mix": mix, "stage_seconds": args.duration, "profile": None if args.target else args.profile,
+            "models": "real" if args.real_models else "stub", "workers": None if args.target else args.workers,
+            "stages": stages, "saturation": saturation,
+        }
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as handle:
+                json.dump(report, handle, indent=2)
+            print(f"Load Test: Report written to {args.json_path}")
+        if process: print(f"Load Test: Server log: {os.path.join(workdir, 'server.log')}")
+        return 0
+    finally:
+        if process: stop_server(process)
+        if simulator: simulator.stop()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == [SERVE_STUBBED_FLAG]:
+        sys.exit(serve_with_stub_models(sys.argv[2:]))
+    sys.exit(main())
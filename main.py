@@ -1,11 +1,16 @@
-# main.py (FastAPI Server)
+# main.py (FastAPI Routes: legacy greenwash endpoint)
+# Served by the shared app from server.create_app(); run via launcher.py.
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import APIRouter, HTTPException, Request
 import greenwash_analyzer # <-- IMPORTS THE USER'S AI LOGIC
-import uvicorn
+import uploads # Size-capped uploads, streamed straight to disk
+import cancellation # Stop abandoned / overdue analyses
+import admission # Shared "report" workload limits with server.py
+import os
 
-app = FastAPI()
+ANALYSIS_TIMEOUT_SECONDS = float(os.environ.get("REPUTEX_GREENWASH_TIMEOUT", "600"))
+
+router = APIRouter()
 
 # --- CORS Configuration ---
 # *** FIX: ADDED PORT 5173 FOR VITE FRONTEND ***
@@ -14,49 +19,71 @@ origins = [
     "http://localhost:3000",  # Standard React development port
     "http://localhost:3001",  # Another common React port
 ]
+# (Merged with server.py's origins in server.create_app)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"], # Allow all methods (POST, GET, etc.)
-    allow_headers=["*"], # Allow all headers
-)
+# --- Upload Size Limit (rejects oversized uploads before the body is read) ---
+uploads.UPLOAD_PATHS.add("/analyze_company/")
 
 # --- API Endpoint for Greenwashing Analysis ---
-@app.post("/analyze_company/")
-async def handle_analysis_request(
-    company_name: str = Form(...),
-    file: UploadFile = File(...)
-):
+@router.post("/analyze_company/")
+async def handle_analysis_request(request: Request):
     """
-    Receives company name and PDF file from the frontend,
+    Receives company name and PDF file (form fields company_name, file) from the frontend,
     calls the greenwash analyzer, and returns the report.
     """
-    print(f"Received request for company: {company_name}, file: {file.filename}")
-
-    # Basic check for PDF file type
-    if file.content_type != "application/pdf":
-        print("Error: Invalid file type.")
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
-
+    pdf_path = None
+    slot = None
     try:
-        # Read the entire file content as bytes
-        pdf_bytes = await file.read()
+        slot = admission.pool("report").reserve() # Reject before reading the upload if we're full; hold the slot while it's read
+        # The upload streams straight to a size-capped temp file (no full in-memory copy)
+        fields, files = await uploads.read_upload_form(request)
+        upload = uploads.uploaded_file(files)
+        pdf_path = upload.path if upload else None
+        company_name = fields.get("company_name")
+        if not company_name or upload is None:
+            raise HTTPException(status_code=400, detail="Send a company_name and a PDF file.")
+        print(f"Received request for company: {company_name}, file: {upload.filename}")
+
+        # Basic check for PDF file type
+        if upload.content_type != "application/pdf":
+            print("Error: Invalid file type.")
+            raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
 
         # Call your master analysis function
         print("Calling AI core (greenwash_analyzer) for analysis...")
-        final_report = greenwash_analyzer.run_full_analysis(company_name, pdf_bytes)
+        # Run in a worker thread (event loop stays free); stops if the client leaves or the deadline passes
+        final_report = await cancellation.run_cancellable(
+            request, greenwash_analyzer.run_full_analysis, company_name, pdf_path,
+            timeout=ANALYSIS_TIMEOUT_SECONDS, workload=slot
+        )
         print("Analysis complete. Sending report back to frontend.")
 
         # Return the resulting dictionary
         return final_report
 
+    except uploads.UploadTooLargeError as e:
+        print(f"Error: {e}")
+        raise HTTPException(status_code=413, detail="Uploaded file is too large.")
+    except uploads.EmptyUploadError:
+        raise HTTPException(status_code=400, detail="Uploaded file is empty.")
+    except uploads.BadUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except admission.Overloaded as e:
+        print(f"Rejected: {e}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers)
+    except cancellation.OperationCancelled as e:
+        print(f"Analysis stopped early: {e}")
+        raise HTTPException(status_code=504 if e.timed_out else cancellation.CLIENT_CLOSED_STATUS, detail=f"Analysis stopped: {e}")
     except Exception as e:
         # Catch potential errors during analysis
         print(f"Error during analysis: {e}")
         # Return a server error response to the frontend
         raise HTTPException(status_code=500, detail=f"An error occurred during analysis: {str(e)}")
+    finally:
+        if slot: slot.release() # No-op once the analysis was submitted
+        uploads.remove_upload(pdf_path)
 
 
 # --- Run the Server Directly (for testing) ---
@@ -64,11 +91,12 @@ if __name__ == "__main__":
     print("Checking if backend components are ready...")
     
     # Check if the necessary components from greenwash_analyzer.py are loaded
-    if greenwash_analyzer.classifier and greenwash_analyzer.sentiment_analyzer and greenwash_analyzer.reddit:
-        print("Starting FastAPI server using Uvicorn on http://localhost:8000")
-        # Added reload=False to the final run to avoid issues with multiprocessing, 
-        # but kept it in the initial call to simplify the user's workflow
-        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
+    greenwash_analyzer.load_models()
+    if greenwash_analyzer._check_pipeline_ready() is None:
+        print("Starting FastAPI server on http://localhost:8000")
+        # Same app & launcher as server.py: models load once, workers are forked from it
+        import launcher
+        launcher.main()
     else:
         print("Error: Could not start server.")
         print("One or more components (AI models, Reddit client) failed to load. Check console for errors.")
\ No newline at end of file
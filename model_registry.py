@@ -0,0 +1,326 @@
+# This is a new file: model_registry.py
+# On-demand AI models with a per-process memory budget: models load on first use, the least
+# recently used idle model is unloaded when the budget would be exceeded, and models idle for
+# longer than REPUTEX_MODEL_IDLE_SECONDS are unloaded in the background once the process calls
+# registry.start() (server lifespan, worker.py) - never in launcher.py's parent, which must not
+# start threads before forking and keeps its preloaded models for workers respawned later.
+# Models a forked worker inherited from launcher.py's preload are never unloaded: their pages are
+# shared copy-on-write with the parent, so unloading frees nothing and the next use loads a private copy.
+# ai_core.py and greenwash_analyzer.py share one registry, so a model both use (BART-MNLI) loads once.
+# Pipelines load memory-mapped from model_store.py's local safetensors copies when exported.
+
+import collections
+import gc
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION: Model Memory ---
+MODEL_BUDGET_BYTES = int(float(os.environ.get("REPUTEX_MODEL_BUDGET_MB", "4096")) * 1024 * 1024) # 0 = no budget
+MODEL_IDLE_SECONDS = float(os.environ.get("REPUTEX_MODEL_IDLE_SECONDS", "1800")) # 0 = never unload idle models
+MAX_REAPER_INTERVAL_SECONDS = 60 # Idle models are checked at least this often
+MAX_EVENTS = 50 # Load / unload events kept for the report
+
+
+def process_rss_bytes():
+    """ Resident set size of this process (Linux), or None. """
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_memory() -> dict:
+    """
+    Resident memory of this process split into private (anonymous) and file-backed pages
+    (Linux). Memory-mapped model weights show up as file-backed and are shared between workers.
+    """
+    memory = {}
+    try:
+        with open("/proc/self/status") as handle:
+            for line in handle:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile", "RssShmem"):
+                    memory[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    return {"rss_bytes": memory.get("VmRSS"), "private_bytes": memory.get("RssAnon"),
+            "file_backed_bytes": memory.get("RssFile"), "shared_memory_bytes": memory.get("RssShmem")}
+
+
+def model_bytes(model):
+    """ Parameter + buffer bytes of a transformers pipeline / torch module, or None if unknown. """
+    module = getattr(model, "model", model)
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except Exception:
+        return None
+
+
+def _release_memory():
+    """ Give freed model memory back (GC, CUDA cache, glibc heap trim). """
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        try:
+            if torch.cuda.is_available(): torch.cuda.empty_cache()
+        except Exception:
+            pass
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except Exception:
+        pass
+
+
+_device = None
+
+def select_device() -> int:
+    """ GPU 0 if CUDA is available, else CPU (-1). Checked once per process. """
+    global _device
+    if _device is None:
+        try:
+            import torch
+            _device = 0 if torch.cuda.is_available() else -1
+            print(f"Model Registry: {'CUDA GPU detected. Using GPU 0' if _device == 0 else 'No CUDA GPU detected. Using CPU'} for pipelines.")
+        except Exception as e:
+            print(f"Model Registry: Error checking CUDA availability ({e}). Defaulting to CPU.")
+            _device = -1
+    return _device
+
+
+class _Entry:
+    def __init__(self, name: str, loader, estimated_bytes: int):
+        self.name = name
+        self.loader = loader
+        self.estimated_bytes = estimated_bytes
+        self.model = None
+        self.size_bytes = None # Measured on load; kept after unload as the next estimate
+        self.last_used = None
+        self.loaded_at = None
+        self.in_use = 0
+        self.loads = 0
+        self.last_load_seconds = None
+        self.rss_delta_bytes = None # Process RSS growth during the last load
+        self.load_info = None # model_store source / mapped size of the last load
+        self.inherited = False # Loaded before this process was forked (shared copy-on-write)
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    name -> loader() registry. `with registry.using(name) as model:` loads on demand and
+    keeps the model from being unloaded while the block runs.
+    """
+
+    def __init__(self, budget_bytes: int = MODEL_BUDGET_BYTES, idle_seconds: float = MODEL_IDLE_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self._entries = {}
+        self.pipelines = {} # name -> (task, model) for register_pipeline entries
+        self.pipeline_factory = None # (task, model) -> pipeline, replacing model_store (see set_pipeline_factory)
+        self._lock = threading.RLock()
+        self._events = collections.deque(maxlen=MAX_EVENTS)
+        self._reaper_pid = None
+        self._started_pid = None # Process that called start(); idle unloading runs only there
+        self._wake = threading.Event()
+
+    # --- Registration ---
+    def register(self, name: str, loader, estimated_bytes: int = 0) -> str:
+        """ Adds a model (first registration of a name wins). Returns the name. """
+        with self._lock:
+            self._entries.setdefault(name, _Entry(name, loader, estimated_bytes))
+        return name
+
+    def set_pipeline_factory(self, factory):
+        """
+        Builds every pipeline loaded from now on with factory(task, model) instead of the real
+        models (load_test.py's stubs); None restores the real ones. Set it before models load.
+        """
+        self.pipeline_factory = factory
+
+    def register_pipeline(self, task: str, model: str, estimated_bytes: int = 0) -> str:
+        """
+        A transformers pipeline on select_device(); the same (task, model) is shared by every caller.
+        Loaded memory-mapped from the local model store when exported (see model_store.py).
+        """
+        def load():
+            if self.pipeline_factory is not None:
+                return self.pipeline_factory(task, model)
+            import model_store
+            return model_store.load_pipeline(task, model, device=select_device())
+        name = self.register(f"{task}:{model}", load, estimated_bytes)
+        self.pipelines.setdefault(name, (task, model))
+        return name
+
+    # --- Use ---
+    def get(self, name: str):
+        """ The loaded model (loading it if needed). Prefer using() for calls that may run a while. """
+        with self.using(name) as model:
+            return model
+
+    @contextmanager
+    def using(self, name: str):
+        entry = self._entries[name]
+        with self._lock:
+            entry.in_use += 1
+        try:
+            yield self._load(entry)
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    def _load(self, entry: _Entry):
+        if entry.model is not None:
+            entry.last_used = time.time()
+            return entry.model
+        with entry.load_lock: # One load per model; concurrent callers wait for it
+            if entry.model is not None:
+                return entry.model
+            self._make_room(entry.size_bytes or entry.estimated_bytes, keep=entry.name)
+            print(f"Model Registry: Loading {entry.name}...")
+            rss_before = process_rss_bytes()
+            started = time.time()
+            model = entry.loader()
+            elapsed = time.time() - started
+            rss_after = process_rss_bytes()
+            size = model_bytes(model)
+            if size is None and rss_before is not None and rss_after is not None:
+                size = max(0, rss_after - rss_before)
+            with self._lock:
+                entry.model = model
+                entry.inherited = False
+                entry.size_bytes = size or entry.estimated_bytes
+                entry.loaded_at = entry.last_used = time.time()
+                entry.loads += 1
+                entry.last_load_seconds = round(elapsed, 2)
+                entry.rss_delta_bytes = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+                entry.load_info = getattr(model, "load_info", None)
+                self._event("load", entry, seconds=round(elapsed, 2))
+            print(f"Model Registry: Loaded {entry.name} in {elapsed:.1f}s ({(entry.size_bytes or 0) / 1e6:.0f} MB).")
+            self._make_room(0, keep=entry.name)
+            self._ensure_reaper()
+            return model
+
+    # --- Eviction ---
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.size_bytes or 0 for entry in self._entries.values() if entry.model is not None)
+
+    def _make_room(self, incoming_bytes: int, keep: str = None):
+        """ Unloads least recently used idle models until resident + incoming fits the budget. """
+        if not self.budget_bytes: return
+        unloaded = 0
+        with self._lock:
+            candidates = sorted(
+                (entry for entry in self._entries.values() if self._unloadable(entry) and entry.name != keep),
+                key=lambda entry: entry.last_used or 0
+            )
+            for entry in candidates:
+                if self.resident_bytes() + incoming_bytes <= self.budget_bytes: break
+                self._unload(entry, "memory budget")
+                unloaded += 1
+            if self.resident_bytes() + incoming_bytes > self.budget_bytes:
+                print(f"Model Registry: Over budget ({(self.resident_bytes() + incoming_bytes) / 1e6:.0f} MB of {self.budget_bytes / 1e6:.0f} MB); remaining models are in use.")
+        if unloaded: _release_memory()
+
+    @staticmethod
+    def _unloadable(entry: _Entry) -> bool:
+        """ Loaded, not in use, and not inherited from the parent (unloading those frees no memory). """
+        return entry.model is not None and not entry.in_use and not entry.inherited
+
+    def _unload(self, entry: _Entry, reason: str):
+        """ Called with the lock held. """
+        entry.model = None
+        self._event("unload", entry, reason=reason)
+        print(f"Model Registry: Unloaded {entry.name} ({reason}).")
+
+    def unload_idle(self, now: float = None) -> int:
+        """ Unloads models not used for idle_seconds. Returns how many were unloaded. """
+        if not self.idle_seconds: return 0
+        now = time.time() if now is None else now
+        with self._lock:
+            idle = [entry for entry in self._entries.values()
+                    if self._unloadable(entry) and now - (entry.last_used or 0) >= self.idle_seconds]
+            for entry in idle:
+                self._unload(entry, f"idle {now - entry.last_used:.0f}s")
+        if idle: _release_memory()
+        return len(idle)
+
+    def _ensure_reaper(self):
+        """ Starts the idle-unload thread in this process if start() was called here (again after a fork). """
+        if not self.idle_seconds or self._started_pid != os.getpid() or self._reaper_pid == os.getpid(): return
+        self._reaper_pid = os.getpid()
+        threading.Thread(target=self._reap, name="model-reaper", daemon=True).start()
+
+    def start(self):
+        """
+        Enables idle unloading in this process (call it after any fork). The reaper thread
+        starts now if this process already loaded models of its own, else on its first load.
+        """
+        self._started_pid = os.getpid()
+        with self._lock:
+            loaded = any(entry.model is not None and not entry.inherited for entry in self._entries.values())
+        if loaded: self._ensure_reaper()
+
+    def _reap(self):
+        interval = min(MAX_REAPER_INTERVAL_SECONDS, max(1.0, self.idle_seconds / 4))
+        while not self._wake.wait(interval):
+            try:
+                self.unload_idle()
+            except Exception as e:
+                print(f"Model Registry: Idle check failed: {e}")
+
+    def _after_fork(self):
+        """ Fresh locks in a forked child (another thread may have held them at fork time). """
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        for entry in self._entries.values():
+            entry.load_lock = threading.Lock()
+            entry.inherited = entry.model is not None
+
+    # --- Reporting ---
+    def _event(self, kind: str, entry: _Entry, **details):
+        self._events.append(dict(event=kind, model=entry.name, at=time.time(), size_bytes=entry.size_bytes, **details))
+
+    def report(self) -> dict:
+        """ Budget, resident sizes, last use and recent load / unload events for this process. """
+        now = time.time()
+        with self._lock:
+            models = {
+                entry.name: {
+                    "loaded": entry.model is not None,
+                    "size_bytes": entry.size_bytes,
+                    "last_used_at": entry.last_used,
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.last_used else None,
+                    "in_use": entry.in_use,
+                    "inherited": entry.inherited,
+                    "loads": entry.loads,
+                    "last_load_seconds": entry.last_load_seconds,
+                    "rss_delta_bytes": entry.rss_delta_bytes,
+                    "load_info": entry.load_info
+                }
+                for entry in self._entries.values()
+            }
+            events = list(self._events)
+        return {
+            "pid": os.getpid(),
+            "budget_bytes": self.budget_bytes or None,
+            "idle_unload_seconds": self.idle_seconds or None,
+            "resident_bytes": self.resident_bytes(),
+            "process_rss_bytes": process_rss_bytes(),
+            "process_memory": process_memory(),
+            "models": models,
+            "events": events
+        }
+
+
+# Shared by ai_core.py and greenwash_analyzer.py
+registry = ModelRegistry()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry._after_fork)
@@ -0,0 +1,231 @@
+# This is a new file: model_store.py
+# Local safetensors copies of the pipeline models, loaded memory-mapped: weights stay in the
+# OS page cache and every worker process on the host maps the same read-only pages, instead of
+# each one deserializing BART-MNLI & co. into private memory. No network needed once exported.
+# Export once (needs network): python model_store.py export      Check: python model_store.py check
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION: Local Model Store ---
+MODEL_DIR = os.environ.get("REPUTEX_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reputex_models"))
+MODELS_OFFLINE = os.environ.get("REPUTEX_MODELS_OFFLINE", "0") == "1" # Never fall back to downloading from the Hub
+WEIGHTS_FILE = "model.safetensors"
+WEIGHTS_INDEX_FILE = "model.safetensors.index.json" # Sharded exports
+# pipeline task -> transformers Auto class that holds the weights
+TASK_MODEL_CLASSES = {
+    "sentiment-analysis": "AutoModelForSequenceClassification",
+    "text-classification": "AutoModelForSequenceClassification",
+    "zero-shot-classification": "AutoModelForSequenceClassification",
+}
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+class ModelNotExported(Exception):
+    """ The model has no local safetensors copy under MODEL_DIR. """
+
+
+def model_path(model: str, model_dir: str = None) -> str:
+    """ "facebook/bart-large-mnli" -> <MODEL_DIR>/facebook__bart-large-mnli """
+    return os.path.join(model_dir or MODEL_DIR, model.replace("/", "__"))
+
+
+def weight_files(path: str) -> list:
+    """ The safetensors files of an exported model ([] if it isn't exported). """
+    if os.path.exists(os.path.join(path, WEIGHTS_FILE)):
+        return [os.path.join(path, WEIGHTS_FILE)]
+    index_path = os.path.join(path, WEIGHTS_INDEX_FILE)
+    if os.path.exists(index_path):
+        with open(index_path, "r", encoding="utf-8") as handle:
+            shards = sorted(set(json.load(handle)["weight_map"].values()))
+        return [os.path.join(path, shard) for shard in shards]
+    return []
+
+
+def is_exported(model: str, model_dir: str = None) -> bool:
+    path = model_path(model, model_dir)
+    return bool(weight_files(path)) and os.path.exists(os.path.join(path, "config.json"))
+
+
+# --- Memory-Mapped Loading ---
+def mmap_state_dict(path: str) -> dict:
+    """
+    name -> tensor for one safetensors file, backed by a private (copy-on-write) mapping of the
+    file: nothing is read until used, and untouched pages are shared with other processes.
+    Format: 8-byte little-endian header size, JSON header, then the raw tensor bytes.
+    """
+    import torch
+    with open(path, "rb") as handle:
+        header_size = struct.unpack("<Q", handle.read(8))[0]
+        header = json.loads(handle.read(header_size))
+    data_start = 8 + header_size
+    file_size = os.path.getsize(path)
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=file_size)
+    raw = torch.empty(0, dtype=torch.uint8).set_(storage) # Whole file as bytes (a view, no copy)
+
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__": continue
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        start, end = (data_start + offset for offset in info["data_offsets"])
+        chunk = raw[start:end]
+        if start % torch.empty(0, dtype=dtype).element_size():
+            chunk = chunk.clone() # Misaligned for this dtype (not written by save_pretrained); copy just this tensor
+        tensors[name] = chunk.view(dtype).reshape(info["shape"])
+    return tensors
+
+
+_meta_init = threading.local() # .active is set only in the thread building a model skeleton
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def _install_meta_hook():
+    """
+    Wraps torch.nn.Module.register_parameter once per process. The wrapper only moves parameters
+    to the meta device in a thread inside _parameters_on_meta(); modules built by any other thread
+    at the same time (another model's Hub fallback, a request) are untouched.
+    """
+    global _hook_installed
+    import torch
+    with _hook_lock:
+        if _hook_installed: return
+        original_register = torch.nn.Module.register_parameter
+
+        def register_parameter(module, name, param):
+            original_register(module, name, param)
+            param = module._parameters.get(name)
+            if getattr(_meta_init, "active", False) and type(param) is torch.nn.Parameter:
+                # Parameter subclasses are left as they are (load_state_dict(assign=True) replaces them anyway)
+                module._parameters[name] = torch.nn.Parameter(param.to("meta"), requires_grad=param.requires_grad)
+
+        torch.nn.Module.register_parameter = register_parameter
+        _hook_installed = True
+
+
+@contextmanager
+def _parameters_on_meta():
+    """
+    Modules built inside this block (in this thread) get their parameters on the meta device
+    (no memory); buffers (position ids etc.) are still created normally.
+    """
+    _install_meta_hook()
+    previous = getattr(_meta_init, "active", False)
+    _meta_init.active = True
+    try:
+        yield
+    finally:
+        _meta_init.active = previous
+
+
+def load_model(task: str, model: str, model_dir: str = None):
+    """ (model, tokenizer, info) from the local export, weights memory-mapped. """
+    path = model_path(model, model_dir)
+    files = weight_files(path)
+    if not files:
+        raise ModelNotExported(f"No local copy of {model} in {path}. Run: python model_store.py export")
+    import transformers
+    started = time.time()
+    config = transformers.AutoConfig.from_pretrained(path, local_files_only=True)
+    model_class = getattr(transformers, TASK_MODEL_CLASSES.get(task, "AutoModel"))
+    with _parameters_on_meta():
+        hf_model = model_class.from_config(config)
+
+    state_dict = {}
+    for file in files:
+        state_dict.update(mmap_state_dict(file))
+    hf_model.load_state_dict(state_dict, strict=False, assign=True) # Parameters become the mapped tensors
+    hf_model.tie_weights() # Tied copies (e.g. BART's shared embeddings) aren't stored twice in the file
+    still_empty = [name for name, tensor in list(hf_model.named_parameters()) + list(hf_model.named_buffers()) if tensor.is_meta]
+    if still_empty:
+        raise ValueError(f"{model}: {len(still_empty)} weights missing from {path} (e.g. {still_empty[0]}); re-export it.")
+    hf_model.eval()
+
+    tokenizer = transformers.AutoTokenizer.from_pretrained(path, local_files_only=True)
+    info = {
+        "source": "mmap", "path": path,
+        "mapped_bytes": sum(os.path.getsize(file) for file in files),
+        "load_seconds": round(time.time() - started, 3),
+    }
+    return hf_model, tokenizer, info
+
+
+def load_pipeline(task: str, model: str, device: int = -1, model_dir: str = None):
+    """
+    A transformers pipeline built from the local memory-mapped export. If the model isn't
+    exported: downloads it as before, unless REPUTEX_MODELS_OFFLINE=1 (then ModelNotExported).
+    The pipeline's `load_info` says which source was used.
+    """
+    from transformers import pipeline # Slow import, deferred until a model is needed
+    try:
+        hf_model, tokenizer, info = load_model(task, model, model_dir)
+    except ModelNotExported:
+        if MODELS_OFFLINE: raise
+        print(f"Model Store: {model} isn't exported to {MODEL_DIR}; loading it from the Hub cache (private memory).")
+        started = time.time()
+        loaded = pipeline(task, model=model, device=device)
+        loaded.load_info = {"source": "hub", "load_seconds": round(time.time() - started, 3)}
+        return loaded
+    # On a GPU the weights are copied to device memory; the mapped pages are then only read once
+    loaded = pipeline(task, model=hf_model, tokenizer=tokenizer, device=device)
+    loaded.load_info = info
+    print(f"Model Store: Mapped {model} ({info['mapped_bytes'] / 1e6:.0f} MB) in {info['load_seconds']:.2f}s.")
+    return loaded
+
+
+# --- Export ---
+def export_model(task: str, model: str, model_dir: str = None) -> str:
+    """ Downloads the model once and saves it (weights as a single safetensors file) under model_dir. """
+    import transformers
+    path = model_path(model, model_dir)
+    print(f"Model Store: Exporting {model} to {path}...")
+    model_class = getattr(transformers, TASK_MODEL_CLASSES.get(task, "AutoModel"))
+    hf_model = model_class.from_pretrained(model)
+    hf_model.save_pretrained(path, safe_serialization=True, max_shard_size="100GB")
+    transformers.AutoTokenizer.from_pretrained(model).save_pretrained(path)
+    return path
+
+
+def registered_pipelines() -> dict:
+    """ name -> (task, model) for every pipeline ai_core and greenwash_analyzer register. """
+    import ai_core, greenwash_analyzer # Registers their models (no model is loaded)
+    import model_registry
+    return dict(model_registry.registry.pipelines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export / check local memory-mapped model copies.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--force", action="store_true", help="Re-export models that are already there")
+    args = parser.parse_args(argv)
+
+    missing = 0
+    for name, (task, model) in registered_pipelines().items():
+        exported = is_exported(model, args.model_dir)
+        if args.command == "export" and (args.force or not exported):
+            export_model(task, model, args.model_dir)
+            exported = True
+        if args.command == "check" and exported:
+            started = time.time()
+            load_model(task, model, args.model_dir)
+            print(f"{name}: ok (mapped in {time.time() - started:.2f}s)")
+        elif not exported:
+            missing += 1
+            print(f"{name}: not exported")
+        else:
+            print(f"{name}: exported at {model_path(model, args.model_dir)}")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
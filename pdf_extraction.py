@@ -0,0 +1,120 @@
+# This is a new file: pdf_extraction.py
+# Page-level PDF text extraction (PyMuPDF) used by greenwash_analyzer.py
+# Kept free of model imports so worker processes start quickly.
+
+import collections
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz  # PyMuPDF
+
+# --- CONFIGURATION: Extraction ---
+PARALLEL_MIN_PAGES = 40 # Smaller documents are read in-process
+PAGES_PER_TASK = 16 # Pages handed to a worker process at a time
+MAX_EXTRACT_WORKERS = max(1, min(8, (os.cpu_count() or 1) - 1)) # Size of the shared extraction pool
+
+# One long-lived pool per server process. Its workers are spawned, not forked: forking a threaded
+# server copies locks other threads may hold. (Spawned workers re-import the entry script, so
+# entry points keep their startup under `if __name__ == "__main__":`.)
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _open_document(pdf_source):
+    """ Opens a PDF from raw bytes (web upload) or a file path. """
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf_source, filetype="pdf") # No extra BytesIO copy
+    return fitz.open(pdf_source)
+
+
+def select_pages(page_count: int, page_range=None, max_pages=None) -> range:
+    """
+    Returns the 0-based page indexes to read.
+    page_range is a 1-based inclusive (first, last) tuple; max_pages caps the total.
+    """
+    start, stop = 0, page_count
+    if page_range:
+        first, last = page_range
+        start = max(0, (first or 1) - 1)
+        stop = min(page_count, last if last else page_count)
+    if max_pages is not None:
+        stop = min(stop, start + max(0, max_pages))
+    return range(start, max(start, stop))
+
+
+def _extraction_pool() -> ProcessPoolExecutor:
+    """ The shared extraction pool, started on first use (again in a forked child). """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=MAX_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """ Drops a broken pool (a worker died) so the next document starts a new one. """
+    global _pool
+    with _pool_lock:
+        if _pool is pool: _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_page_chunk(pdf_path: str, start: int, stop: int) -> list:
+    """ Worker task: returns [(page_number, text), ...] for pages start..stop-1. """
+    with fitz.open(pdf_path) as doc:
+        return [(index + 1, doc[index].get_text()) for index in range(start, stop)]
+
+
+def iter_pdf_pages(pdf_source, page_range=None, max_pages=None, workers=None):
+    """
+    Generator yielding (page_number, text) for each selected page, in order.
+    Page numbers are 1-based. Large documents are split across the shared worker pool,
+    at most `workers` chunks at a time.
+    """
+    with _open_document(pdf_source) as doc:
+        pages = select_pages(len(doc), page_range, max_pages)
+        print(f"Reading PDF with {len(doc)} pages ({len(pages)} selected)...")
+        worker_count = MAX_EXTRACT_WORKERS if workers is None else min(workers, MAX_EXTRACT_WORKERS)
+        if worker_count <= 1 or len(pages) < PARALLEL_MIN_PAGES:
+            for index in pages:
+                yield index + 1, doc[index].get_text()
+            return
+
+    # --- Parallel path: contiguous page chunks, results kept in page order ---
+    chunks = iter([(start, min(start + PAGES_PER_TASK, pages.stop)) for start in range(pages.start, pages.stop, PAGES_PER_TASK)])
+    print(f"Extracting {len(pages)} pages with {worker_count} worker processes...")
+    temp_path = None
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        # Workers open the document by path; bytes would be pickled to them once per chunk
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(pdf_source)
+        pdf_source = temp_path
+    pool = _extraction_pool()
+    pending = collections.deque()
+
+    def submit_next():
+        chunk = next(chunks, None)
+        if chunk: pending.append(pool.submit(_extract_page_chunk, pdf_source, *chunk))
+
+    try:
+        for _ in range(worker_count):
+            submit_next()
+        while pending:
+            chunk = pending.popleft().result()
+            submit_next() # Keep worker_count chunks in flight
+            yield from chunk
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+    finally:
+        # If the caller stops early (cancelled request), drop this document's queued chunks
+        for future in pending:
+            future.cancel()
+        if temp_path:
+            os.remove(temp_path) # A chunk still running (early stop) has it open already or fails unseen
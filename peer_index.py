@@ -0,0 +1,218 @@
+# This is a new file: peer_index.py
+# Peer percentiles for self-assessment scores.
+# Every submission is stored (SQLite) and added to per-pillar Fenwick trees over 0.1-point bins,
+# so "where does this company rank" is O(log bins) and each new submission is an O(log bins) update.
+# Each process keeps its own trees and catches up on other processes' submissions (by row id)
+# before every query, so all launcher workers rank against the same peers.
+
+import os
+import sqlite3
+import threading
+import time
+from score_history import DATA_ROOT # Same local data directory as the score history
+
+# --- CONFIGURATION: Peer Index ---
+PEER_DB_PATH = os.environ.get("REPUTEX_PEER_DB", os.path.join(DATA_ROOT, "self_assessments.sqlite3"))
+BINS_PER_POINT = 10 # Scores are rounded to 0.1, so one bin per 0.1 point
+# Pillar -> (result key, max score)
+PILLARS = {
+    "total": ("base_sa_score", 100),
+    "environmental": ("e_score", 33),
+    "social": ("s_score", 35),
+    "governance": ("g_score", 32),
+}
+ALL_SECTORS = "" # Index key for the all-companies trees
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    submitted_at REAL NOT NULL,
+    total REAL, environmental REAL, social REAL, governance REAL
+);
+CREATE TABLE IF NOT EXISTS bin_counts (
+    sector TEXT NOT NULL,
+    pillar TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (sector, pillar, bin)
+);
+"""
+
+
+class FenwickTree:
+    """ Binary indexed tree of counts: point add and prefix sum, both O(log size). """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    def add(self, index: int, delta: int = 1):
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """ Sum of counts in bins [0, index). """
+        result = 0
+        while index > 0:
+            result += self.tree[index]
+            index -= index & -index
+        return result
+
+
+def normalize_sector(sector: str = None) -> str:
+    return " ".join(sector.lower().split()) if sector else ALL_SECTORS
+
+
+def score_bin(score: float, max_score: int) -> int:
+    return max(0, min(int(round(score * BINS_PER_POINT)), max_score * BINS_PER_POINT))
+
+
+class PeerIndex:
+    """ Persisted submissions + in-memory Fenwick trees per (sector, pillar). """
+
+    def __init__(self, path: str = PEER_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._trees = {} # (sector, pillar) -> FenwickTree
+        self._loaded = False
+        self._schema_ready = False
+        self._last_id = 0 # Newest submission already in the trees
+
+    def _connect(self) -> sqlite3.Connection:
+        """ Called with the lock held; the schema is created on first use. """
+        if not self._schema_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._schema_ready:
+            conn.executescript(_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _tree(self, sector: str, pillar: str) -> FenwickTree:
+        key = (sector, pillar)
+        if key not in self._trees:
+            self._trees[key] = FenwickTree(PILLARS[pillar][1] * BINS_PER_POINT + 1)
+        return self._trees[key]
+
+    def _ensure_loaded(self):
+        """
+        First call: builds the trees from the stored bin counts (not from every submission).
+        Later calls: adds submissions stored since then by any process (one indexed query).
+        """
+        conn = self._connect()
+        try:
+            if not self._loaded:
+                with conn: # Commits (ends the read) on exit
+                    # sqlite3 opens no transaction for SELECTs: without BEGIN, a submission committed
+                    # between these two reads would be past _last_id yet missing from the counts
+                    conn.execute("BEGIN")
+                    rows = conn.execute("SELECT sector, pillar, bin, count FROM bin_counts").fetchall()
+                    self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM submissions").fetchone()[0]
+                for sector, pillar, bin_index, count in rows:
+                    if pillar in PILLARS: self._tree(sector, pillar).add(bin_index, count)
+                self._loaded = True
+                print(f"Peer Index: Loaded {self.peer_count()} stored self-assessments.")
+                return
+            new_rows = conn.execute(
+                "SELECT id, sector, total, environmental, social, governance FROM submissions WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        for row_id, sector, *scores in new_rows:
+            for key in [ALL_SECTORS] + ([sector] if sector else []):
+                for (pillar, (_, max_score)), score in zip(PILLARS.items(), scores):
+                    self._tree(key, pillar).add(score_bin(score, max_score))
+            self._last_id = row_id
+
+    # --- Queries ---
+    def peer_count(self, sector: str = None) -> int:
+        tree = self._trees.get((normalize_sector(sector), "total"))
+        return tree.total if tree else 0
+
+    def percentiles(self, result: dict, sector: str = None) -> dict:
+        """
+        Mid-rank percentile (0-100) of a calculate_sa_score() result against stored
+        submissions: % of peers scoring lower, plus half of those with the same score.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._percentiles(result, sector)
+
+    def _percentiles(self, result: dict, sector: str = None) -> dict:
+        response = {"peer_count": self.peer_count(), "overall": self._rank(result, ALL_SECTORS)}
+        sector_key = normalize_sector(sector)
+        if sector_key:
+            response["sector"] = sector_key
+            response["sector_peer_count"] = self.peer_count(sector_key)
+            response["within_sector"] = self._rank(result, sector_key)
+        return response
+
+    def _rank(self, result: dict, sector: str) -> dict:
+        ranks = {}
+        for pillar, (result_key, max_score) in PILLARS.items():
+            tree = self._trees.get((sector, pillar))
+            if not tree or not tree.total:
+                ranks[pillar] = None # No peers yet
+                continue
+            bin_index = score_bin(result[result_key], max_score)
+            below = tree.prefix(bin_index)
+            equal = tree.prefix(bin_index + 1) - below
+            ranks[pillar] = round((below + 0.5 * equal) * 100 / tree.total, 1)
+        return ranks
+
+    # --- Updates ---
+    def add(self, result: dict, sector: str = None, submitted_at: float = None):
+        """ Stores one submission and updates the trees incrementally. """
+        self.add_many([(result, sector)], submitted_at)
+
+    def add_many(self, submissions: list, submitted_at: float = None):
+        """ Stores (result, sector) pairs in one transaction (bulk uploads). """
+        if not submissions: return
+        with self._lock:
+            self._ensure_loaded()
+            self._add(submissions, submitted_at)
+
+    def _add(self, submissions: list, submitted_at: float = None):
+        """ Inserts, then catches up from the table (so other processes' rows in between aren't skipped). """
+        submitted_at = submitted_at or time.time()
+        counts = {}
+        rows = []
+        for result, sector in submissions:
+            sector_key = normalize_sector(sector)
+            rows.append((result.get("company_name", ""), sector_key, submitted_at, *(result[result_key] for result_key, _ in PILLARS.values())))
+            for key in [ALL_SECTORS] + ([sector_key] if sector_key else []):
+                for pillar, (result_key, max_score) in PILLARS.items():
+                    bin_key = (key, pillar, score_bin(result[result_key], max_score))
+                    counts[bin_key] = counts.get(bin_key, 0) + 1
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO submissions (company, sector, submitted_at, total, environmental, social, governance) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                conn.executemany(
+                    "INSERT INTO bin_counts (sector, pillar, bin, count) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (sector, pillar, bin) DO UPDATE SET count = count + excluded.count",
+                    [(*bin_key, count) for bin_key, count in counts.items()]
+                )
+        finally:
+            conn.close()
+        self._ensure_loaded()
+
+    def rank_and_add(self, result: dict, sector: str = None) -> dict:
+        """ Percentiles against all PRIOR submissions, then stores this one (atomically within this process). """
+        with self._lock:
+            self._ensure_loaded()
+            percentiles = self._percentiles(result, sector)
+            self._add([(result, sector)])
+        return percentiles
+
+
+# Shared index used by server.py
+peer_index = PeerIndex()
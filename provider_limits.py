@@ -0,0 +1,72 @@
+# This is a new file: provider_limits.py
+# Per-provider concurrency caps + request spacing for upstream APIs (GNews, Mediastack, ...).
+# Lets ai_core.py fetch many companies at once without blowing through any one provider's quota.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- CONFIGURATION: Upstream Limits ---
+# provider -> (max requests in flight, min seconds between request starts)
+PROVIDER_LIMITS = {
+    "gnews": (2, 1.0),
+    "mediastack": (2, 1.0),
+    "newsdata": (2, 1.0),
+    "reddit": (4, 0.6), # PRAW also rate-limits itself per client
+    "knowledge_graph": (4, 0.1),
+}
+
+
+def _env_override(provider: str, default: tuple) -> tuple:
+    """ REPUTEX_LIMIT_<PROVIDER>="concurrency,interval" overrides a default. """
+    value = os.environ.get(f"REPUTEX_LIMIT_{provider.upper()}")
+    if not value:
+        return default
+    try:
+        concurrency, interval = value.split(",")
+        return max(1, int(concurrency)), max(0.0, float(interval))
+    except ValueError:
+        print(f"Provider Limits: Ignoring invalid REPUTEX_LIMIT_{provider.upper()}='{value}'")
+        return default
+
+
+class ProviderLimiter:
+    """ Bounded semaphore (concurrency) + evenly spaced request starts (rate). """
+
+    def __init__(self, name: str, max_concurrent: int, min_interval: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    @contextmanager
+    def slot(self):
+        """ Blocks until a request may start, holds a slot while it runs. """
+        with self._slots:
+            with self._lock:
+                now = time.monotonic()
+                start_at = max(now, self._next_start)
+                self._next_start = start_at + self.min_interval
+            if start_at > now:
+                time.sleep(start_at - now)
+            yield
+
+
+_limiters = {
+    provider: ProviderLimiter(provider, *_env_override(provider, limits))
+    for provider, limits in PROVIDER_LIMITS.items()
+}
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """ `with provider_slot("gnews"): requests.get(...)`. Unknown providers are not limited. """
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        yield
+        return
+    with limiter.slot():
+        yield
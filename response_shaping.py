@@ -0,0 +1,143 @@
+# This is a new file: response_shaping.py
+# Smaller /api/analyze responses: top-level field selection, cursor-paged feeds
+# (full results held briefly in the on-disk cache, so any worker can continue a cursor)
+# and a fast JSON response class.
+
+import base64
+import json
+import time
+import uuid
+from fastapi.responses import JSONResponse
+from analysis_cache import DiskCache
+
+try:
+    import orjson # Optional: much faster serialization
+except ImportError:
+    orjson = None
+
+# --- CONFIGURATION: Response Shaping ---
+PAGE_RESULT_TTL_SECONDS = 300 # How long a paged result can be continued
+MAX_PAGED_RESULTS = 200 # Results kept for paging (least recently used dropped first)
+MAX_PAGED_RESULT_BYTES = 64 * 1024 * 1024
+MAX_FEED_LIMIT = 200
+
+
+def dumps(content) -> bytes:
+    """ Compact JSON bytes with orjson when installed (numpy values and non-str keys allowed). """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """ JSONResponse rendered with orjson when installed (compact json.dumps otherwise). """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class CursorError(ValueError):
+    """ Raised for malformed cursors (400) or expired results (410, see .expired). """
+
+    def __init__(self, message: str, expired: bool = False):
+        super().__init__(message)
+        self.expired = expired
+
+
+# --- Field Selection ---
+def parse_fields(fields: str = None):
+    """ "overall_score, scores" -> ["overall_score", "scores"]; None/empty -> None (everything). """
+    if not fields: return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+
+def select_fields(result: dict, fields: list = None) -> dict:
+    """ Keeps only the requested top-level keys (company_name is always kept). """
+    if not fields or not isinstance(result, dict): return result
+    wanted = set(fields) | {"company_name"}
+    return {key: value for key, value in result.items() if key in wanted}
+
+
+# --- Cursors ---
+def encode_cursor(result_id: str, module_index: int, offset: int, limit: int) -> str:
+    raw = json.dumps([result_id, module_index, offset, limit], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        result_id, module_index, offset, limit = json.loads(raw)
+        return str(result_id), int(module_index), max(0, int(offset)), max(1, min(int(limit), MAX_FEED_LIMIT))
+    except (ValueError, TypeError):
+        raise CursorError("Invalid cursor.")
+
+
+class PagedResultCache:
+    """
+    Short-lived, size-bounded store of full results that are being paged through.
+    Kept in the on-disk cache (REPUTEX_CACHE_DIR), so every worker on the host sharing that
+    directory can serve a cursor; workers with a different cache directory answer 410.
+    """
+
+    def __init__(self, ttl: float = PAGE_RESULT_TTL_SECONDS, max_results: int = MAX_PAGED_RESULTS,
+                 max_bytes: int = MAX_PAGED_RESULT_BYTES, root: str = None):
+        self.ttl = ttl
+        self._store = DiskCache("paged_results", max_bytes=max_bytes, max_entries=max_results, root=root)
+
+    def put(self, result: dict) -> str:
+        result_id = uuid.uuid4().hex[:16]
+        # Stored as plain JSON (numpy values etc. converted the way responses render them)
+        self._store.put(result_id, {"stored_at": time.time(), "result": json.loads(dumps(result))})
+        return result_id
+
+    def get(self, result_id: str):
+        if not result_id.isalnum(): return None # Cursor ids become file names
+        entry = self._store.get(result_id)
+        if not isinstance(entry, dict): return None
+        if time.time() - entry.get("stored_at", 0) >= self.ttl:
+            self._store.delete(result_id)
+            return None
+        return entry.get("result")
+
+
+paged_results = PagedResultCache()
+
+
+# --- Feed Pagination ---
+def _feed_page(result_id: str, module_index: int, module: dict, offset: int, limit: int) -> dict:
+    feed = module.get("feed") or []
+    next_offset = offset + limit
+    return dict(
+        module,
+        feed=feed[offset:next_offset],
+        feed_total=len(feed),
+        next_cursor=encode_cursor(result_id, module_index, next_offset, limit) if result_id and next_offset < len(feed) else None
+    )
+
+
+def paginate_feeds(result: dict, limit: int) -> dict:
+    """
+    Returns the result with each module's feed cut to its first `limit` items,
+    plus feed_total and next_cursor. The full result is kept for follow-up pages.
+    """
+    modules = result.get("modules") if isinstance(result, dict) else None
+    if not modules: return result
+    limit = max(1, min(limit, MAX_FEED_LIMIT))
+    needs_paging = any(len(module.get("feed") or []) > limit for module in modules)
+    result_id = paged_results.put(result) if needs_paging else None
+    return dict(result, modules=[_feed_page(result_id, index, module, 0, limit) for index, module in enumerate(modules)])
+
+
+def feed_page_from_cursor(cursor: str) -> dict:
+    """ The next page of one module's feed, from a cursor returned earlier. """
+    result_id, module_index, offset, limit = decode_cursor(cursor)
+    result = paged_results.get(result_id)
+    if result is None:
+        raise CursorError("This result has expired or was paged on another server; request /api/analyze again.", expired=True)
+    modules = result.get("modules") or []
+    if module_index >= len(modules):
+        raise CursorError("Invalid cursor.")
+    page = _feed_page(result_id, module_index, modules[module_index], offset, limit)
+    page["company_name"] = result.get("company_name")
+    return page
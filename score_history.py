@@ -0,0 +1,311 @@
+# This is a new file: score_history.py
+# Local time-series store (SQLite) of every company analysis: overall, E/S/G and heatmap scores,
+# the analyzed feed items, and greenwash reports.
+# Trend, delta and rolling-average queries (and bulk_export.py) read straight from the store - no pipeline re-run.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import company_entities # Canonical company ids
+
+# --- CONFIGURATION: History Store ---
+DATA_ROOT = os.environ.get("REPUTEX_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".reputex_data"))
+HISTORY_DB_PATH = os.environ.get("REPUTEX_HISTORY_DB", os.path.join(DATA_ROOT, "score_history.sqlite3"))
+METRICS = ("overall", "environmental", "social", "governance")
+DEFAULT_WINDOW = 5 # Runs per rolling average
+SECONDS_PER_DAY = 86400
+FEED_ITEMS_DAYS = float(os.environ.get("REPUTEX_FEED_ITEMS_DAYS", "90")) # Feed items older than this are deleted (0 = keep all); scores are kept
+FEED_PURGE_INTERVAL_SECONDS = 3600 # record() purges old feed items at most this often
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS score_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    overall INTEGER,
+    environmental INTEGER,
+    social INTEGER,
+    governance INTEGER,
+    item_count INTEGER,
+    heatmap TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_score_runs_company_time ON score_runs (company_key, run_at);
+CREATE TABLE IF NOT EXISTS feed_items (
+    run_id INTEGER NOT NULL,
+    company_key TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    module TEXT NOT NULL,
+    source TEXT,
+    text TEXT,
+    url TEXT,
+    sentiment TEXT,
+    sentiment_score REAL,
+    category TEXT,
+    trust_score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_feed_items_company_time ON feed_items (company_key, run_at);
+CREATE INDEX IF NOT EXISTS idx_feed_items_time ON feed_items (run_at);
+CREATE TABLE IF NOT EXISTS greenwash_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    run_at REAL NOT NULL,
+    label TEXT,
+    credibility_score REAL,
+    pages_analyzed INTEGER,
+    inconsistency_count INTEGER,
+    report TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_greenwash_runs_company_time ON greenwash_runs (company_key, run_at);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def company_key(company_name: str) -> str:
+    """ Canonical company id, so "tesla", "Tesla " and "TSLA" (or "Google" and "Alphabet") share a history. """
+    return company_entities.company_id(company_name)
+
+
+def _rekey(conn: sqlite3.Connection) -> None:
+    """
+    Moves rows stored under an older key (e.g. "google") to the current company id ("alphabet").
+    Scans the whole history, so it only runs when the company index version changed since the last run.
+    """
+    row = conn.execute("SELECT value FROM meta WHERE name = 'company_keys'").fetchone()
+    if row is not None and row[0] == company_entities.index.version: return
+    for table in ("score_runs", "greenwash_runs"):
+        for company, key in conn.execute(f"SELECT DISTINCT company, company_key FROM {table}").fetchall():
+            current = company_key(company)
+            if current != key:
+                conn.execute(f"UPDATE {table} SET company_key = ? WHERE company = ? AND company_key = ?", (current, company, key))
+    conn.execute( # Feed items follow their run
+        "UPDATE feed_items SET company_key = (SELECT company_key FROM score_runs WHERE score_runs.id = feed_items.run_id) "
+        "WHERE company_key != (SELECT company_key FROM score_runs WHERE score_runs.id = feed_items.run_id)"
+    )
+    conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('company_keys', ?)", (company_entities.index.version,))
+
+
+def _module_key(module_name: str) -> str:
+    """ "News Feed (Company & Executive)" -> "news", "Social (Reddit)" -> "reddit" """
+    return "reddit" if "reddit" in (module_name or "").lower() else "news"
+
+
+class ScoreHistory:
+    """ Append-only score time series. One short-lived connection per call (thread-safe). """
+
+    def __init__(self, path: str = HISTORY_DB_PATH):
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._last_feed_purge = 0.0
+
+    def _connect(self, same_thread: bool = True) -> sqlite3.Connection:
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    with sqlite3.connect(self.path) as conn:
+                        conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+                        conn.executescript(_SCHEMA)
+                        _rekey(conn)
+                    self._initialized = True
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=same_thread)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Writes ---
+    def record(self, result: dict, run_at: float = None) -> int:
+        """ Appends one get_combined_analysis() result and its analyzed feed items. Returns the new row id. """
+        scores = result.get("scores") or {}
+        item_count = sum(len(module.get("feed") or []) for module in result.get("modules") or [])
+        key, run_at = company_key(result["company_name"]), run_at or time.time()
+        row = (
+            result["company_name"].strip(), key, run_at,
+            result.get("overall_score"), scores.get("environmental"), scores.get("social"), scores.get("governance"),
+            item_count, json.dumps(result.get("risk_heatmap") or {})
+        )
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO score_runs (company, company_key, run_at, overall, environmental, social, governance, item_count, heatmap) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+                conn.executemany(
+                    "INSERT INTO feed_items (run_id, company_key, run_at, module, source, text, url, sentiment, sentiment_score, category, trust_score) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, key, run_at, _module_key(module.get("module_name")), item.get("source"), item.get("text"),
+                      item.get("url"), item.get("sentiment"), item.get("sentiment_score"), item.get("category"), item.get("trust_score"))
+                     for module in result.get("modules") or [] for item in module.get("feed") or []]
+                )
+        finally:
+            conn.close()
+        if FEED_ITEMS_DAYS > 0 and time.time() - self._last_feed_purge >= FEED_PURGE_INTERVAL_SECONDS:
+            self._last_feed_purge = time.time()
+            try:
+                self.purge_feed_items()
+            except sqlite3.Error as e:
+                print(f"Score History: Could not purge old feed items: {e}")
+        return cursor.lastrowid
+
+    def purge_feed_items(self, days: float = None) -> int:
+        """ Deletes feed items older than `days` (default FEED_ITEMS_DAYS); score runs are kept. Returns rows deleted. """
+        days = FEED_ITEMS_DAYS if days is None else days
+        conn = self._connect()
+        try:
+            with conn:
+                deleted = conn.execute("DELETE FROM feed_items WHERE run_at < ?", (time.time() - days * SECONDS_PER_DAY,)).rowcount
+        finally:
+            conn.close()
+        if deleted: print(f"Score History: Purged {deleted} feed items older than {days:g} days.")
+        return deleted
+
+    def record_greenwash(self, report: dict, run_at: float = None) -> int:
+        """ Appends one greenwash final report (run_full_analysis / batch). Returns the new row id. """
+        row = (
+            report["company_name"].strip(), company_key(report["company_name"]), run_at or time.time(), report.get("label"),
+            report.get("credibility_score"), report.get("pages_analyzed"), len(report.get("inconsistencies") or []), json.dumps(report)
+        )
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO greenwash_runs (company, company_key, run_at, label, credibility_score, pages_analyzed, inconsistency_count, report) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    # --- Reads ---
+    def series(self, company_name: str, days: float = None, window: int = DEFAULT_WINDOW, include_heatmap: bool = False) -> list:
+        """
+        Runs for one company (oldest first) with rolling averages over the last
+        `window` runs (computed by SQLite window functions over the full history).
+        """
+        window = max(1, int(window))
+        rolling = ", ".join(
+            f"AVG({metric}) OVER (ORDER BY run_at ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW) AS rolling_{metric}"
+            for metric in METRICS
+        )
+        query = (
+            f"SELECT * FROM (SELECT run_at, {', '.join(METRICS)}, item_count, heatmap, {rolling} "
+            "FROM score_runs WHERE company_key = ?) WHERE run_at >= ? ORDER BY run_at"
+        )
+        since = time.time() - days * SECONDS_PER_DAY if days else 0
+        conn = self._connect()
+        try:
+            rows = conn.execute(query, (company_key(company_name), since)).fetchall()
+        finally:
+            conn.close()
+
+        points = []
+        for row in rows:
+            point = {"run_at": row["run_at"], "item_count": row["item_count"]}
+            for metric in METRICS:
+                point[metric] = row[metric]
+                point[f"rolling_{metric}"] = round(row[f"rolling_{metric}"], 2) if row[f"rolling_{metric}"] is not None else None
+            if include_heatmap:
+                point["risk_heatmap"] = json.loads(row["heatmap"] or "{}")
+            points.append(point)
+        return points
+
+    def summary(self, company_name: str, days: float = 90, window: int = DEFAULT_WINDOW) -> dict:
+        """
+        Per-metric delta (first vs. latest run in the period), latest rolling
+        average and trend slope (points per day, least squares) for one company.
+        """
+        points = self.series(company_name, days, window)
+        if not points:
+            return {"company_name": company_name, "runs": 0, "metrics": {}}
+
+        first, latest = points[0], points[-1]
+        metrics = {}
+        for metric in METRICS:
+            values = [(point["run_at"], point[metric]) for point in points if point[metric] is not None]
+            if not values: continue
+            first_value, latest_value = values[0][1], values[-1][1]
+            metrics[metric] = {
+                "first": first_value,
+                "latest": latest_value,
+                "delta": latest_value - first_value,
+                "pct_change": round((latest_value - first_value) * 100 / first_value, 1) if first_value else None,
+                "rolling_average": latest[f"rolling_{metric}"],
+                "min": min(value for _, value in values),
+                "max": max(value for _, value in values),
+                "slope_per_day": _slope_per_day(values)
+            }
+        return {
+            "company_name": company_name,
+            "runs": len(points),
+            "first_run_at": first["run_at"],
+            "latest_run_at": latest["run_at"],
+            "window": window,
+            "metrics": metrics
+        }
+
+    def iter_rows(self, query: str, params=(), batch_rows: int = 5000):
+        """
+        Yields lists of rows (at most batch_rows each) for a read-only query. The generator may be
+        resumed on different threads (streamed HTTP responses do that); it's only used by one at a time.
+        """
+        conn = self._connect(same_thread=False)
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows: break
+                yield rows
+        finally:
+            conn.close()
+
+    def companies(self) -> list:
+        """ Every company with history: name (latest spelling), run count, last run time. """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT company, COUNT(*) AS runs, MAX(run_at) AS latest_run_at FROM score_runs "
+                "GROUP BY company_key ORDER BY latest_run_at DESC"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+
+def _slope_per_day(values: list):
+    """ Least-squares slope of (timestamp, value) pairs, in points per day. """
+    if len(values) < 2: return None
+    xs = [(at - values[0][0]) / SECONDS_PER_DAY for at, _ in values]
+    ys = [value for _, value in values]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0: return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread, 3)
+
+
+# Shared store used by ai_core.py and server.py
+history = ScoreHistory()
+
+
+def record_result(result: dict) -> None:
+    """ Appends a result to the shared store; history problems never fail an analysis. """
+    try:
+        history.record(result)
+    except Exception as e:
+        print(f"Score History: Could not record {result.get('company_name')}: {e}")
+
+
+def record_greenwash_result(report: dict) -> None:
+    """ Same for greenwash reports (error reports are skipped). """
+    if report.get("status") == "Error": return
+    try:
+        history.record_greenwash(report)
+    except Exception as e:
+        print(f"Score History: Could not record greenwash report for {report.get('company_name')}: {e}")
@@ -0,0 +1,253 @@
+# This is a new file: scoring_kernel.py
+# Columnar scoring engine used by ai_core.py
+# Turns analyzed feed items into NumPy arrays (integer-coded categories & sub-topics)
+# and computes overall / E,S,G scores, the risk heatmap and risk-summary inputs in ONE pass.
+# Works on any number of companies at once (group ids), so batch & leaderboard runs share it.
+
+import re
+import numpy as np
+
+# --- CONFIGURATION: Scoring Maps (same values the pandas version used) ---
+SENTIMENT_SCORING = {'positive': 1.0, 'neutral': 0.2, 'negative': -1.0} # Boost neutral
+SENTIMENT_DISPLAY = {'positive': 1.0, 'neutral': 0.0, 'negative': -1.0}
+DEFAULT_TRUST_SCORE = 0.5
+MIN_TOTAL_WEIGHT = 0.01 # Below this, scores default to 50
+MODULE_SENTIMENT_THRESHOLD = 0.15
+
+# Heatmap risk factors
+BASE_RISK_FACTOR = 0.2 # Small score for ANY item matching a sub-topic
+NEGATIVE_RISK_FACTOR = 1.0 # Extra score for NEGATIVE items
+
+# Feed sources (used for the per-module sentiment labels)
+SOURCE_NEWS = 0
+SOURCE_REDDIT = 1
+NUM_SOURCES = 2
+
+OTHER_SUB_TOPIC = "General Other"
+MAX_RISK_CATEGORIES = 3
+
+
+class ScoringSchema:
+    """
+    Integer codes for categories and sub-topics, plus one compiled keyword
+    pattern per sub-topic. Build once at import and reuse for every run.
+    """
+
+    def __init__(self, esg_labels: list, heatmap_labels: list, category_sub_topics: dict, sub_topic_keywords: dict):
+        self.categories = list(esg_labels)
+        self.category_codes = {label: code for code, label in enumerate(self.categories)}
+        self.unknown_category = len(self.categories) # Code for labels we don't know about
+
+        self.heatmap_labels = list(heatmap_labels)
+        self.sub_topics = self.heatmap_labels + [OTHER_SUB_TOPIC]
+        sub_topic_codes = {label: code for code, label in enumerate(self.sub_topics)}
+        self.other_sub_topic = sub_topic_codes[OTHER_SUB_TOPIC]
+
+        # category code -> [(sub_topic code, keyword pattern), ...] in priority order
+        self.sub_topic_rules = {}
+        for category, sub_topic_list in category_sub_topics.items():
+            rules = []
+            for sub_topic in sub_topic_list:
+                keywords = sub_topic_keywords.get(sub_topic, [])
+                pattern = re.compile("|".join(re.escape(kw) for kw in keywords)) if keywords else None
+                rules.append((sub_topic_codes[sub_topic], pattern))
+            self.sub_topic_rules[self.category_codes[category]] = rules
+
+    @property
+    def num_categories(self) -> int:
+        return len(self.categories) + 1 # + unknown bucket
+
+    @property
+    def num_sub_topics(self) -> int:
+        return len(self.sub_topics)
+
+
+# --- 1. ENCODING: feed items -> columns ---
+def encode_feeds(schema: ScoringSchema, feeds) -> dict:
+    """
+    Converts analyzed feed items into columnar arrays.
+    `feeds` is an iterable of (group_id, source_code, items) tuples.
+    """
+    groups, sources, categories, sentiments, trusts, texts = [], [], [], [], [], []
+    for group_id, source_code, items in feeds:
+        for item in items:
+            groups.append(group_id)
+            sources.append(source_code)
+            categories.append(schema.category_codes.get(item.get('category'), schema.unknown_category))
+            sentiments.append(item.get('sentiment'))
+            trust = item.get('trust_score')
+            trusts.append(DEFAULT_TRUST_SCORE if trust is None else trust)
+            texts.append(item.get('text', ''))
+
+    category = np.asarray(categories, dtype=np.int64)
+    columns = {
+        "group": np.asarray(groups, dtype=np.int64),
+        "source": np.asarray(sources, dtype=np.int64),
+        "category": category,
+        "sentiment_num": np.asarray([SENTIMENT_SCORING.get(s, 0.0) for s in sentiments], dtype=np.float64),
+        "sentiment_display": np.asarray([SENTIMENT_DISPLAY.get(s, 0.0) for s in sentiments], dtype=np.float64),
+        "trust": np.asarray(trusts, dtype=np.float64),
+        "text": texts,
+    }
+    columns["sub_topic"] = assign_sub_topics(schema, category, texts)
+    return columns
+
+
+def assign_sub_topics(schema: ScoringSchema, category: np.ndarray, texts: list) -> np.ndarray:
+    """
+    First matching sub-topic (by keyword) within each item's category;
+    falls back to the category's first sub-topic, or 'General Other'.
+    """
+    sub_topic = np.full(len(texts), schema.other_sub_topic, dtype=np.int64)
+    for category_code, rules in schema.sub_topic_rules.items():
+        rows = np.flatnonzero(category == category_code)
+        if rows.size == 0 or not rules: continue
+        sub_topic[rows] = rules[0][0] # Default: first sub-topic of the category
+        for row in rows:
+            text_lower = str(texts[row]).lower()
+            for code, pattern in rules:
+                if pattern is not None and pattern.search(text_lower):
+                    sub_topic[row] = code
+                    break
+    return sub_topic
+
+
+# --- 2. SCORING: one vectorized pass over all groups ---
+def _scaled_score(weighted_sum: float, total_weight: float) -> int:
+    """ Maps a weighted average sentiment (-1..1) onto 0..100. """
+    if total_weight > MIN_TOTAL_WEIGHT:
+        return round(((weighted_sum / total_weight + 1) / 2) * 100)
+    return 50
+
+
+def _rows_by_key(keys: np.ndarray):
+    """ Stable sort by key: rows of each key stay contiguous and in their original order. """
+    order = np.argsort(keys, kind="stable")
+    return order, keys[order]
+
+
+def _series_sums(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Per-key sums added like pandas Series.sum() on each key's rows: NumPy's pairwise
+    reduction over the rows in their original order. bincount adds one value after
+    another, which differs in the last bit and flips rounding at .5 score boundaries.
+    """
+    order, sorted_keys = _rows_by_key(keys)
+    sorted_values = values[order]
+    bounds = np.searchsorted(sorted_keys, np.arange(size + 1))
+    sums = np.zeros(size, dtype=np.float64)
+    for key in np.flatnonzero(np.diff(bounds)):
+        sums[key] = np.add.reduce(sorted_values[bounds[key]:bounds[key + 1]])
+    return sums
+
+
+def _groupby_sums(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """
+    Per-key sums added like pandas groupby().sum(): Kahan-compensated, rows in original order.
+    All keys advance together, one row each per step.
+    """
+    sums = np.zeros(size, dtype=np.float64)
+    if keys.size == 0: return sums
+    compensation = np.zeros(size, dtype=np.float64)
+    order, sorted_keys = _rows_by_key(keys)
+    rank = np.arange(keys.size) - np.searchsorted(sorted_keys, sorted_keys) # Position within its key
+    by_rank = np.argsort(rank, kind="stable")
+    steps = np.searchsorted(rank[by_rank], np.arange(rank.max() + 2))
+    for step in range(len(steps) - 1):
+        rows = by_rank[steps[step]:steps[step + 1]] # At most one row per key
+        key = sorted_keys[rows]
+        y = values[order[rows]] - compensation[key]
+        t = sums[key] + y
+        compensation[key] = (t - sums[key]) - y
+        sums[key] = t
+    return sums
+
+
+def _module_label(mean_value: float) -> str:
+    if mean_value > MODULE_SENTIMENT_THRESHOLD: return "Positive"
+    if mean_value < -MODULE_SENTIMENT_THRESHOLD: return "Negative"
+    return "Neutral"
+
+
+def score_columns(schema: ScoringSchema, columns: dict, num_groups: int = 1) -> list:
+    """
+    Computes, for every group, the calculated overall score, per-category scores,
+    risk heatmap, module sentiment labels and the risk-summary inputs.
+    Returns one dict per group id (0..num_groups-1).
+    """
+    group = columns["group"]; category = columns["category"]; sub_topic = columns["sub_topic"]
+    trust = columns["trust"]; texts = columns["text"]
+    weighted = columns["sentiment_num"] * trust
+    negative = columns["sentiment_num"] == -1
+
+    num_categories = schema.num_categories
+    num_sub_topics = schema.num_sub_topics
+
+    # Overall & per-category weights (summed in the same order as the pandas version)
+    total_weight = _series_sums(group, trust, num_groups)
+    total_weighted = _series_sums(group, weighted, num_groups)
+    cat_index = group * num_categories + category
+    cat_size = num_groups * num_categories
+    cat_count = np.bincount(cat_index, minlength=cat_size).reshape(num_groups, num_categories)
+    cat_weight = _series_sums(cat_index, trust, cat_size).reshape(num_groups, num_categories)
+    cat_weighted = _series_sums(cat_index, weighted, cat_size).reshape(num_groups, num_categories)
+
+    # Heatmap: base activity + extra weight for negative items
+    sub_index = group * num_sub_topics + sub_topic
+    sub_size = num_groups * num_sub_topics
+    base_risk = _groupby_sums(sub_index, trust, sub_size).reshape(num_groups, num_sub_topics) * BASE_RISK_FACTOR
+    negative_risk = _groupby_sums(sub_index[negative], trust[negative], sub_size).reshape(num_groups, num_sub_topics) * NEGATIVE_RISK_FACTOR
+    heatmap = base_risk + negative_risk
+
+    # Module sentiment (simple mean of the display map per feed)
+    src_index = group * NUM_SOURCES + columns["source"]
+    src_size = num_groups * NUM_SOURCES
+    src_count = np.bincount(src_index, minlength=src_size).reshape(num_groups, NUM_SOURCES)
+    src_sum = np.bincount(src_index, weights=columns["sentiment_display"], minlength=src_size).reshape(num_groups, NUM_SOURCES)
+
+    # Risk-summary inputs: negative items per category + highest-trust sample
+    neg_count = np.bincount(cat_index[negative], minlength=cat_size).reshape(num_groups, num_categories)
+    neg_weight = _groupby_sums(cat_index[negative], trust[negative], cat_size).reshape(num_groups, num_categories)
+    neg_rows = np.flatnonzero(negative)
+    sample_rows = {}
+    if neg_rows.size:
+        order = np.lexsort((neg_rows, -trust[neg_rows], cat_index[neg_rows])) # key, then trust desc, then first seen
+        sorted_keys = cat_index[neg_rows][order]
+        unique_keys, first_pos = np.unique(sorted_keys, return_index=True)
+        sample_rows = dict(zip(unique_keys.tolist(), neg_rows[order][first_pos].tolist()))
+
+    # Sorted-by-name category order mirrors a groupby, ties then keep that order
+    name_order = sorted(range(len(schema.categories)), key=lambda code: schema.categories[code])
+
+    results = []
+    for g in range(num_groups):
+        risk_inputs = []
+        present = [code for code in name_order if neg_count[g, code] > 0]
+        present.sort(key=lambda code: -neg_weight[g, code]) # Stable sort
+        for code in present[:MAX_RISK_CATEGORIES]:
+            row = sample_rows.get(g * num_categories + code)
+            risk_inputs.append({
+                "category": schema.categories[code],
+                "count": int(neg_count[g, code]),
+                "weight": float(neg_weight[g, code]),
+                "sample_text": texts[row] if row is not None else None
+            })
+
+        results.append({
+            "item_count": int(cat_count[g].sum()),
+            "overall_score": _scaled_score(float(total_weighted[g]), float(total_weight[g])),
+            "total_weight": float(total_weight[g]),
+            "weighted_sum": float(total_weighted[g]),
+            "category_scores": {
+                label: (_scaled_score(float(cat_weighted[g, code]), float(cat_weight[g, code])) if cat_count[g, code] else 50)
+                for code, label in enumerate(schema.categories)
+            },
+            "risk_heatmap": {label: round(float(heatmap[g, code]), 1) for code, label in enumerate(schema.heatmap_labels)},
+            "module_sentiment": [
+                _module_label(float(src_sum[g, s]) / src_count[g, s]) if src_count[g, s] else "Neutral"
+                for s in range(NUM_SOURCES)
+            ],
+            "has_negative_items": bool(neg_count[g].sum()),
+            "risk_inputs": risk_inputs
+        })
+    return results
@@ -0,0 +1,122 @@
+# This is a new file: self_assessment_bulk.py
+# Bulk self-assessment scoring: parse a CSV / JSONL upload, validate rows in chunks,
+# score them with company_checker's vectorized scorer and stream NDJSON results back.
+
+import csv
+import io
+import json
+from pydantic import ValidationError
+from company_checker import SelfAssessmentData, sa_score_rows
+from peer_index import peer_index # Scored rows count as peers, like single submissions
+
+# --- CONFIGURATION: Bulk Scoring ---
+BULK_CHUNK_ROWS = 500 # Rows validated + scored together
+MAX_BULK_ROWS = 50000 # Rows beyond this are reported as errors, not scored
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(filename: str = None, declared: str = None) -> str:
+    """ "csv" or "jsonl" from the declared format, else the file extension (default csv). """
+    if declared:
+        declared = declared.lower().strip(".")
+        if declared in ("json", "ndjson"): declared = "jsonl"
+        if declared not in FORMATS:
+            raise ValueError(f"Unsupported format '{declared}'. Use csv or jsonl.")
+        return declared
+    if filename and filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def iter_raw_rows(binary_file, file_format: str):
+    """
+    Yields (row_number, dict) or (row_number, error message) for each data row.
+    row_number is the 1-based data row (CSV header and blank JSONL lines aren't counted).
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            # Blank cells count as missing answers (reported as "Field required")
+            yield row_number, {key.strip(): value.strip() for key, value in row.items() if key and value not in (None, "")}
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip(): continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, f"Invalid JSON: {e}"
+            continue
+        yield row_number, row if isinstance(row, dict) else "Each line must be a JSON object."
+
+
+def _format_errors(errors: list) -> list:
+    return [{"field": ".".join(str(part) for part in error["loc"]) or None, "message": error["msg"]} for error in errors]
+
+
+def validate_chunk(raw_rows: list):
+    """
+    Validates a chunk of (row_number, dict) pairs, each row exactly once.
+    Returns ([(row_number, SelfAssessmentData)], {row_number: [errors]}).
+    """
+    valid, errors = [], {}
+    for number, row in raw_rows:
+        try:
+            valid.append((number, SelfAssessmentData.model_validate(row)))
+        except ValidationError as e:
+            errors[number] = _format_errors(e.errors())
+    return valid, errors
+
+
+def _score_chunk(chunk: list, add_to_index: bool = True) -> list:
+    """ One chunk of (row_number, dict or error message) -> result dicts, in row order. """
+    parse_errors = {number: [{"field": None, "message": row}] for number, row in chunk if isinstance(row, str)}
+    raw_rows = [(number, row) for number, row in chunk if isinstance(row, dict)]
+    valid, errors = validate_chunk(raw_rows)
+    errors.update(parse_errors)
+
+    names = {number: row.get("company_name") for number, row in raw_rows}
+    scores = sa_score_rows([model for _, model in valid])
+    if add_to_index and scores:
+        try:
+            peer_index.add_many([(score, model.sector) for (_, model), score in zip(valid, scores)])
+        except Exception as e:
+            print(f"Bulk Self-Assessment: Could not add rows to the peer index: {e}")
+    results = {number: dict(score, row=number, ok=True) for (number, _), score in zip(valid, scores)}
+    for number, row_errors in errors.items():
+        results[number] = {"row": number, "ok": False, "company_name": names.get(number), "errors": row_errors}
+    return [results[number] for number, _ in chunk]
+
+
+def score_upload(binary_file, file_format: str, chunk_rows: int = BULK_CHUNK_ROWS, max_rows: int = MAX_BULK_ROWS, add_to_index: bool = True):
+    """
+    Generator of NDJSON lines (bytes): one result per row, then a summary line.
+    Bad rows produce {"ok": false, "errors": [...]} lines; the rest are still scored
+    and (one transaction per chunk) added to the peer index.
+    """
+    totals = {"rows": 0, "scored": 0, "failed": 0}
+    chunk = []
+
+    def flush():
+        for result in _score_chunk(chunk, add_to_index):
+            totals["scored" if result["ok"] else "failed"] += 1
+            yield (json.dumps(result) + "\n").encode("utf-8")
+        chunk.clear()
+
+    try:
+        for row_number, row in iter_raw_rows(binary_file, file_format):
+            totals["rows"] += 1
+            if row_number > max_rows:
+                row = f"Row limit of {max_rows} exceeded; row not scored."
+            chunk.append((row_number, row))
+            if len(chunk) >= chunk_rows:
+                yield from flush()
+        yield from flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Unreadable file: score what was read, then report the problem
+        yield from flush()
+        yield (json.dumps({"ok": False, "row": None, "errors": [{"field": None, "message": f"Could not read file: {e}"}]}) + "\n").encode("utf-8")
+    print(f"Bulk Self-Assessment: {totals['rows']} rows, {totals['scored']} scored, {totals['failed']} failed.")
+    yield (json.dumps({"summary": totals}) + "\n").encode("utf-8")
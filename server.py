@@ -1,109 +1,588 @@
 # server.py
-from fastapi import FastAPI, Form, UploadFile, File
+from fastapi import FastAPI, APIRouter, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from typing import List
 import ai_core 
 import greenwash_analyzer
 import company_checker # <<< 1. IMPORT YOUR NEW FILE
 from company_checker import SelfAssessmentData # <<< 2. IMPORT THE DATA MODEL
-import uvicorn
+import greenwash_jobs # Background job queue for greenwash analyses
+import uploads # Size-capped, disk-spooled PDF uploads
+import leaderboard_materializer # Background-refreshed leaderboard snapshot
+import score_history # Stored score time series (trends, deltas, rolling averages)
+import bulk_export # Parquet / Arrow export of stored results
+import self_assessment_bulk # CSV / JSONL bulk self-assessment scoring
+from peer_index import peer_index # Peer percentiles for self-assessment scores
+import response_shaping # Field selection, feed cursors, fast JSON
+import cancellation # Stop abandoned / overdue analyses
+import admission # Bounded per-workload executors (429 + Retry-After when full)
+import model_registry # Loaded models, memory budget, load / unload events
+import job_broker # Distributed jobs: published here, run by worker.py processes on any node
 import io
+import json
 import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+# All routes live on this router; create_app() mounts it (plus main.py's routes) on one app
+router = APIRouter()
+SHUTDOWN_DRAIN_SECONDS = float(os.environ.get("REPUTEX_GRACEFUL_TIMEOUT", "30")) # Running greenwash jobs get this long to finish
+GZIP_MIN_BYTES = 1000 # Responses smaller than this aren't compressed
+# Models each worker loads in the background once listening: comma-separated registry names or model ids
+# (e.g. "facebook/bart-large-mnli"), or "all". Default none: every worker loading every model costs
+# workers x models of memory, so models load on first use (launcher.py preloads them once instead).
+WARM_MODELS = [name.strip() for name in os.environ.get("REPUTEX_WARM_MODELS", "").split(",") if name.strip() not in ("", "0")]
+ANALYZE_TIMEOUT_SECONDS = float(os.environ.get("REPUTEX_ANALYZE_TIMEOUT", "120")) # Deadline for /api/analyze
+GREENWASH_TIMEOUT_SECONDS = float(os.environ.get("REPUTEX_GREENWASH_TIMEOUT", "600")) # Deadline for a synchronous greenwash run
 
-# --- CORS Middleware (Keep as is) ---
+# --- Greenwash Job Queue (bounded workers, queue-depth limit, result expiry) ---
+# Jobs run in the worker that accepted them; their records are shared (SQLite), so polls may land on any worker
+greenwash_job_queue = greenwash_jobs.GreenwashJobQueue(
+    greenwash_analyzer.run_full_analysis,
+    max_workers=2, max_queued=20, result_ttl=3600
+)
+JOB_EVENTS_POLL_SECONDS = 0.5
+MAX_BATCH_REPORTS = 10 # PDFs accepted by one /api/analyze-greenwash/batch request
+
+# --- Materialized Leaderboard (refreshed in the background, read instantly) ---
+# REPUTEX_DISTRIBUTED=1: refreshes are published to the job broker and run on the workers, all due companies at once
+_watchlist = leaderboard_materializer.WATCHLIST or ai_core.DEFAULT_LEADERBOARD_COMPANIES
+
+def _analyze_on_workers(company_names: list) -> dict:
+    # Jobs keyed by half-TTL window: API nodes refreshing together share jobs, and an expired
+    # company is never answered with the COMPLETE job of the refresh that just expired
+    run = job_broker.window_run(leaderboard_materializer.COMPANY_TTL_SECONDS / 2)
+    return job_broker.analyze_companies(company_names, run=run)
+
+leaderboard = leaderboard_materializer.LeaderboardMaterializer(
+    _analyze_on_workers if job_broker.DISTRIBUTED else ai_core.analyze_companies,
+    ai_core.leaderboard_row, ai_core.leaderboard_sort_key, watchlist=_watchlist,
+    **({"batch_size": len(_watchlist), "stagger": 0} if job_broker.DISTRIBUTED else {})
+)
+
+# --- Upload Size Limit (rejects oversized uploads before the body is read) ---
+uploads.UPLOAD_PATHS.update({"/api/analyze-greenwash", "/api/greenwash-jobs", "/api/jobs/greenwash", "/submit_self_assessment/bulk"})
+uploads.MULTI_UPLOAD_PATHS["/api/analyze-greenwash/batch"] = MAX_BATCH_REPORTS
+
+# --- CORS Origins (applied in create_app) ---
 origins = [
     "http://localhost",
     "http://localhost:3000",
     "http://localhost:5173", # Default Vite port
     # Add your deployed React app's URL here if you have one
 ]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+def cancelled_response(error: cancellation.OperationCancelled, content: dict) -> JSONResponse:
+    """ 504 when the deadline passed; otherwise the client is gone and the body is never read. """
+    print(f"API Server: Analysis stopped early ({error}).")
+    return JSONResponse(status_code=504 if error.timed_out else cancellation.CLIENT_CLOSED_STATUS, content=content)
+
+def overloaded_response(error: admission.Overloaded, content: dict) -> JSONResponse:
+    """ 429 (class full) / 503 (shutting down) with a Retry-After hint. """
+    print(f"API Server: Rejected request: {error}")
+    return JSONResponse(status_code=error.status_code, headers=error.headers, content=dict(content, retry_after=error.retry_after))
+
+async def handle_overloaded(request: Request, error: admission.Overloaded) -> JSONResponse:
+    """ App-wide fallback for routes without their own Overloaded handling (e.g. /api/history). """
+    return overloaded_response(error, {"error": str(error), "message": "Server is busy. Try again later."})
 
 # --- /api/analyze Endpoint (Keep as is) ---
-@app.get("/api/analyze")
-async def analyze_company(company: str):
+@router.get("/api/analyze", response_class=response_shaping.FastJSONResponse)
+async def analyze_company(request: Request, company: str = None, fields: str = None, feed_limit: int = None, cursor: str = None):
     """
     Endpoint for the main dashboard analysis.
+    Optional: fields=overall_score,scores (top-level keys only), feed_limit=N (first N
+    items per module feed, with next_cursor), cursor=... (next page of one feed, no re-analysis).
+    The analysis stops early if the client disconnects or ANALYZE_TIMEOUT_SECONDS pass (504).
     """
+    if cursor:
+        try:
+            return response_shaping.FastJSONResponse(response_shaping.feed_page_from_cursor(cursor))
+        except response_shaping.CursorError as e:
+            return response_shaping.FastJSONResponse(status_code=410 if e.expired else 400, content={"error": str(e), "message": "Failed to load feed page."})
+    if not company:
+        return response_shaping.FastJSONResponse(status_code=400, content={"error": "Missing company.", "message": "Failed to analyze company."})
+
     print(f"API Server: Received request for company: {company}")
     try:
         # --- Run main analysis in a thread to prevent blocking ---
-        result_data = await asyncio.to_thread(ai_core.get_combined_analysis, company)
+        result_data = await cancellation.run_cancellable(
+            request, ai_core.get_combined_analysis, company,
+            timeout=ANALYZE_TIMEOUT_SECONDS, workload=admission.pool("interactive")
+        )
         print("API Server: Analysis complete, sending response.")
-        return result_data
+        result_data = response_shaping.select_fields(result_data, response_shaping.parse_fields(fields))
+        if feed_limit:
+            result_data = response_shaping.paginate_feeds(result_data, feed_limit)
+        return response_shaping.FastJSONResponse(result_data)
+    except admission.Overloaded as e:
+        return overloaded_response(e, {"error": str(e), "message": "Server is busy. Try again later."})
+    except cancellation.OperationCancelled as e:
+        return cancelled_response(e, {"error": f"Analysis stopped: {e}", "message": "Failed to analyze company."})
     except Exception as e:
         print(f"API Server: Error during analysis: {e}")
-        return {"error": str(e), "message": "Failed to analyze company."}
+        return response_shaping.FastJSONResponse({"error": str(e), "message": "Failed to analyze company."})
 
 # --- /api/analyze-greenwash Endpoint (Keep as is) ---
-@app.post("/api/analyze-greenwash")
-async def analyze_greenwash_report(
-    company_name: str = Form(...),
-    file: UploadFile = File(...)
-):
+@router.post("/api/analyze-greenwash")
+async def analyze_greenwash_report(request: Request):
     """
-    Endpoint to analyze an uploaded PDF for greenwashing.
+    Endpoint to analyze an uploaded PDF for greenwashing (form fields: company_name, file).
+    Stops early if the client disconnects or GREENWASH_TIMEOUT_SECONDS pass (504);
+    use /api/greenwash-jobs for reports that may take longer.
     """
-    print(f"API Server: Received Greenwash request for company: {company_name}")
-    print(f"API Server: Received file: {file.filename}")
-
+    pdf_path = None
+    slot = None
     try:
-        pdf_bytes = await file.read()
-        if not pdf_bytes:
-            return {"status": "Error", "report": "Uploaded file is empty."}
+        slot = admission.pool("report").reserve() # Reject before reading the upload if we're full; hold the slot while it's read
+        # The upload streams straight to a temp file (size-capped); PyMuPDF reads it from disk
+        fields, files = await uploads.read_upload_form(request)
+        upload = uploads.uploaded_file(files)
+        pdf_path = upload.path if upload else None
+        company_name = fields.get("company_name")
+        if not company_name or upload is None:
+            return JSONResponse(status_code=400, content={"status": "Error", "report": "Send a company_name and a PDF file."})
+        print(f"API Server: Received Greenwash request for company: {company_name}")
+        print(f"API Server: Received file: {upload.filename}")
         
         print("API Server: Starting Greenwash analysis... (This may take a while)")
         
         # --- RUN THE SLOW, BLOCKING FUNCTION IN A THREAD ---
-        result_data = await asyncio.to_thread(
-            greenwash_analyzer.run_full_analysis, company_name, pdf_bytes
+        result_data = await cancellation.run_cancellable(
+            request, greenwash_analyzer.run_full_analysis, company_name, pdf_path,
+            timeout=GREENWASH_TIMEOUT_SECONDS, workload=slot
         )
 
         print("API Server: Greenwash analysis complete, sending response.")
         return result_data
 
+    except uploads.UploadTooLargeError as e:
+        print(f"API Server: Rejected greenwash upload: {e}")
+        return uploads.too_large_response()
+    except uploads.EmptyUploadError:
+        return {"status": "Error", "report": "Uploaded file is empty."}
+    except uploads.BadUploadError as e:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": str(e)})
+    except admission.Overloaded as e:
+        return overloaded_response(e, {"status": "Error", "report": str(e), "message": "Server is busy. Try again later, or use /api/greenwash-jobs."})
+    except cancellation.OperationCancelled as e:
+        return cancelled_response(e, {"status": "Error", "report": f"Analysis stopped: {e}", "message": "Failed to process PDF file."})
     except Exception as e:
         print(f"API Server: Error during greenwash analysis: {e}")
         return {"status": "Error", "report": str(e), "message": "Failed to process PDF file."}
+    finally:
+        if slot: slot.release() # No-op once the analysis was submitted
+        uploads.remove_upload(pdf_path)
+
+# --- /api/analyze-greenwash/batch: several reports in one run + comparison table ---
+@router.post("/api/analyze-greenwash/batch")
+async def analyze_greenwash_batch(request: Request):
+    """
+    Analyzes several PDFs together (e.g. several years of one company, or peers).
+    Form fields: repeated `files`, and one company_names value per file (or a single value used for every file).
+    """
+    stored = []
+    slot = None
+    try:
+        slot = admission.pool("batch").reserve() # Held while the uploads are read
+        fields, stored = await uploads.read_upload_form(request, max_files=MAX_BATCH_REPORTS)
+        files = [upload for upload in stored if upload.field == "files"]
+        company_names = fields.getlist("company_names")
+        print(f"API Server: Received Greenwash batch of {len(files)} files")
+        if len(company_names) == 1:
+            company_names = company_names * len(files)
+        if not files or len(company_names) != len(files):
+            return JSONResponse(status_code=400, content={"status": "Error", "report": "Send one company name per file (or a single name for all files)."})
+        # Empty files are reported as an error row for that file
+        reports = [(name, upload.path if upload.size else None, upload.filename) for name, upload in zip(company_names, files)]
+
+        print("API Server: Starting Greenwash batch analysis... (This may take a while)")
+        result_data = await slot.run(greenwash_analyzer.run_batch_analysis, reports)
+        print("API Server: Greenwash batch analysis complete, sending response.")
+        return result_data
+
+    except uploads.UploadTooLargeError as e:
+        print(f"API Server: Rejected greenwash upload: {e}")
+        return uploads.too_large_response()
+    except uploads.BadUploadError as e:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": str(e)})
+    except admission.Overloaded as e:
+        return overloaded_response(e, {"status": "Error", "report": str(e), "message": "Server is busy. Try again later."})
+    except Exception as e:
+        print(f"API Server: Error during greenwash batch analysis: {e}")
+        return {"status": "Error", "report": str(e), "message": "Failed to process PDF files."}
+    finally:
+        if slot: slot.release()
+        for upload in stored:
+            uploads.remove_upload(upload.path)
+
+# --- Greenwash Job API: submit, then poll or stream status ---
+@router.post("/api/greenwash-jobs", status_code=202)
+async def submit_greenwash_job(request: Request):
+    """
+    Queues a greenwash analysis (form fields: company_name, file) and returns its job id immediately.
+    """
+    try:
+        fields, files = await uploads.read_upload_form(request)
+        upload = uploads.uploaded_file(files)
+    except uploads.UploadTooLargeError as e:
+        print(f"API Server: Rejected greenwash upload: {e}")
+        return uploads.too_large_response()
+    except uploads.EmptyUploadError:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": "Uploaded file is empty."})
+    except uploads.BadUploadError as e:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": str(e)})
+    company_name = fields.get("company_name")
+    if not company_name or upload is None:
+        if upload is not None: uploads.remove_upload(upload.path)
+        return JSONResponse(status_code=400, content={"status": "Error", "report": "Send a company_name and a PDF file."})
+    print(f"API Server: Received Greenwash job for company: {company_name}, file: {upload.filename}")
+    pdf_path = upload.path
+    try:
+        # The queue deletes the temp file once the job has run
+        job = await asyncio.to_thread(greenwash_job_queue.submit, company_name, pdf_path, filename=upload.filename, cleanup=uploads.remove_upload)
+    except greenwash_jobs.QueueFullError as e:
+        uploads.remove_upload(pdf_path)
+        print(f"API Server: Rejected greenwash job: {e}")
+        return JSONResponse(status_code=429, headers={"Retry-After": "60"}, content={"error": str(e), "message": "Too many queued analyses. Try again later."})
+    job["status_url"] = f"/api/greenwash-jobs/{job['job_id']}"
+    job["events_url"] = f"/api/greenwash-jobs/{job['job_id']}/events"
+    return job
+
+@router.get("/api/greenwash-jobs/{job_id}")
+async def get_greenwash_job(job_id: str):
+    """
+    Returns a job's status and progress, plus the report once complete (any server worker can answer).
+    """
+    job = await asyncio.to_thread(greenwash_job_queue.get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job id."})
+    return job
+
+@router.get("/api/greenwash-jobs/{job_id}/events")
+async def stream_greenwash_job(job_id: str):
+    """
+    Server-Sent Events stream of a job's status; ends when the job finishes.
+    """
+    if await asyncio.to_thread(greenwash_job_queue.get, job_id, False) is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job id."})
+
+    async def events():
+        last_version = None
+        while True:
+            job = await asyncio.to_thread(greenwash_job_queue.get, job_id)
+            if job is None:
+                yield f"event: expired\ndata: {json.dumps({'job_id': job_id})}\n\n"
+                return
+            finished = job["status"] in greenwash_jobs.FINISHED_STATES
+            if job["version"] != last_version:
+                last_version = job["version"]
+                if not finished: job.pop("result", None) # Result only sent once, at the end
+                yield f"data: {json.dumps(job)}\n\n"
+            if finished:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@router.get("/api/greenwash-jobs")
+async def get_greenwash_job_stats():
+    """ Queue depth and job counts (all server workers; running_here = this process). """
+    return await asyncio.to_thread(greenwash_job_queue.stats)
+
+# --- Distributed Jobs: published to the broker, run by worker.py on any node ---
+def _job_links(job: dict) -> dict:
+    job["status_url"] = f"/api/jobs/{job['job_id']}"
+    return job
+
+@router.post("/api/jobs/analysis", status_code=202)
+async def submit_analysis_jobs(companies: List[str] = Form(...), run: str = Form(None)):
+    """
+    Publishes one analysis job per company (repeat `companies` or comma-separate them).
+    Idempotent: the same company and run label (default: today's UTC date) returns the existing job.
+    """
+    names = [name.strip() for value in companies for name in value.split(",") if name.strip()]
+    if not names:
+        return JSONResponse(status_code=400, content={"error": "No companies given.", "message": "Failed to submit jobs."})
+    try:
+        submitted = await asyncio.to_thread(job_broker.submit_analyses, names, run)
+    except Exception as e:
+        print(f"API Server: Could not publish analysis jobs: {e}")
+        return JSONResponse(status_code=503, content={"error": str(e), "message": "Job broker unavailable."})
+    print(f"API Server: Published {len(submitted)} analysis jobs")
+    return {"jobs": {company: _job_links(job) for company, job in submitted.items()}}
+
+@router.post("/api/jobs/greenwash", status_code=202)
+async def submit_greenwash_broker_job(request: Request):
+    """
+    Publishes a greenwash analysis (form fields: company_name, run, and a PDF `file` or a `pdf_url`)
+    of an uploaded PDF (moved into the shared job file store) or of a PDF URL (downloaded by the
+    worker). The same PDF + company + run label returns the existing job.
+    """
+    pdf_path = None
+    try:
+        fields, files = await uploads.read_upload_form(request)
+        upload = uploads.uploaded_file(files)
+        pdf_path = upload.path if upload else None
+        company_name, pdf_url = fields.get("company_name"), fields.get("pdf_url")
+        if not company_name or (upload is None and not pdf_url):
+            return JSONResponse(status_code=400, content={"status": "Error", "report": "Send a company_name and a PDF file or a pdf_url."})
+        job = await asyncio.to_thread(
+            job_broker.submit_greenwash, company_name, pdf_path, pdf_url, upload.filename if upload else None, run=fields.get("run"), move=True
+        )
+    except uploads.UploadTooLargeError as e:
+        print(f"API Server: Rejected greenwash upload: {e}")
+        return uploads.too_large_response()
+    except uploads.EmptyUploadError:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": "Uploaded file is empty."})
+    except (uploads.BadUploadError, job_broker.BrokerError) as e:
+        return JSONResponse(status_code=400, content={"status": "Error", "report": str(e)})
+    except Exception as e:
+        print(f"API Server: Could not publish greenwash job: {e}")
+        return JSONResponse(status_code=503, content={"status": "Error", "report": str(e), "message": "Job broker unavailable."})
+    finally:
+        uploads.remove_upload(pdf_path) # Already moved unless publishing failed
+    print(f"API Server: Published greenwash job {job['job_id']} for {company_name}")
+    return _job_links(job)
+
+@router.get("/api/jobs")
+async def collect_jobs(ids: str = None, include_result: bool = True):
+    """ Status (and results) of comma-separated job `ids`; without ids, broker-wide job counts. """
+    job_ids = [job_id.strip() for job_id in (ids or "").split(",") if job_id.strip()]
+    if not job_ids:
+        return await asyncio.to_thread(job_broker.broker.stats)
+    jobs = await asyncio.to_thread(job_broker.broker.get_many, job_ids, include_result)
+    return {"jobs": jobs, "missing": [job_id for job_id in job_ids if job_id not in jobs],
+            "finished": all(job["status"] in job_broker.FINISHED_STATES for job in jobs.values())}
+
+@router.get("/api/jobs/{job_id}")
+async def get_broker_job(job_id: str):
+    """ A job's status, attempts and progress, plus its result once complete. """
+    job = await asyncio.to_thread(job_broker.broker.get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired job id."})
+    return job
 
 # --- 3. ADD NEW ENDPOINT FOR SELF-ASSESSMENT ---
-@app.post("/submit_self_assessment/") # <<< Matches your companycheck.jsx
+@router.post("/submit_self_assessment/") # <<< Matches your companycheck.jsx
 async def run_company_check(data: SelfAssessmentData): # FastAPI uses the Pydantic model
     """
     Endpoint to calculate the 15-question self-assessment score.
     """
     print(f"API Server: Received Company Check request for: {data.company_name}")
     try:
-        # Call the calculation function from the separate module
-        # This function is fast, no thread needed
+        # Scoring is pure arithmetic and stays on the event loop
         result_data = company_checker.calculate_sa_score(data)
+        try:
+            # Rank against all earlier submissions (O(log n)), then add this one to the index.
+            # Takes the index lock and writes SQLite, so it runs in the "reads" pool.
+            result_data["percentiles"] = await admission.run("reads", peer_index.rank_and_add, result_data, data.sector)
+        except Exception as e:
+            print(f"API Server: Could not compute peer percentiles: {e}")
+            result_data["percentiles"] = None
         print("API Server: Self-Assessment calculation complete.")
         return result_data
     except Exception as e:
         print(f"API Server: Error during self-assessment: {e}")
         return {"error": str(e), "message": "Failed to process self-assessment."}
 
+@router.post("/submit_self_assessment/bulk")
+async def run_bulk_company_check(request: Request):
+    """
+    Scores a CSV (header row = SelfAssessmentData field names) or JSONL upload of
+    self-assessments (form fields: file, optional format). Streams NDJSON: one result
+    per row (bad rows carry "errors"), then a {"summary": ...} line.
+    """
+    upload = None
+    try:
+        fields, files = await uploads.read_upload_form(request, suffix=None)
+        upload = uploads.uploaded_file(files)
+        if upload is None:
+            raise ValueError("Upload a CSV or JSONL file.")
+        print(f"API Server: Received bulk self-assessment file: {upload.filename}")
+        file_format = self_assessment_bulk.detect_format(upload.filename, fields.get("format"))
+        upload_path = upload.path
+    except (ValueError, uploads.BadUploadError) as e:
+        if upload is not None: uploads.remove_upload(upload.path)
+        return JSONResponse(status_code=400, content={"error": str(e), "message": "Failed to process self-assessment file."})
+    except uploads.UploadTooLargeError as e:
+        print(f"API Server: Rejected bulk self-assessment upload: {e}")
+        return uploads.too_large_response()
+    except uploads.EmptyUploadError:
+        return JSONResponse(status_code=400, content={"error": "Uploaded file is empty.", "message": "Failed to process self-assessment file."})
+
+    def stream_results():
+        # Runs in Starlette's threadpool; the temp file is removed when streaming ends
+        try:
+            with open(upload_path, "rb") as handle:
+                yield from self_assessment_bulk.score_upload(handle, file_format)
+        finally:
+            uploads.remove_upload(upload_path)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 # --- (Optional) Leaderboard Endpoint (Keep as is) ---
-@app.get("/api/leaderboard")
+@router.get("/api/leaderboard")
 async def get_leaderboard_data():
+     """
+     Latest materialized leaderboard snapshot, with its timestamp and per-company
+     freshness. The background scheduler keeps it refreshed; nothing slow runs here.
+     """
      try:
          print("API Server: Received request for leaderboard")
-         # Wrap this in a thread too, as it's very slow
-         leaderboard = await asyncio.to_thread(ai_core.get_leaderboard)
-         print("API Server: Leaderboard complete, sending response.")
-         return leaderboard
+         return leaderboard.snapshot()
      except Exception as e:
          print(f"API Server: Error during leaderboard generation: {e}")
          return {"error": str(e), "message": "Failed to get leaderboard."}
 
-# --- Run the server (Keep as is) ---
+# --- Score History: trends, deltas & rolling averages from stored runs ---
+@router.get("/api/history")
+async def list_history_companies():
+    """ Companies with stored score history. """
+    return await admission.run("reads", score_history.history.companies)
+
+@router.get("/api/history/{company}")
+async def get_score_history(company: str, days: float = None, window: int = score_history.DEFAULT_WINDOW, include_heatmap: bool = False):
+    """
+    Stored score runs for a company (oldest first), each with rolling averages
+    over the last `window` runs. `days` limits how far back to go.
+    """
+    try:
+        points = await admission.run("reads", score_history.history.series, company, days, window, include_heatmap)
+        return {"company_name": company, "window": window, "points": points}
+    except admission.Overloaded as e:
+        return overloaded_response(e, {"error": str(e), "message": "Server is busy. Try again later."})
+    except Exception as e:
+        print(f"API Server: Error reading score history: {e}")
+        return {"error": str(e), "message": "Failed to read score history."}
+
+@router.get("/api/history/{company}/summary")
+async def get_score_history_summary(company: str, days: float = 90, window: int = score_history.DEFAULT_WINDOW):
+    """
+    Per-metric change over the period (first vs. latest run), latest rolling
+    average, min/max and trend slope (points per day).
+    """
+    try:
+        return await admission.run("reads", score_history.history.summary, company, days, window)
+    except admission.Overloaded as e:
+        return overloaded_response(e, {"error": str(e), "message": "Server is busy. Try again later."})
+    except Exception as e:
+        print(f"API Server: Error reading score history: {e}")
+        return {"error": str(e), "message": "Failed to read score history."}
+
+# --- Bulk Export: stored results as one streamed Parquet / Arrow file (no pipeline re-run) ---
+@router.get("/api/export")
+async def export_results(dataset: str = "scores", companies: str = None, since: str = None, until: str = None, format: str = "parquet"):
+    """
+    Stored scores + heatmaps (dataset=scores), analyzed feed items (feed_items) or greenwash
+    reports (greenwash) for comma-separated `companies` (default all) between `since` and
+    `until` (YYYY-MM-DD / ISO / epoch; a bare `until` date is inclusive). Streamed in batches.
+    For partitioned files (company / date directories) use `python bulk_export.py`.
+    """
+    try:
+        company_list = [company.strip() for company in (companies or "").split(",") if company.strip()] or None
+        since_at, until_at = bulk_export.parse_time(since), bulk_export.parse_time(until, end_of_day=True)
+        chunks = bulk_export.stream_export(dataset, company_list, since_at, until_at, format)
+        first_chunk = await asyncio.to_thread(next, chunks) # Surfaces bad requests before the 200 is sent
+    except bulk_export.ExportError as e:
+        return JSONResponse(status_code=400, content={"status": "Error", "error": str(e), "message": "Failed to export results."})
+    except Exception as e:
+        print(f"API Server: Error during export: {e}")
+        return JSONResponse(status_code=500, content={"status": "Error", "error": str(e), "message": "Failed to export results."})
+
+    def stream_rest():
+        yield first_chunk
+        yield from chunks
+
+    media_type = bulk_export.FORMATS[format][0]
+    filename = bulk_export.export_filename(dataset, format)
+    print(f"API Server: Streaming {dataset} export ({format}) for {company_list or 'all companies'}")
+    return StreamingResponse(stream_rest(), media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+# --- Queue Depth: per-workload admission stats (this worker process) ---
+@router.get("/api/queues")
+async def get_queue_depth():
+    """ Running / queued / rejected counts per workload class, plus the greenwash job queue. """
+    return {"pid": os.getpid(), "workloads": admission.stats(), "greenwash_jobs": await asyncio.to_thread(greenwash_job_queue.stats)}
+
+# --- Model Memory: what this worker has loaded, sizes, last use, load / unload events ---
+@router.get("/api/models")
+async def get_model_report():
+    """ Model registry report for this worker process (models load on demand and unload when idle). """
+    return model_registry.registry.report()
+
+# --- App Factory: the one app behind server.py, main.py and launcher.py ---
+def warm_up(names: list = None):
+    """
+    Loads the listed models (registry names or model ids), or with None / "all" every model
+    plus the Reddit client. Slow; importing this module doesn't.
+    """
+    started = time.time()
+    try:
+        if names is None or "all" in names:
+            ai_core.load_analyzers()
+            greenwash_analyzer.load_models()
+        else:
+            registered = model_registry.registry.pipelines
+            for name in names:
+                matches = [key for key, (_, model) in registered.items() if name in (key, model)]
+                if not matches:
+                    print(f"API Server: Unknown model '{name}' in REPUTEX_WARM_MODELS (known: {', '.join(registered)}).")
+                for key in matches:
+                    model_registry.registry.get(key)
+        print(f"API Server: Models ready after {time.time() - started:.1f}s.")
+    except Exception as e:
+        print(f"API Server: Model warm-up failed ({e}); models will load on first use.")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background threads start here (after any fork), never at import time
+    if os.environ.get("REPUTEX_LEADERBOARD_SCHEDULER", "1") != "0":
+        leaderboard.start()
+    model_registry.registry.start() # Idle unloading in this worker (never in the launcher parent)
+    if WARM_MODELS:
+        # Start listening right away; the first analysis waits for this load instead of starting its own
+        threading.Thread(target=warm_up, args=(WARM_MODELS,), name="model-warm-up", daemon=True).start()
+    yield
+    # Shutdown: uvicorn has stopped accepting and drained in-flight requests; let running jobs finish too
+    print("API Server: Shutting down, draining greenwash jobs...")
+    leaderboard.stop()
+    admission.shutdown()
+    await asyncio.to_thread(greenwash_job_queue.shutdown, SHUTDOWN_DRAIN_SECONDS)
+
+def create_app() -> FastAPI:
+    """ Builds the FastAPI app: dashboard/API routes + main.py's /analyze_company/ route. """
+    import main # Legacy greenwash route (main.py doesn't import server, so no cycle)
+    app = FastAPI(lifespan=lifespan)
+
+    # --- Upload Size Limit (rejects oversized uploads before the body is read) ---
+    app.add_middleware(uploads.UploadSizeLimitMiddleware)
+
+    # --- Response Compression (clients sending Accept-Encoding: gzip) ---
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
+
+    # --- CORS Middleware ---
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=list(dict.fromkeys(origins + main.origins)),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_exception_handler(admission.Overloaded, handle_overloaded)
+    app.include_router(router)
+    app.include_router(main.router)
+    return app
+
+app = create_app() # Keeps "uvicorn server:app" working
+
+# --- Run the server ---
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Preloads models once, then forks REPUTEX_WORKERS workers (see launcher.py)
+    import launcher
+    launcher.main()
 
@@ -0,0 +1,9 @@
+# Shared test setup: the repo's modules live at the root, and every store / cache goes to a temp dir.
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_scratch = tempfile.mkdtemp(prefix="reputex-tests-")
+os.environ.setdefault("REPUTEX_DATA_DIR", os.path.join(_scratch, "data"))
+os.environ.setdefault("REPUTEX_CACHE_DIR", os.path.join(_scratch, "cache"))
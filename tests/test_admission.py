@@ -0,0 +1,28 @@
+# Reserved slots (held while an upload is read) count against a workload's limits.
+import threading
+
+import pytest
+import admission
+
+
+def test_reserved_slots_count_until_used_or_released():
+    workload = admission.WorkloadPool("test", max_workers=1, max_queued=1, typical_seconds=1.0)
+    first = workload.reserve()
+    with workload.reserve():
+        with pytest.raises(admission.Overloaded):
+            workload.reserve() # Two uploads in progress fill 1 worker + 1 queued
+        with pytest.raises(admission.Overloaded):
+            workload.submit(lambda: None)
+    assert workload.stats()["reserved"] == 1
+
+    release = threading.Event()
+    future = first.submit(release.wait, 5)
+    with pytest.raises(RuntimeError):
+        first.submit(lambda: None) # One call per reservation
+    first.release() # No-op after submit
+    stats = workload.stats()
+    assert stats["reserved"] == 0 and stats["running"] + stats["queued"] == 1 and stats["accepted"] == 2
+
+    release.set()
+    assert future.result(timeout=5) is True
+    workload.shutdown()
@@ -0,0 +1,47 @@
+# Vectorized self-assessment scoring must match calculate_sa_score() exactly, row for row.
+import io
+import json
+import random
+from company_checker import SelfAssessmentData, calculate_sa_score, sa_score_rows
+from self_assessment_bulk import score_upload, validate_chunk
+
+SCORE_KEYS = ("base_sa_score", "e_score", "s_score", "g_score")
+
+
+def random_assessment(rng: random.Random, company_name: str = "Parity Check Co") -> SelfAssessmentData:
+    """ Random (valid) answers, biased towards boundary values. """
+    def percent(): return rng.choice([0.0, 100.0, 50.0, 10.0, round(rng.uniform(0, 100), rng.choice([0, 1, 2, 6]))])
+    return SelfAssessmentData(
+        company_name=company_name,
+        ghg_disclosed=rng.random() < 0.5, renewable_percent=percent(), water_target=rng.random() < 0.5,
+        waste_reduction_program=rng.random() < 0.5, biodiversity_policy=rng.random() < 0.5,
+        grievance_mechanism=rng.random() < 0.5, gender_pay_gap=percent(), supplier_audits=rng.random() < 0.5,
+        employee_training_hours=rng.choice([0, 9, 10, 11, rng.randint(0, 200)]), data_privacy_policy=rng.random() < 0.5,
+        board_esg_committee=rng.random() < 0.5, board_female_percent=percent(), anticorruption_training=rng.random() < 0.5,
+        exec_comp_esg_linked=rng.random() < 0.5, independent_board_chair=rng.random() < 0.5
+    )
+
+
+def test_vectorized_scores_match_scalar_scores():
+    rng = random.Random(0)
+    assessments = [random_assessment(rng) for _ in range(2000)]
+    for item, bulk in zip(assessments, sa_score_rows(assessments)):
+        scalar = calculate_sa_score(item)
+        assert {key: scalar[key] for key in SCORE_KEYS} == {key: bulk[key] for key in SCORE_KEYS}, item
+
+
+def test_validate_chunk_keeps_good_rows_and_reports_bad_ones():
+    good = random_assessment(random.Random(1)).model_dump()
+    bad = dict(good, renewable_percent=150)
+    valid, errors = validate_chunk([(1, good), (2, bad), (3, good)])
+    assert [number for number, _ in valid] == [1, 3]
+    assert list(errors) == [2] and errors[2][0]["field"] == "renewable_percent"
+
+
+def test_score_upload_streams_one_line_per_row():
+    rows = [random_assessment(random.Random(seed)).model_dump() for seed in range(3)]
+    rows[1]["gender_pay_gap"] = "not a number"
+    upload = io.BytesIO("\n".join(json.dumps(row) for row in rows).encode("utf-8"))
+    lines = [json.loads(line) for line in score_upload(upload, "jsonl", chunk_rows=2)]
+    assert [line.get("ok") for line in lines[:3]] == [True, False, True]
+    assert lines[-1] == {"summary": {"rows": 3, "scored": 2, "failed": 1}}
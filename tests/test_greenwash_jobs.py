@@ -0,0 +1,64 @@
+# Greenwash jobs are visible from every server worker sharing the job store.
+import time
+
+import pytest
+import greenwash_jobs
+from greenwash_jobs import GreenwashJobQueue
+
+
+def _analysis(company_name, pdf_source, progress=None):
+    progress("extraction", pages_read=3)
+    return {"status": "Success", "company": company_name, "pdf": pdf_source}
+
+
+def _wait_finished(queue, job_id):
+    for _ in range(100):
+        job = queue.get(job_id)
+        if job["status"] in greenwash_jobs.FINISHED_STATES: return job
+        time.sleep(0.05)
+    pytest.fail("job did not finish")
+
+
+def test_job_submitted_on_one_worker_is_served_by_another(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    accepting, other = GreenwashJobQueue(_analysis, path=path), GreenwashJobQueue(_analysis, path=path)
+    cleaned = []
+    job = accepting.submit("Acme", "/tmp/report.pdf", filename="report.pdf", cleanup=cleaned.append)
+    assert other.get(job["job_id"], include_result=False)["company_name"] == "Acme"
+
+    finished = _wait_finished(other, job["job_id"])
+    assert finished["status"] == greenwash_jobs.COMPLETE
+    assert finished["result"] == {"status": "Success", "company": "Acme", "pdf": "/tmp/report.pdf"}
+    assert finished["progress"]["stage"] == "done" and finished["progress"]["pages_read"] == 3
+    assert other.stats()[greenwash_jobs.COMPLETE] == 1 and other.get("unknown") is None
+    for _ in range(40):
+        if cleaned: break
+        time.sleep(0.05)
+    assert cleaned == ["/tmp/report.pdf"]
+
+
+def test_jobs_of_exited_processes_fail_and_free_the_queue(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    queue = GreenwashJobQueue(_analysis, max_queued=1, path=path)
+    conn = queue._connect()
+    with conn:
+        conn.execute("BEGIN")
+        conn.execute(
+            "INSERT INTO greenwash_jobs (job_id, company_name, status, submitted_at, owner) VALUES ('gone', 'Acme', ?, ?, ?)",
+            (greenwash_jobs.QUEUED, time.time(), greenwash_jobs._owner().rpartition(":")[0] + ":999999999")
+        )
+        conn.execute("COMMIT")
+    conn.close()
+
+    assert queue.get("gone")["status"] == greenwash_jobs.FAILED
+    assert queue.get("gone")["error"] == greenwash_jobs.OWNER_GONE_ERROR
+    assert _wait_finished(queue, queue.submit("Acme", "/tmp/x.pdf")["job_id"])["status"] == greenwash_jobs.COMPLETE
+
+
+def test_finished_jobs_expire(tmp_path):
+    queue = GreenwashJobQueue(_analysis, result_ttl=0.2, path=str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("Acme", "/tmp/x.pdf")["job_id"]
+    _wait_finished(queue, job_id)
+    time.sleep(0.3)
+    assert queue.get(job_id) is None
+    assert queue.purge_expired(force=True) == 1
@@ -0,0 +1,31 @@
+import pytest
+
+greenwash_analyzer = pytest.importorskip("greenwash_analyzer")
+
+
+def test_per_topic_search_is_the_default():
+    assert greenwash_analyzer.REDDIT_MODE == "per_topic"
+
+
+@pytest.mark.parametrize("text, topic", [
+    ("Workers went on strike over wage theft", "labor practices"),
+    ("Their carbon\nemissions rose again", "climate change"),
+    ("They face an antitrust probe", "business ethics"),
+    ("A gender pay gap of 12%", "diversity"),
+    ("The app keeps location tracking on", "data privacy"),
+])
+def test_phrases_route_to_their_topic(text, topic):
+    routes = greenwash_analyzer.route_texts_to_topics([text], greenwash_analyzer.ESG_TOPICS, routing="keywords")
+    assert routes[topic] == [0]
+
+
+@pytest.mark.parametrize("text", [
+    "The European Union fined them",
+    "Parcel tracking is broken again",
+    "Gender reveal party photos",
+    "Car safety recall announced",
+    "Strike price for the options",
+])
+def test_generic_words_are_not_topics(text):
+    routes = greenwash_analyzer.route_texts_to_topics([text], greenwash_analyzer.ESG_TOPICS, routing="keywords")
+    assert not any(routes.values()), routes
@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+import pytest
+
+import cancellation
+import job_broker
+import worker
+
+
+@pytest.fixture
+def broker(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_broker, "JOB_FILES_DIR", str(tmp_path / "job_files"))
+    return job_broker.SQLiteBroker(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_window_run_changes_every_period():
+    period = 3600
+    start = 1_700_000_000 - 1_700_000_000 % period
+    assert job_broker.window_run(period, start) == job_broker.window_run(period, start + period - 1)
+    # A company refreshed at any point of a window expires in a later one
+    assert job_broker.window_run(period, start + 10) != job_broker.window_run(period, start + 10 + period)
+
+
+def test_refresh_in_a_new_window_is_a_new_job(broker):
+    first = job_broker.submit_analyses(["Acme"], run=job_broker.window_run(60, 0), target=broker)["Acme"]
+    claimed = broker.claim("w", ["analysis"])[0]
+    broker.finish(claimed["job_id"], "w", job_broker.COMPLETE, {"overall_score": 1})
+    same = job_broker.submit_analyses(["Acme"], run=job_broker.window_run(60, 59), target=broker)["Acme"]
+    later = job_broker.submit_analyses(["Acme"], run=job_broker.window_run(60, 60), target=broker)["Acme"]
+    assert same["job_id"] == first["job_id"] and same["status"] == job_broker.COMPLETE
+    assert later["job_id"] != first["job_id"] and later["status"] == job_broker.QUEUED
+
+
+def test_submit_analyses_purges_once(broker, monkeypatch):
+    calls = []
+    monkeypatch.setattr(broker, "purge_expired", lambda ttl=None: calls.append(ttl) or 0)
+    job_broker.submit_analyses(["A", "B", "C"], target=broker)
+    assert len(calls) == 1
+
+
+def test_greenwash_pdf_goes_to_the_file_store(broker, tmp_path):
+    pdf = tmp_path / "report.pdf"
+    pdf.write_bytes(b"%PDF-1.4 test")
+    job = job_broker.submit_greenwash("Acme", str(pdf), filename="report.pdf", target=broker, move=True)
+    stored = job_broker.job_file_path(job["payload"]["pdf_file"])
+    assert not pdf.exists() and open(stored, "rb").read() == b"%PDF-1.4 test"
+
+    pdf.write_bytes(b"%PDF-1.4 test")
+    again = job_broker.submit_greenwash("Acme", str(pdf), filename="renamed.pdf", target=broker)
+    assert again["job_id"] == job["job_id"] and pdf.exists()
+
+    os.utime(stored, (0, 0))
+    job_broker.purge(broker)
+    assert not os.path.exists(stored)
+    with pytest.raises(job_broker.BrokerError):
+        job_broker.job_file_path("../jobs.sqlite3")
+
+
+def test_analysis_batch_stops_when_every_lease_is_lost(broker, monkeypatch):
+    import ai_core
+    started, seen = threading.Event(), {}
+
+    def slow_analyze(companies, cancel_token=None):
+        seen["token"] = cancel_token
+        started.set()
+        while True:
+            cancellation.check(cancel_token)
+            time.sleep(0.01)
+
+    monkeypatch.setattr(ai_core, "analyze_companies", slow_analyze)
+    job_broker.submit_analyses(["A", "B"], target=broker)
+    node = worker.Worker(broker, ["analysis"], slots=1, batch=2, lease_seconds=0.3, poll_seconds=0.05)
+    jobs = broker.claim(node.name, ["analysis"], limit=2, lease_seconds=0.3)
+    thread = threading.Thread(target=node._run_analysis_batch, args=(node.name, jobs), daemon=True)
+    heartbeat = threading.Thread(target=node._heartbeat_loop, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    for job in jobs: # Another worker takes the jobs over
+        broker.finish(job["job_id"], node.name, job_broker.RELEASE)
+    heartbeat.start()
+    thread.join(5)
+    assert not thread.is_alive() and seen["token"].cancelled
+    assert not node._active and node.processed == 0
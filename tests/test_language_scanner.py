@@ -0,0 +1,42 @@
+from language_scanner import LanguageScanner, SEAM_CHARS, SNIPPETS_PER_TERM, SNIPPET_WIDTH
+
+
+def test_scan_keeps_bounded_context_not_pages():
+    scanner = LanguageScanner(["aim to"], ["reduced"])
+    page = "We aim to cut waste by next year. " * 500
+    scan = scanner.scan_pages((number, page) for number in range(1, 21))
+
+    assert scan.counts == [20 * 500, 0]
+    assert len(scan.occurrences_of("aim to")) == 20 * 500
+    assert len(scan._contexts) == SNIPPETS_PER_TERM
+    assert sum(len(context) for context, _ in scan._contexts.values()) <= SNIPPETS_PER_TERM * (2 * SNIPPET_WIDTH + len("aim to"))
+    assert scan.first_snippets() == [("aim to", 1, "...We aim to cut waste by next year. We ai...")]
+
+
+def test_phrase_split_across_pages_counts_once_on_its_first_page():
+    scanner = LanguageScanner(["carbon neutral", "neutral"], ["tonnes"])
+    scan = scanner.scan_pages([(1, "By 2030 we will be carbon"), (2, "neutral across 40 tonnes of neutral goods."), (3, "")])
+
+    assert scan.term_counts() == {"carbon neutral": 1, "neutral": 1, "tonnes": 1}
+    assert scan.occurrences_of("carbon neutral") == [(1, 19, len("carbon\nneutral"))]
+    assert [stats["weasel_count"] for stats in scan.page_stats] == [1, 1, 0]
+    assert scan.first_snippets(["carbon neutral"]) == [("carbon neutral", 1, "...By 2030 we will be carbon neutral across 40 tonnes of neutral g...")]
+
+
+def test_seam_does_not_recount_matches_on_either_page():
+    scanner = LanguageScanner(["net zero", "zero"], [])
+    scan = scanner.scan_pages([(1, "our target is net zero"), (2, "zero waste")])
+    assert scan.term_counts() == {"net zero": 1, "zero": 1}
+
+    scan = scanner.scan_pages([(1, "our target is net"), (2, "zero waste")])
+    assert scan.term_counts() == {"net zero": 1, "zero": 0}
+
+
+def test_seam_tail_starting_mid_word_keeps_whole_word_matching():
+    scanner = LanguageScanner(["may"], ["cut"])
+    text = "x" * 10 + " to our dismay" + " " * (SEAM_CHARS - 3) # The last SEAM_CHARS start inside "dismay"
+    assert text[len(text) - SEAM_CHARS:].startswith("may ")
+
+    assert scanner.scan_pages([(1, text)]).term_counts() == {"may": 0, "cut": 0}
+    assert scanner.scan_pages([(1, text), (2, "we cut waste")]).term_counts() == {"may": 0, "cut": 1}
+    assert scanner.scan_pages([(1, text.replace("dismay", "dis may"))]).term_counts() == {"may": 1, "cut": 0}
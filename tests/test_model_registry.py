@@ -0,0 +1,44 @@
+# Idle unloading, and models inherited from a preloading parent staying resident.
+import model_registry
+
+
+def _registry():
+    registry = model_registry.ModelRegistry(budget_bytes=0, idle_seconds=10)
+    registry._ensure_reaper = lambda: None # Drive unload_idle() by hand
+    registry.register("a", lambda: object())
+    registry.register("b", lambda: object())
+    return registry
+
+
+def test_idle_models_unload():
+    registry = _registry()
+    registry.get("a")
+    last_used = registry._entries["a"].last_used
+
+    assert registry.unload_idle(now=last_used + 5) == 0
+    assert registry.unload_idle(now=last_used + 10) == 1
+    assert registry.report()["models"]["a"]["loaded"] is False
+
+
+def test_inherited_models_are_not_unloaded():
+    registry = _registry()
+    registry.get("a")
+    registry._after_fork() # As in a launcher worker: "a" was loaded by the parent
+    registry.get("b")
+    now = max(entry.last_used for entry in registry._entries.values()) + 60
+
+    assert registry.unload_idle(now=now) == 1
+    models = registry.report()["models"]
+    assert models["a"]["loaded"] and models["a"]["inherited"]
+    assert not models["b"]["loaded"] and not models["b"]["inherited"]
+
+
+def test_reaper_starts_only_after_start():
+    registry = model_registry.ModelRegistry(budget_bytes=0, idle_seconds=3600)
+    registry.register("a", lambda: object())
+    registry.get("a") # E.g. launcher.py's preload, before forking: no thread may start
+    assert registry._reaper_pid is None
+
+    registry.start() # Server lifespan / worker.py
+    assert registry._reaper_pid == model_registry.os.getpid()
+    registry._wake.set()
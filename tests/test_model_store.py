@@ -0,0 +1,70 @@
+# Memory-mapped loading of a (tiny, locally built) safetensors model through model_store.
+import threading
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+import model_store
+
+MODEL = "tiny/bert-classifier"
+
+
+@pytest.fixture
+def exported(tmp_path):
+    """ A 1-layer BERT classifier saved the way `model_store.py export` saves models. """
+    torch.manual_seed(0)
+    config = transformers.BertConfig(vocab_size=40, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                                     intermediate_size=32, max_position_embeddings=32, num_labels=2)
+    model = transformers.BertForSequenceClassification(config).eval()
+    path = model_store.model_path(MODEL, str(tmp_path))
+    model.save_pretrained(path, safe_serialization=True)
+    vocab = tmp_path / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [f"word{i}" for i in range(35)]))
+    transformers.BertTokenizer(str(vocab)).save_pretrained(path)
+    return model, str(tmp_path)
+
+
+def test_load_model_maps_exported_weights(exported):
+    original, model_dir = exported
+    assert model_store.is_exported(MODEL, model_dir)
+    loaded, tokenizer, info = model_store.load_model("text-classification", MODEL, model_dir)
+
+    assert info["source"] == "mmap" and info["mapped_bytes"] > 0
+    assert not any(tensor.is_meta for tensor in list(loaded.parameters()) + list(loaded.buffers()))
+    expected = original.state_dict()
+    for name, tensor in loaded.state_dict().items():
+        assert torch.equal(tensor, expected[name]), name
+
+    inputs = tokenizer(["word1 word2 word3"], return_tensors="pt")
+    with torch.no_grad():
+        assert torch.allclose(loaded(**inputs).logits, original(**inputs).logits)
+
+
+def test_load_pipeline_uses_local_copy(exported):
+    _, model_dir = exported
+    classifier = model_store.load_pipeline("text-classification", MODEL, model_dir=model_dir)
+    assert classifier.load_info["source"] == "mmap"
+    assert classifier("word1 word4")[0]["label"] in ("LABEL_0", "LABEL_1")
+
+
+def test_missing_export_raises(tmp_path):
+    with pytest.raises(model_store.ModelNotExported):
+        model_store.load_model("text-classification", "not/exported", str(tmp_path))
+
+
+def test_meta_init_only_affects_the_building_thread():
+    built = {}
+
+    def build_elsewhere():
+        built["other"] = torch.nn.Linear(4, 4)
+
+    with model_store._parameters_on_meta():
+        built["here"] = torch.nn.Linear(4, 4)
+        other = threading.Thread(target=build_elsewhere)
+        other.start()
+        other.join()
+    built["after"] = torch.nn.Linear(4, 4)
+
+    assert built["here"].weight.is_meta
+    assert not built["other"].weight.is_meta
+    assert not built["after"].weight.is_meta
@@ -0,0 +1,37 @@
+# Parallel page extraction through the shared (spawned) worker pool.
+import pytest
+
+fitz = pytest.importorskip("fitz")
+import pdf_extraction
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "MAX_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(pdf_extraction, "PARALLEL_MIN_PAGES", 10)
+    monkeypatch.setattr(pdf_extraction, "PAGES_PER_TASK", 4)
+    doc = fitz.open()
+    for number in range(1, 31):
+        doc.new_page().insert_text((72, 72), f"page {number} text")
+    path = tmp_path / "report.pdf"
+    doc.save(str(path))
+    return path
+
+
+def test_parallel_pages_arrive_in_order_from_one_pool(pdf):
+    from_path = list(pdf_extraction.iter_pdf_pages(str(pdf)))
+    pool = pdf_extraction._pool
+    from_bytes = list(pdf_extraction.iter_pdf_pages(pdf.read_bytes(), page_range=(3, 25)))
+
+    assert pool is not None and pool._mp_context.get_start_method() == "spawn"
+    assert [number for number, _ in from_path] == list(range(1, 31))
+    assert all(f"page {number} text" in text for number, text in from_path)
+    assert [number for number, _ in from_bytes] == list(range(3, 26))
+    assert pdf_extraction._pool is pool
+
+
+def test_early_stop_leaves_the_pool_usable(pdf):
+    pages = pdf_extraction.iter_pdf_pages(str(pdf))
+    assert next(pages)[0] == 1
+    pages.close()
+    assert len(list(pdf_extraction.iter_pdf_pages(str(pdf)))) == 30
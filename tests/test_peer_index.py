@@ -0,0 +1,76 @@
+import threading
+
+from peer_index import PeerIndex
+
+
+def _result(total, name="Acme"):
+    return {"company_name": name, "base_sa_score": total, "e_score": total / 3, "s_score": total / 3, "g_score": total / 3}
+
+
+def test_instances_see_each_others_submissions(tmp_path):
+    # Two PeerIndex objects on one database stand in for two launcher workers
+    path = str(tmp_path / "peers.db")
+    worker_a, worker_b = PeerIndex(path), PeerIndex(path)
+    assert worker_b.percentiles(_result(50))["peer_count"] == 0
+
+    worker_a.add(_result(40), "Energy")
+    worker_a.add(_result(60), "Energy")
+    ranked = worker_b.rank_and_add(_result(50), "energy")
+    assert ranked["peer_count"] == 2
+    assert ranked["sector_peer_count"] == 2
+    assert ranked["overall"]["total"] == 50.0
+
+    assert worker_a.percentiles(_result(50))["peer_count"] == 3
+    assert PeerIndex(path).percentiles(_result(50), "Energy")["sector_peer_count"] == 3
+
+
+def test_add_many_matches_single_adds(tmp_path):
+    batch = PeerIndex(str(tmp_path / "batch.db"))
+    single = PeerIndex(str(tmp_path / "single.db"))
+    rows = [(_result(score), "Retail" if score % 2 else None) for score in range(0, 100, 7)]
+    batch.add_many(rows)
+    for result, sector in rows:
+        single.add(result, sector)
+    probe = _result(42)
+    assert batch.percentiles(probe, "Retail") == single.percentiles(probe, "Retail")
+    assert PeerIndex(str(tmp_path / "batch.db")).percentiles(probe, "Retail") == single.percentiles(probe, "Retail")
+
+
+class _WriteBetweenReads:
+    """ Connection proxy: another worker submits right after the bin counts are read. """
+
+    def __init__(self, conn, on_counts_read):
+        self.conn, self.on_counts_read = conn, on_counts_read
+
+    def execute(self, sql, *args):
+        cursor = self.conn.execute(sql, *args)
+        if "FROM bin_counts" in sql: self.on_counts_read()
+        return cursor
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+    def close(self):
+        self.conn.close()
+
+
+def test_submission_between_the_initial_reads_is_not_lost(tmp_path):
+    path = str(tmp_path / "peers.db")
+    PeerIndex(path).add(_result(40))
+    loading, other = PeerIndex(path), PeerIndex(path)
+    other.percentiles(_result(50)) # Schema + trees ready before the race
+    writer = threading.Thread(target=other.add, args=(_result(60),))
+
+    connect = loading._connect
+    def racing_connect():
+        conn = connect()
+        return _WriteBetweenReads(conn, lambda: (writer.start(), writer.join(0.5)))
+    loading._connect = racing_connect
+    loading.percentiles(_result(50))
+    loading._connect = connect
+    writer.join()
+
+    assert loading.percentiles(_result(50))["peer_count"] == 2
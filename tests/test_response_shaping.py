@@ -0,0 +1,48 @@
+# Feed cursors: pages continue from the shared on-disk store, and bad / expired cursors are rejected.
+import pytest
+import response_shaping
+from response_shaping import CursorError, PagedResultCache
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_shaping, "paged_results", PagedResultCache(root=str(tmp_path)))
+    return tmp_path
+
+
+def _result(items: int) -> dict:
+    return {"company_name": "Acme", "modules": [{"name": "news", "feed": [{"title": f"item {i}"} for i in range(items)]}]}
+
+
+def test_cursor_pages_through_feed_from_another_worker(store):
+    first = response_shaping.paginate_feeds(_result(5), 2)
+    module = first["modules"][0]
+    assert [item["title"] for item in module["feed"]] == ["item 0", "item 1"] and module["feed_total"] == 5
+
+    # Another worker: its own cache object on the same directory
+    response_shaping.paged_results = PagedResultCache(root=str(store))
+    page = response_shaping.feed_page_from_cursor(module["next_cursor"])
+    assert [item["title"] for item in page["feed"]] == ["item 2", "item 3"]
+    last = response_shaping.feed_page_from_cursor(page["next_cursor"])
+    assert [item["title"] for item in last["feed"]] == ["item 4"] and last["next_cursor"] is None
+
+
+def test_short_feeds_are_not_stored(store):
+    result = response_shaping.paginate_feeds(_result(2), 5)
+    assert result["modules"][0]["next_cursor"] is None
+    assert not (store / "paged_results").exists()
+
+
+def test_expired_and_invalid_cursors(store):
+    cursor = response_shaping.paginate_feeds(_result(5), 2)["modules"][0]["next_cursor"]
+    response_shaping.paged_results.ttl = 0
+    with pytest.raises(CursorError) as expired:
+        response_shaping.feed_page_from_cursor(cursor)
+    assert expired.value.expired
+
+    with pytest.raises(CursorError) as invalid:
+        response_shaping.feed_page_from_cursor("not-a-cursor")
+    assert not invalid.value.expired
+    with pytest.raises(CursorError) as traversal:
+        response_shaping.feed_page_from_cursor(response_shaping.encode_cursor("../x", 0, 0, 2))
+    assert traversal.value.expired
@@ -0,0 +1,56 @@
+import time
+
+import score_history
+
+
+def _result(name, items):
+    feed = [{"source": "Reuters", "text": f"{name} item {i}", "sentiment": "negative", "sentiment_score": 0.8} for i in range(items)]
+    return {"company_name": name, "overall_score": 60, "scores": {"environmental": 55, "social": 60, "governance": 65},
+            "modules": [{"module_name": "News Feed (Company & Executive)", "feed": feed}]}
+
+
+def _count(history, table):
+    conn = history._connect()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_old_feed_items_are_purged_scores_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(score_history, "FEED_ITEMS_DAYS", 30)
+    history = score_history.ScoreHistory(str(tmp_path / "history.sqlite3"))
+    now = time.time()
+    history.record(_result("Tesla", 4), run_at=now - 40 * score_history.SECONDS_PER_DAY)
+    history.record(_result("Tesla", 3), run_at=now - 60 * score_history.SECONDS_PER_DAY) # Purge is throttled: not yet
+    assert _count(history, "feed_items") == 3
+
+    assert history.purge_feed_items() == 3
+    history.record(_result("Tesla", 2), run_at=now)
+    assert _count(history, "feed_items") == 2
+    assert _count(history, "score_runs") == 3
+
+
+def test_rekey_runs_once_per_company_index_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "history.sqlite3")
+    history = score_history.ScoreHistory(path)
+    history.record(_result("Google", 1))
+    conn = history._connect()
+    with conn:
+        conn.execute("UPDATE score_runs SET company_key = 'google'") # Stored under an older key
+    conn.close()
+
+    score_history.ScoreHistory(path)._connect().close() # Same index version: no history scan
+    assert _keys(history) == ["google"]
+
+    monkeypatch.setattr(score_history.company_entities.index, "version", "changed")
+    score_history.ScoreHistory(path)._connect().close()
+    assert _keys(history) == ["alphabet"]
+
+
+def _keys(history):
+    conn = history._connect()
+    try:
+        return [row[0] for row in conn.execute("SELECT DISTINCT company_key FROM score_runs")]
+    finally:
+        conn.close()
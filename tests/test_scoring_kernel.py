@@ -0,0 +1,80 @@
+# The columnar kernel gives the same scores as the per-item pandas implementation it replaced.
+import random
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+import ai_core
+import scoring_kernel
+
+SENTIMENTS = ["positive", "neutral", "negative"]
+TRUSTS = [0.1, 0.3, 0.6, 0.7, 0.9, 1.0] # Few distinct values: sums land on .5 score boundaries
+TEXTS = ["carbon emissions report", "plant waste spill", "union strike and safety", "board fraud probe", "quarterly results"]
+
+
+def _pandas_scores(items: list) -> dict:
+    """ Scoring steps of the old get_combined_analysis / assign_sub_topic_and_risk / generate_risk_summary. """
+    esg_labels = ai_core.ESG_LABELS
+    df = pd.DataFrame(items)
+    df['sentiment_num'] = df['sentiment'].map({'positive': 1, 'neutral': 0.2, 'negative': -1}).fillna(0)
+    df['weighted_sentiment'] = df['sentiment_num'] * df['trust_score']
+
+    def scaled(frame):
+        total_weight = frame['trust_score'].sum()
+        if frame.empty or total_weight <= 0.01: return 50
+        return round(((frame['weighted_sentiment'].sum() / total_weight + 1) / 2) * 100)
+
+    def find_sub_topic(row):
+        sub_topic_list = ai_core.CATEGORY_SUB_TOPICS.get(row['category'])
+        if not sub_topic_list: return "General Other"
+        for sub_topic in sub_topic_list:
+            if any(keyword in row['text'].lower() for keyword in ai_core.SUB_TOPIC_KEYWORDS.get(sub_topic, [])):
+                return sub_topic
+        return sub_topic_list[0]
+
+    df['sub_topic'] = df.apply(find_sub_topic, axis=1)
+    negative_items = df[df['sentiment_num'] == -1]
+    base_risk_map = (df.groupby('sub_topic')['trust_score'].sum() * 0.2).to_dict()
+    negative_risk_map = (negative_items.groupby('sub_topic')['trust_score'].sum() * 1.0).to_dict()
+    return {
+        "overall_score": scaled(df),
+        "category_scores": {label: scaled(df[df['category'] == label]) for label in esg_labels[:3]},
+        "risk_heatmap": {
+            label: round(base_risk_map.get(label, 0.0) + negative_risk_map.get(label, 0.0), 1)
+            for label in ai_core.HEATMAP_LABELS
+        },
+        "risk_weights": negative_items.groupby('category')['trust_score'].sum().to_dict()
+    }
+
+
+def _feed(rng: random.Random, size: int) -> list:
+    return [{
+        "text": rng.choice(TEXTS),
+        "sentiment": rng.choice(SENTIMENTS),
+        "category": rng.choice(ai_core.ESG_LABELS),
+        "trust_score": rng.choice(TRUSTS)
+    } for _ in range(size)]
+
+
+def test_scores_match_the_pandas_implementation():
+    rng = random.Random(26)
+    companies = [(_feed(rng, rng.randint(1, 40)), _feed(rng, rng.randint(0, 150))) for _ in range(300)]
+    results = ai_core.score_analyzed_feeds(companies)
+
+    for (news_feed, reddit_feed), scored in zip(companies, results):
+        expected = _pandas_scores(news_feed + reddit_feed)
+        assert scored["overall_score"] == expected["overall_score"]
+        assert {label: scored["category_scores"][label] for label in ai_core.ESG_LABELS[:3]} == expected["category_scores"]
+        assert scored["risk_heatmap"] == expected["risk_heatmap"]
+        for risk in scored["risk_inputs"]:
+            assert risk["weight"] == expected["risk_weights"][risk["category"]]
+
+
+def test_overall_score_on_a_rounding_boundary():
+    # Lands on x.5: adding one value after another gives 43, the pandas pairwise sum 42
+    rows = [("neutral", 0.3), ("neutral", 0.3), ("neutral", 0.9), ("negative", 0.3), ("negative", 0.9),
+            ("neutral", 0.3), ("negative", 0.3), ("negative", 0.6), ("negative", 0.3), ("positive", 0.6),
+            ("neutral", 0.3), ("positive", 0.6), ("negative", 0.9), ("positive", 0.3), ("positive", 0.3)]
+    items = [{"text": "", "sentiment": sentiment, "category": ai_core.ESG_LABELS[3], "trust_score": trust} for sentiment, trust in rows]
+    [scored] = ai_core.score_analyzed_feeds([(items, [])])
+    assert scored["overall_score"] == _pandas_scores(items)["overall_score"] == 42
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import uploads
+
+LIMIT = 64 * 1024
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "MAX_UPLOAD_BYTES", LIMIT)
+    monkeypatch.setattr(uploads, "UPLOAD_PATHS", {"/upload"})
+    app = FastAPI()
+    app.add_middleware(uploads.UploadSizeLimitMiddleware)
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            fields, files = await uploads.read_upload_form(request, max_bytes=LIMIT)
+            stored = uploads.uploaded_file(files)
+        except uploads.UploadTooLargeError:
+            return uploads.too_large_response(LIMIT)
+        except uploads.EmptyUploadError:
+            return {"empty": True}
+        except uploads.BadUploadError as e:
+            return {"bad": str(e)}
+        with open(stored.path, "rb") as handle:
+            data = handle.read()
+        uploads.remove_upload(stored.path)
+        return {"company": fields.get("company_name"), "filename": stored.filename, "size": len(data), "head": data[:5].decode()}
+
+    return TestClient(app)
+
+
+def test_file_streams_to_its_own_temp_file(client, tmp_path):
+    response = client.post("/upload", data={"company_name": "Acme"}, files={"file": ("r.pdf", b"%PDF-" + b"x" * 5000, "application/pdf")})
+    assert response.json() == {"company": "Acme", "filename": "r.pdf", "size": 5005, "head": "%PDF-"}
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversized_file_part_is_rejected_and_removed(client, tmp_path):
+    response = client.post("/upload", files={"file": ("r.pdf", b"x" * (LIMIT + 1), "application/pdf")})
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_chunked_body_is_counted(client, tmp_path):
+    def body():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"company_name\"\r\n\r\n"
+        for _ in range(40): # No Content-Length: only the byte counter can stop this
+            yield b"y" * 8192
+        yield b"\r\n--b--\r\n"
+
+    response = client.post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+
+def test_declared_length_over_limit_is_rejected_up_front(client):
+    response = client.post("/upload", content=b"x", headers={"content-type": "multipart/form-data; boundary=b", "content-length": str(10 * LIMIT)})
+    assert response.status_code == 413
+
+
+def test_empty_upload(client, tmp_path):
+    response = client.post("/upload", files={"file": ("r.pdf", b"", "application/pdf")})
+    assert response.json() == {"empty": True}
+    assert os.listdir(tmp_path) == []
+
+
+def test_extra_file_parts_are_rejected_and_removed(client, tmp_path):
+    files = [("file", ("a.pdf", b"%PDF-a", "application/pdf")), ("file", ("b.pdf", b"%PDF-b", "application/pdf"))]
+    response = client.post("/upload", files=files)
+    assert response.json() == {"bad": "Too many files. Maximum number of files is 1."}
+    assert os.listdir(tmp_path) == []
+
+
+def test_malformed_body_is_a_bad_upload(client, tmp_path):
+    response = client.post("/upload", content=b"--b\r\nContent-Disposition: form-data\r\n\r\nx\r\n--b--\r\n",
+                           headers={"content-type": "multipart/form-data; boundary=b"})
+    assert "bad" in response.json()
+    assert os.listdir(tmp_path) == []
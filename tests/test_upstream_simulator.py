@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+import model_registry
+import upstream_simulator
+
+
+@pytest.fixture
+def simulator(monkeypatch):
+    profile = upstream_simulator.build_profile("fast", "*.error_rate=0,*.timeout_rate=0")
+    sim = upstream_simulator.UpstreamSimulator(profile).start()
+    for key, value in sim.server_env().items():
+        monkeypatch.setenv(key, value)
+    yield sim
+    sim.stop()
+
+
+def test_praw_reaches_the_simulated_reddit(simulator):
+    praw = pytest.importorskip("praw")
+    import config
+    reddit = praw.Reddit(client_id="simulated", client_secret="simulated", user_agent="reputex-tests",
+                         read_only=True, **config.reddit_endpoints())
+    posts = list(reddit.subreddit("stocks").search('"Acme"', limit=3))
+    assert len(posts) == 3 and all(post.title for post in posts)
+    assert simulator.stats()["reddit"]["requests"] == 2 # Token + search
+
+
+def test_pipeline_factory_replaces_real_models():
+    registry = model_registry.ModelRegistry(budget_bytes=0, idle_seconds=0)
+    name = registry.register_pipeline("sentiment-analysis", "distilbert-base-uncased-finetuned-sst-2-english")
+    registry.set_pipeline_factory(upstream_simulator.StubPipeline)
+    with registry.using(name) as pipeline:
+        assert isinstance(pipeline, upstream_simulator.StubPipeline)
+        assert pipeline(["fine"])[0]["label"] in ("NEGATIVE", "POSITIVE")
+
+
+def test_reddit_searches_reuse_their_clients(simulator, monkeypatch):
+    pytest.importorskip("praw")
+    import greenwash_analyzer
+    created = []
+    create = greenwash_analyzer.create_reddit_client
+    monkeypatch.setattr(greenwash_analyzer, "create_reddit_client", lambda: created.append(1) or create())
+    monkeypatch.setattr(greenwash_analyzer, "_reddit_checked", False)
+    monkeypatch.setattr(greenwash_analyzer, "_search_pool", None)
+    monkeypatch.setattr(model_registry.registry, "pipeline_factory", upstream_simulator.StubPipeline)
+    pairs = [("Acme", topic) for topic in ("emissions", "water", "labor", "waste", "diversity", "safety")]
+
+    for _ in range(3):
+        sentiments = greenwash_analyzer.get_reddit_sentiments_for_pairs(pairs, mode="per_topic")
+        assert set(sentiments) == set(pairs)
+    # The shared client plus at most one per search thread, however many calls
+    assert len(created) <= 1 + greenwash_analyzer.REDDIT_MAX_WORKERS
+
+
+def test_news_fetch_stops_at_the_deadline_and_is_not_cached(monkeypatch):
+    import ai_core
+    import cancellation
+    profile = upstream_simulator.build_profile("fast", "*.error_rate=0,*.timeout_rate=0,gnews.latency_ms=1500,gnews.jitter=0")
+    sim = upstream_simulator.UpstreamSimulator(profile).start()
+    try:
+        for key, value in sim.server_env().items():
+            monkeypatch.setenv(key, value)
+        token = cancellation.CancellationToken(timeout=0.2)
+        started = time.monotonic()
+        with pytest.raises(cancellation.OperationCancelled):
+            ai_core.get_news("Deadline Corp", _cancel_token=token)
+        assert time.monotonic() - started < 1.0 # Not the fixed 15 s timeout, nor the 1.5 s response
+        assert ai_core.get_news("Deadline Corp") # Fetched again: the cut-short call cached nothing
+    finally:
+        sim.stop()
@@ -0,0 +1,279 @@
+# This is a new file: uploads.py
+# Size-capped PDF upload handling: multipart bodies are parsed as they stream in (python-multipart's
+# parser, driven directly) and each file part is written once, straight to its own temp file on
+# disk (no Starlette spool file to copy from, never one big bytes object); PyMuPDF opens them from that path.
+
+import asyncio
+import os
+import tempfile
+from typing import NamedTuple
+from fastapi.responses import JSONResponse
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import FormData
+
+# --- CONFIGURATION: Upload Limits ---
+MAX_UPLOAD_BYTES = int(float(os.environ.get("REPUTEX_MAX_UPLOAD_MB", "50")) * 1024 * 1024)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Form fields + boundaries allowed on top of the file
+MAX_FORM_FIELDS = 100
+UPLOAD_DIR = os.environ.get("REPUTEX_UPLOAD_DIR") or None # None = system temp dir
+
+# Routes whose request bodies are PDF uploads (checked by the size-limit middleware)
+UPLOAD_PATHS = set()
+# Routes that accept several files per request: path -> max files (body limit scales with it)
+MULTI_UPLOAD_PATHS = {}
+
+
+class UploadTooLargeError(Exception):
+    """ Raised when an upload exceeds MAX_UPLOAD_BYTES. """
+
+
+class EmptyUploadError(Exception):
+    """ Raised when an upload contains no data. """
+
+
+class BadUploadError(Exception):
+    """ Raised when a request body is not a usable multipart form (or has too many files). """
+
+
+class StoredUpload(NamedTuple):
+    """ One file part of a form read by read_upload_form(), already on disk. """
+    field: str
+    filename: str
+    content_type: str
+    path: str
+    size: int
+
+
+def too_large_response(max_bytes: int = MAX_UPLOAD_BYTES) -> JSONResponse:
+    return JSONResponse(
+        status_code=413,
+        content={"status": "Error", "report": f"Uploaded file is too large (limit {max_bytes // (1024 * 1024)} MB)."}
+    )
+
+
+def _body_limit(path: str):
+    """ Max request body bytes for an upload route, or None for other routes. """
+    if path in MULTI_UPLOAD_PATHS:
+        return (MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES) * MULTI_UPLOAD_PATHS[path]
+    if path in UPLOAD_PATHS:
+        return MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    return None
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware for the upload routes: rejects a Content-Length over the limit before the
+    body is read, and counts the bytes actually received (chunked uploads have no Content-Length),
+    answering 413 as soon as the count passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = _body_limit(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            print(f"Uploads: Rejected {scope['path']} upload of {int(content_length)} bytes (too large).")
+            return await too_large_response()(scope, receive, send)
+
+        received = 0
+        response_started = False
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLargeError(f"Request body passed {limit} bytes.")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start": response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, tracking_send)
+        except UploadTooLargeError as e:
+            if response_started: raise
+            print(f"Uploads: Rejected {scope['path']} upload: {e}")
+            await too_large_response()(scope, receive, send)
+
+
+class _FormPart:
+    """ The part being parsed: its headers, then either field bytes or an open temp file. """
+
+    def __init__(self):
+        self.headers = {}
+        self.name = None
+        self.filename = None
+        self.data = bytearray()
+        self.handle = None
+        self.size = 0
+
+
+class _DiskFormParser:
+    """
+    Callbacks for python-multipart's MultipartParser: text fields are kept in memory (each
+    capped at MULTIPART_OVERHEAD_BYTES), each file part goes to its own temp file in UPLOAD_DIR,
+    and a file part over max_bytes stops the parse.
+    """
+
+    def __init__(self, charset: str, *, max_files: int, max_bytes: int, suffix: str = None):
+        self.charset = charset
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.fields = []
+        self.files = [] # StoredUpload, in request order
+        self.paths = [] # Every temp file created (removed by the caller on error)
+        self.handles = []
+        self.pending = [] # (handle, bytes) to write once the current chunk is parsed
+        self._part = _FormPart()
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin, "on_part_data": self.on_part_data, "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field, "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end, "on_headers_finished": self.on_headers_finished
+        }
+
+    def _decode(self, value: bytes) -> str:
+        try:
+            return value.decode(self.charset)
+        except (UnicodeDecodeError, LookupError):
+            return value.decode("latin-1")
+
+    def on_part_begin(self) -> None:
+        self._part = _FormPart()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._part.headers[self._header_name.lower()] = self._header_value
+        self._header_name, self._header_value = b"", b""
+
+    def on_headers_finished(self) -> None:
+        part = self._part
+        _, options = parse_options_header(part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise BadUploadError('The Content-Disposition header field "name" must be provided.')
+        part.name = self._decode(options[b"name"])
+        if b"filename" not in options:
+            if len(self.fields) >= MAX_FORM_FIELDS:
+                raise BadUploadError(f"Too many fields. Maximum number of fields is {MAX_FORM_FIELDS}.")
+            return
+        if len(self.files) >= self.max_files:
+            raise BadUploadError(f"Too many files. Maximum number of files is {self.max_files}.")
+        part.filename = self._decode(options[b"filename"])
+        suffix = self.suffix if self.suffix is not None else os.path.splitext(part.filename)[1][:16]
+        fd, path = tempfile.mkstemp(prefix="reputex-upload-", suffix=suffix, dir=UPLOAD_DIR)
+        self.paths.append(path)
+        part.handle = os.fdopen(fd, "wb")
+        self.handles.append(part.handle)
+        self.files.append(None) # Keeps request order; filled in on_part_end
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._part
+        if part.handle is None:
+            if len(part.data) + (end - start) > MULTIPART_OVERHEAD_BYTES:
+                raise BadUploadError(f"Part exceeded maximum size of {MULTIPART_OVERHEAD_BYTES // 1024}KB.")
+            part.data.extend(data[start:end])
+            return
+        part.size += end - start
+        if part.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit.")
+        self.pending.append((part.handle, data[start:end]))
+
+    def on_part_end(self) -> None:
+        part = self._part
+        if part.handle is None:
+            self.fields.append((part.name, self._decode(bytes(part.data))))
+            return
+        content_type = self._decode(part.headers.get(b"content-type", b"")) or None
+        self.files[-1] = StoredUpload(part.name, part.filename, content_type, self.paths[-1], part.size)
+
+    def write_pending(self) -> None:
+        """ Writes the file data parsed from the last chunk; run off the event loop. """
+        for handle, data in self.pending:
+            handle.write(data)
+        self.pending.clear()
+
+    def close(self) -> None:
+        for handle in self.handles: handle.close()
+
+
+async def read_upload_form(request, max_bytes: int = MAX_UPLOAD_BYTES, max_files: int = 1, suffix: str = ".pdf"):
+    """
+    Reads a multipart upload request. Returns (fields, files): fields is a FormData of the text
+    fields, files a list of StoredUpload (in request order; size 0 = empty upload) whose temp
+    files (.pdf unless `suffix` says otherwise; None = the upload's own extension) the caller
+    owns and must pass to remove_upload() when done.
+    Raises UploadTooLargeError / BadUploadError (nothing is left on disk).
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return await request.form(max_files=0), [] # Fields only (e.g. a pdf_url)
+    if not content_type.startswith("multipart/form-data"):
+        raise BadUploadError("Expected a multipart/form-data upload.")
+    _, params = parse_options_header(content_type)
+    if b"boundary" not in params:
+        raise BadUploadError("Missing boundary in multipart.")
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+
+    form = _DiskFormParser(charset, max_files=max_files, max_bytes=max_bytes, suffix=suffix)
+    try:
+        try:
+            parser = MultipartParser(params[b"boundary"], form.callbacks())
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if form.pending: await asyncio.to_thread(form.write_pending)
+            parser.finalize()
+            form.write_pending()
+        finally:
+            form.close()
+        if None in form.files: raise BadUploadError("Incomplete multipart body.")
+    except BaseException as e:
+        for path in form.paths: remove_upload(path)
+        if isinstance(e, FormParserError): raise BadUploadError("Invalid multipart data.") from e
+        raise
+    for stored in form.files:
+        print(f"Uploads: Stored {stored.filename} ({stored.size} bytes) at {stored.path}")
+    return FormData(form.fields), form.files
+
+
+def uploaded_file(files: list, field: str = "file") -> StoredUpload:
+    """
+    The single upload sent as `field` (None if there is none); other file parts are removed.
+    Raises EmptyUploadError (removing the file) if it has no data.
+    """
+    upload = None
+    for stored in files:
+        if stored.field == field and upload is None: upload = stored
+        else: remove_upload(stored.path)
+    if upload is not None and upload.size == 0:
+        remove_upload(upload.path)
+        raise EmptyUploadError("Uploaded file is empty.")
+    return upload
+
+
+def remove_upload(path: str) -> None:
+    """ Deletes a temp upload; safe to call more than once. """
+    if not path: return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Uploads: Could not remove temp file {path}: {e}")
@@ -0,0 +1,269 @@
+# This is a new file: upstream_simulator.py
+# Local stand-in for every upstream API (GNews, Mediastack, Newsdata.io, Knowledge Graph, Reddit)
+# with configurable latency / error profiles, plus stub model pipelines (installed by load_test.py
+# through model_registry.set_pipeline_factory).
+# load_test.py runs the API against it; it can also run on its own for manual testing:
+#   python upstream_simulator.py --port 8900 --profile realistic   (prints the env vars to point the server at it)
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# --- CONFIGURATION: Latency & Error Profiles ---
+# provider -> latency_ms (median), jitter (log-normal sigma), error_rate, error_status, timeout_rate
+PROVIDERS = ["gnews", "mediastack", "newsdata", "knowledge_graph", "reddit"]
+DEFAULT_PROVIDER_PROFILE = {"latency_ms": 50, "jitter": 0.3, "error_rate": 0.0, "error_status": 500, "timeout_rate": 0.0}
+PROFILES = {
+    "fast": {provider: {"latency_ms": 5, "jitter": 0.1} for provider in PROVIDERS},
+    "realistic": {
+        "gnews": {"latency_ms": 300, "jitter": 0.4, "error_rate": 0.01},
+        "mediastack": {"latency_ms": 450, "jitter": 0.5, "error_rate": 0.01},
+        "newsdata": {"latency_ms": 350, "jitter": 0.4, "error_rate": 0.01},
+        "knowledge_graph": {"latency_ms": 150, "jitter": 0.3},
+        "reddit": {"latency_ms": 400, "jitter": 0.5, "error_rate": 0.01},
+    },
+    "degraded": {
+        "gnews": {"latency_ms": 900, "jitter": 0.6, "error_rate": 0.05, "error_status": 429, "timeout_rate": 0.01},
+        "mediastack": {"latency_ms": 1400, "jitter": 0.6, "error_rate": 0.08, "timeout_rate": 0.02},
+        "newsdata": {"latency_ms": 1000, "jitter": 0.6, "error_rate": 0.05, "error_status": 429},
+        "knowledge_graph": {"latency_ms": 400, "jitter": 0.5, "error_rate": 0.02},
+        "reddit": {"latency_ms": 1200, "jitter": 0.7, "error_rate": 0.05, "error_status": 503, "timeout_rate": 0.02},
+    },
+}
+TIMEOUT_SECONDS = 20 # A "timeout" holds the request longer than any client timeout in ai_core (15s)
+STUB_MODEL_SECONDS = float(os.environ.get("REPUTEX_STUB_MODEL_MS", "2")) / 1000 # Per item, per stub pipeline call
+# Path prefix -> provider (the env var values printed by server_env() use these). Reddit's OAuth API
+# sits at the root ("/r/<sub>/search"): prawcore resolves API paths against oauth_url with urljoin,
+# which drops any path in it, so REPUTEX_REDDIT_OAUTH_URL is the bare simulator URL.
+ROUTES = {"/gnews": "gnews", "/mediastack": "mediastack", "/newsdata": "newsdata", "/kg": "knowledge_graph",
+          "/reddit": "reddit", "/r": "reddit"}
+
+HEADLINES = [
+    "{name} faces lawsuit over factory emissions", "{name} announces new renewable energy target",
+    "{name} accused of labor violations at supplier plants", "{name} board adds independent directors",
+    "{name} reports record quarterly profit", "{name} fined by regulator over data privacy breach",
+    "{name} expands diversity and inclusion programme", "{name} CEO responds to governance concerns",
+    "{name} cuts plastic waste across operations", "{name} recalls products after safety complaints",
+]
+NOISE_HEADLINES = ["Markets close mixed ahead of rate decision", "Weather service issues heat warning", "Local team wins derby match"]
+SOURCES = ["Reuters", "Bloomberg", "Financial Times", "Sim Daily", "Example Business Wire"]
+
+
+def build_profile(name: str = "realistic", overrides: str = None) -> dict:
+    """
+    provider -> settings for a preset, with "provider.key=value" overrides
+    ("*.error_rate=0.1,gnews.latency_ms=800").
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}' (choose from {', '.join(PROFILES)})")
+    profile = {provider: dict(DEFAULT_PROVIDER_PROFILE, **PROFILES[name].get(provider, {})) for provider in PROVIDERS}
+    for item in filter(None, (part.strip() for part in (overrides or "").split(","))):
+        target, _, value = item.partition("=")
+        provider, _, key = target.partition(".")
+        if key not in DEFAULT_PROVIDER_PROFILE or (provider != "*" and provider not in profile):
+            raise ValueError(f"Invalid profile override '{item}'")
+        for selected in (PROVIDERS if provider == "*" else [provider]):
+            profile[selected][key] = int(value) if key == "error_status" else float(value)
+    return profile
+
+
+def _quoted_terms(query: str) -> list:
+    terms = re.findall(r'"([^"]+)"', query or "")
+    return terms or [query or "Company"]
+
+
+def _rng(*parts) -> random.Random:
+    """ Deterministic per query (same query -> same articles), like a real search index. """
+    seed = hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+# --- Upstream Simulator ---
+class UpstreamSimulator:
+    """ Threaded HTTP server answering every upstream API. start() / stop(); stats() counts calls. """
+
+    def __init__(self, profile: dict = None, host: str = "127.0.0.1", port: int = 0, noise_rate: float = 0.1):
+        self.profile = profile or build_profile()
+        self.noise_rate = noise_rate
+        self._lock = threading.Lock()
+        self._counts = {provider: {"requests": 0, "errors": 0, "timeouts": 0} for provider in PROVIDERS}
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def do_GET(self): simulator._handle(self)
+            def do_POST(self): simulator._handle(self)
+            def log_message(self, *args): pass # Keep load-test output readable
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def server_env(self) -> dict:
+        """ Environment for a server process that should call this simulator (fake keys included). """
+        return {
+            "REPUTEX_GNEWS_URL": self.base_url + "/gnews", "REPUTEX_MEDIASTACK_URL": self.base_url + "/mediastack",
+            "REPUTEX_NEWSDATA_URL": self.base_url + "/newsdata", "REPUTEX_KNOWLEDGE_GRAPH_URL": self.base_url + "/kg",
+            "REPUTEX_REDDIT_URL": self.base_url + "/reddit", "REPUTEX_REDDIT_OAUTH_URL": self.base_url,
+            "GNEWS_API_KEY": "simulated", "MEDIASTACK_API_KEY": "simulated", "NEWSDATA_API_KEY": "simulated",
+            "GOOGLE_KG_API_KEY": "simulated", "REDDIT_CLIENT_ID": "simulated", "REDDIT_CLIENT_SECRET": "simulated",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="upstream-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {provider: dict(counts) for provider, counts in self._counts.items()}
+
+    # --- Request Handling ---
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        if url.path == "/__stats":
+            return self._send(handler, 200, self.stats())
+        prefix = next((prefix for prefix in ROUTES if url.path == prefix or url.path.startswith(prefix + "/")), None)
+        if prefix is None:
+            return self._send(handler, 404, {"error": f"No simulated upstream at {url.path}"})
+        provider = ROUTES[prefix]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if handler.command == "POST":
+            length = int(handler.headers.get("Content-Length") or 0)
+            params.update({key: values[-1] for key, values in parse_qs(handler.rfile.read(length).decode("latin-1")).items()})
+
+        settings = self.profile[provider]
+        roll = random.random()
+        with self._lock:
+            self._counts[provider]["requests"] += 1
+            if roll < settings["timeout_rate"]: self._counts[provider]["timeouts"] += 1
+            elif roll < settings["timeout_rate"] + settings["error_rate"]: self._counts[provider]["errors"] += 1
+        if roll < settings["timeout_rate"]:
+            time.sleep(TIMEOUT_SECONDS)
+            return self._send(handler, 504, {"error": "simulated timeout"})
+        time.sleep(random.lognormvariate(0, settings["jitter"]) * settings["latency_ms"] / 1000)
+        if roll < settings["timeout_rate"] + settings["error_rate"]:
+            return self._send(handler, settings["error_status"], {"error": "simulated upstream error"})
+        return self._send(handler, 200, self._respond(provider, url.path, params))
+
+    def _send(self, handler, status: int, body: dict):
+        payload = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _articles(self, provider: str, query: str, count: int) -> list:
+        terms = _quoted_terms(query)
+        rng = _rng(provider, query)
+        articles = []
+        for index in range(count):
+            if rng.random() < self.noise_rate:
+                title = rng.choice(NOISE_HEADLINES)
+            else:
+                title = rng.choice(HEADLINES).format(name=" and ".join(terms[:2]) if " AND " in query else rng.choice(terms))
+            articles.append({
+                "title": title, "description": f"{title}. Simulated article {index + 1}.",
+                "url": f"https://simulated.example/{provider}/{rng.getrandbits(48):x}", "source": rng.choice(SOURCES)
+            })
+        return articles
+
+    def _respond(self, provider: str, path: str, params: dict) -> dict:
+        if provider == "gnews":
+            articles = self._articles(provider, params.get("q"), int(params.get("max", 10)))
+            return {"totalArticles": len(articles), "articles": [dict(article, source={"name": article["source"]}) for article in articles]}
+        if provider == "mediastack":
+            return {"data": self._articles(provider, params.get("keywords"), int(params.get("limit", 25)))}
+        if provider == "newsdata":
+            articles = self._articles(provider, params.get("q"), 10)
+            return {"results": [{"title": a["title"], "description": a["description"], "link": a["url"], "source_id": a["source"].lower().replace(" ", "")} for a in articles]}
+        if provider == "knowledge_graph":
+            name = re.sub(r"\s+company$", "", params.get("query", ""))
+            return {"itemListElement": [{"result": {"name": name, "detailedDescription": {
+                "ceo": {"name": f"{name} Chief Executive"}, "founder": {"name": f"{name} Founder"}}}}]}
+        # Reddit: OAuth token, then /r/<sub>/search listings
+        if path.endswith("/access_token"):
+            return {"access_token": "simulated", "token_type": "bearer", "expires_in": 86400, "scope": "*"}
+        subreddit = (re.search(r"/r/([^/]+)/", path) or [None, "all"])[1]
+        posts = self._articles(f"reddit/{subreddit}", params.get("q"), int(params.get("limit", 25)))
+        children = []
+        for post in posts:
+            post_id = hashlib.sha256(post["url"].encode("utf-8")).hexdigest()[:7]
+            children.append({"kind": "t3", "data": {
+                "id": post_id, "name": f"t3_{post_id}", "title": post["title"], "selftext": post["description"],
+                "permalink": f"/r/{subreddit}/comments/{post_id}/simulated/", "subreddit": subreddit,
+                "author": "simulated_user", "score": 10, "num_comments": 0, "created_utc": time.time(), "url": post["url"]
+            }})
+        return {"kind": "Listing", "data": {"after": None, "dist": len(children), "children": children}}
+
+
+# --- Stub Models (model_registry.registry.set_pipeline_factory(StubPipeline)) ---
+class StubPipeline:
+    """
+    Same call shapes / outputs as the transformers pipelines ai_core and greenwash_analyzer use,
+    with a fixed per-item cost instead of a real model. Deterministic per text.
+    """
+
+    def __init__(self, task: str, model: str):
+        self.task = task
+        self.model_name = model
+        self.labels = ["NEGATIVE", "POSITIVE"] if "sst-2" in model else ["negative", "neutral", "positive"]
+
+    def __call__(self, inputs, *args, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        time.sleep(STUB_MODEL_SECONDS * len(texts))
+        if self.task == "zero-shot-classification":
+            candidate_labels = kwargs.get("candidate_labels") or (args[0] if args else [])
+            results = [self._classify(text, candidate_labels, kwargs.get("multi_label", False)) for text in texts]
+            return results[0] if isinstance(inputs, str) else results
+        return [self._sentiment(text) for text in texts] # Text-classification returns a list even for one string
+
+    def _sentiment(self, text: str) -> dict:
+        rng = _rng(self.model_name, text)
+        return {"label": rng.choice(self.labels), "score": round(rng.uniform(0.5, 1.0), 4)}
+
+    def _classify(self, text: str, candidate_labels: list, multi_label: bool) -> dict:
+        rng = _rng(self.model_name, text)
+        raw = [rng.random() for _ in candidate_labels]
+        scores = raw if multi_label else [value / (sum(raw) or 1) for value in raw]
+        ranked = sorted(zip(candidate_labels, scores), key=lambda pair: pair[1], reverse=True)
+        return {"sequence": text, "labels": [label for label, _ in ranked], "scores": [round(score, 4) for _, score in ranked]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulated upstream APIs.")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--profile", default="realistic", choices=sorted(PROFILES))
+    parser.add_argument("--set", dest="overrides", help='Profile overrides, e.g. "*.error_rate=0.1,gnews.latency_ms=800"')
+    args = parser.parse_args(argv)
+
+    simulator = UpstreamSimulator(build_profile(args.profile, args.overrides), port=args.port).start()
+    print(f"Upstream Simulator: Listening on {simulator.base_url} (profile '{args.profile}'). Point the server at it with:")
+    for key, value in simulator.server_env().items():
+        print(f"  export {key}={value}")
+    print("Then run the server with `python load_test.py --serve-stubbed [launcher.py options]` for fake models.")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
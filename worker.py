@@ -0,0 +1,283 @@
+# This is a new file: worker.py
+# Worker process for the job broker (job_broker.py): claims analysis / greenwash jobs, runs them and
+# acks the results. Start as many as the hosts allow, on as many nodes as share the broker -
+# throughput scales with workers, nothing in the API changes.
+# Usage: REPUTEX_BROKER_URL=redis://broker:6379/0 python worker.py --slots 2
+#        python worker.py --kinds analysis --batch 5      (dashboard analyses only, 5 companies per model batch)
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import cancellation # A lost lease stops the run
+import job_broker
+import model_registry # On-demand models, idle unload
+
+# --- CONFIGURATION: Worker ---
+DEFAULT_SLOTS = int(os.environ.get("REPUTEX_WORKER_SLOTS", "1")) # Jobs (or analysis batches) run at the same time
+DEFAULT_BATCH = int(os.environ.get("REPUTEX_WORKER_BATCH", "3")) # Analysis jobs claimed together (shared model batches)
+POLL_SECONDS = float(os.environ.get("REPUTEX_WORKER_POLL", "2")) # Idle wait between claims
+GRACEFUL_TIMEOUT = float(os.environ.get("REPUTEX_GRACEFUL_TIMEOUT", "30")) # Running jobs get this long on SIGTERM, then are released
+MAX_PDF_BYTES = int(float(os.environ.get("REPUTEX_MAX_UPLOAD_MB", "50")) * 1024 * 1024) # Same cap as uploads
+PDF_DOWNLOAD_TIMEOUT = 60
+HEARTBEAT_FRACTION = 3 # Leases are renewed every lease / 3 seconds
+
+
+class Worker:
+    """
+    `slots` loops that each claim work from the broker: up to `batch` analysis jobs at a time
+    (run through ai_core.analyze_companies' shared model batches) or one greenwash job.
+    One heartbeat thread keeps every running job's lease alive.
+    """
+
+    def __init__(self, broker, kinds=job_broker.JOB_KINDS, slots: int = DEFAULT_SLOTS, batch: int = DEFAULT_BATCH,
+                 lease_seconds: float = job_broker.LEASE_SECONDS, poll_seconds: float = POLL_SECONDS):
+        self.broker = broker
+        self.kinds = [kind for kind in job_broker.JOB_KINDS if kind in kinds]
+        self.slots = max(1, slots)
+        self.batch = max(1, batch)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._active = {} # job_id -> {"worker", "token", "progress", "batch" (analysis batches' shared token)}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._stop_requested = threading.Event()
+        self._threads = []
+        self.processed = 0
+
+    # --- Lifecycle ---
+    def start(self):
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        for slot in range(self.slots):
+            thread = threading.Thread(target=self._slot_loop, args=(f"{self.name}/{slot}",), name=f"job-slot-{slot}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"Worker: {self.name} consuming {', '.join(self.kinds)} from the {self.broker.backend} broker ({self.slots} slots).")
+
+    def stop(self, timeout: float = GRACEFUL_TIMEOUT) -> bool:
+        """
+        Stops claiming, waits up to `timeout` seconds for running jobs, then releases the rest
+        back to the queue (not counted as an attempt). Returns True if nothing had to be released.
+        """
+        self._stopping.set()
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+        with self._lock:
+            leftover = dict(self._active)
+            self._active.clear()
+        for job_id, active in leftover.items():
+            active["token"].cancel("worker shutting down")
+            if active["batch"] is not None: active["batch"].cancel("worker shutting down")
+            self.broker.finish(job_id, active["worker"], job_broker.RELEASE)
+            print(f"Worker: Released job {job_id} (still running at shutdown).")
+        return not leftover
+
+    def request_stop(self):
+        """ Signal-handler safe: run_forever() then stops the worker. """
+        self._stop_requested.set()
+
+    def run_forever(self, graceful_timeout: float = GRACEFUL_TIMEOUT) -> bool:
+        self.start()
+        while not self._stop_requested.wait(1.0):
+            pass
+        return self.stop(graceful_timeout)
+
+    # --- Claiming ---
+    def _slot_loop(self, worker: str):
+        while not self._stopping.is_set():
+            try:
+                jobs = self._claim(worker)
+            except Exception as e:
+                print(f"Worker: Could not reach the broker: {e}")
+                jobs = []
+            if not jobs:
+                self._stopping.wait(self.poll_seconds)
+                continue
+            if jobs[0]["kind"] == "analysis":
+                self._run_analysis_batch(worker, jobs)
+            else:
+                self._run_greenwash(worker, jobs[0])
+
+    def _claim(self, worker: str) -> list:
+        """ Analysis jobs first (a batch of them), then one greenwash job. """
+        for kind in self.kinds:
+            jobs = self.broker.claim(worker, [kind], limit=self.batch if kind == "analysis" else 1, lease_seconds=self.lease_seconds)
+            if jobs: return jobs
+        return []
+
+    def _track(self, worker: str, job: dict, batch: cancellation.CancellationToken = None) -> cancellation.CancellationToken:
+        token = cancellation.CancellationToken()
+        with self._lock:
+            self._active[job["job_id"]] = {"worker": worker, "token": token, "progress": None, "batch": batch}
+        return token
+
+    def _finish(self, worker: str, job: dict, outcome: str, result=None, error: str = None):
+        with self._lock:
+            self._active.pop(job["job_id"], None)
+        status = self.broker.finish(job["job_id"], worker, outcome, result, error)
+        if status is None:
+            print(f"Worker: Job {job['job_id']} was taken over by another worker (lease lost); result dropped.")
+            return
+        self.processed += 1
+        print(f"Worker: Job {job['job_id']} ({job['kind']}, {job['payload'].get('company')}) -> {status}"
+              + (f" (attempt {job['attempts']}/{job['max_attempts']}: {error})" if error else ""))
+
+    # --- Heartbeats ---
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.lease_seconds / HEARTBEAT_FRACTION)
+            with self._lock:
+                active = dict(self._active)
+            for job_id, entry in active.items():
+                try:
+                    held = self.broker.heartbeat(job_id, entry["worker"], self.lease_seconds, entry["progress"])
+                except Exception as e:
+                    print(f"Worker: Heartbeat for job {job_id} failed: {e}")
+                    continue
+                if not held:
+                    print(f"Worker: Lost the lease on job {job_id}; stopping it.")
+                    entry["token"].cancel("lease lost")
+                    self._cancel_batch_if_lost(entry["batch"])
+
+    def _cancel_batch_if_lost(self, batch: cancellation.CancellationToken):
+        """ An analysis batch runs as one call: it stops once every job in it has lost its lease. """
+        if batch is None: return
+        with self._lock:
+            members = [entry for entry in self._active.values() if entry["batch"] is batch]
+        if all(entry["token"].cancelled for entry in members):
+            batch.cancel("lease lost")
+
+    # --- Handlers ---
+    def _run_analysis_batch(self, worker: str, jobs: list):
+        """
+        Several companies through one ai_core.analyze_companies call (shared fetch pool + model batches).
+        Jobs whose lease is lost are not acked; the call stops when all of them are lost.
+        """
+        import ai_core
+        batch = cancellation.CancellationToken()
+        tokens = [self._track(worker, job, batch) for job in jobs]
+        companies = [job["payload"]["company"] for job in jobs]
+        try:
+            results = ai_core.analyze_companies(companies, cancel_token=batch)
+        except cancellation.OperationCancelled as e:
+            with self._lock: # Every lease lost, or shutting down (released in stop())
+                for job in jobs: self._active.pop(job["job_id"], None)
+            print(f"Worker: Analysis batch of {len(jobs)} jobs stopped ({e}).")
+            return
+        except Exception as e:
+            results = {company: e for company in companies}
+        for job, company, token in zip(jobs, companies, tokens):
+            if token.cancelled: # Another worker owns it now
+                with self._lock: self._active.pop(job["job_id"], None)
+                continue
+            result = results.get(company)
+            if isinstance(result, dict):
+                self._finish(worker, job, job_broker.COMPLETE, result)
+            else:
+                self._finish(worker, job, job_broker.RETRY, error=str(result) if result is not None else "No result")
+
+    def _run_greenwash(self, worker: str, job: dict):
+        import greenwash_analyzer
+        token = self._track(worker, job)
+        payload = job["payload"]
+        pdf_path, temporary = None, False
+
+        def report_progress(stage, **details):
+            with self._lock:
+                if job["job_id"] in self._active:
+                    self._active[job["job_id"]]["progress"] = dict(details, stage=stage)
+
+        try:
+            pdf_path, temporary = self._fetch_pdf(job)
+            report = greenwash_analyzer.run_full_analysis(
+                payload["company"], pdf_path, page_range=tuple(payload["page_range"]) if payload.get("page_range") else None,
+                max_pages=payload.get("max_pages"), progress=report_progress, cancel_token=token
+            )
+            if report.get("status") == "Error":
+                # Bad input (unreadable PDF, no text): retrying elsewhere won't help
+                self._finish(worker, job, job_broker.FAILED, report, error=report.get("report"))
+            else:
+                self._finish(worker, job, job_broker.COMPLETE, report)
+        except cancellation.OperationCancelled as e:
+            with self._lock: # Lease lost or shutting down: the job belongs to someone else / is released in stop()
+                self._active.pop(job["job_id"], None)
+            print(f"Worker: Job {job['job_id']} stopped ({e}).")
+        except Exception as e:
+            print(f"Worker: Job {job['job_id']} crashed: {e}")
+            self._finish(worker, job, job_broker.RETRY, error=str(e))
+        finally:
+            if temporary:
+                try: os.remove(pdf_path)
+                except OSError: pass
+
+    def _fetch_pdf(self, job: dict):
+        """
+        (path, temporary) of the job's PDF: the shared job file store's copy (read in place),
+        or payload["pdf_url"] downloaded to a temp file.
+        """
+        payload = job["payload"]
+        if payload.get("pdf_file"):
+            path = job_broker.job_file_path(payload["pdf_file"])
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"The job's PDF {payload['pdf_file']} is missing from {job_broker.JOB_FILES_DIR} (shared job file store).")
+            return path, False
+        url = payload.get("pdf_url")
+        if not url:
+            raise ValueError("The job has no PDF file or URL.")
+        fd, path = tempfile.mkstemp(prefix="reputex_job_", suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                import requests
+                size = 0
+                with requests.get(url, stream=True, timeout=PDF_DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(1024 * 1024):
+                        size += len(chunk)
+                        if size > MAX_PDF_BYTES:
+                            raise ValueError(f"PDF at {url} is larger than {MAX_PDF_BYTES // (1024 * 1024)} MB.")
+                        handle.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Consume analysis / greenwash jobs from the broker.")
+    parser.add_argument("--broker", default=job_broker.BROKER_URL, help="sqlite:///path or redis://host:port/db")
+    parser.add_argument("--kinds", default=",".join(job_broker.JOB_KINDS), help="Comma-separated job kinds to take")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--lease", type=float, default=job_broker.LEASE_SECONDS)
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    try:
+        broker = job_broker.open_broker(args.broker)
+    except job_broker.BrokerError as e:
+        print(f"Worker: {e}")
+        return 2
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()]
+    worker = Worker(broker, kinds, args.slots, args.batch, args.lease)
+    model_registry.registry.start() # Idle-unload checks
+
+    def handle_stop(signum, frame):
+        print(f"Worker: Received signal {signum}; finishing running jobs (up to {args.graceful_timeout:.0f}s)...")
+        worker.request_stop()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    worker.run_forever(args.graceful_timeout)
+    print(f"Worker: Stopped after {worker.processed} jobs.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())